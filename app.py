@@ -1,13 +1,24 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify
+import copy
+import functools
+import io
 
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, session, g, abort
+from graphviz import CalledProcessError, ExecutableNotFound
 
+from attribute_index import AttributeQueryError
+from batch_functions import apply_batch
+from cut_sets import DiagramLimitError
 from helper_functions import *
 from edge_functions import *
+from exports import PDF_TREE_IMAGE_LIMIT, build_nodes_pdf, iter_gzip, iter_nodes_csv
+from graph_store import GraphStore, VersionConflict
+from metrics import METRICS, format_metric
 from node_functions import *
+from scenarios import ScenarioError, ScenarioSweep, scenario_probabilities
+from simulation import MonteCarloSimulator, wilson_interval
+from storage import create_storage
+from upload import MAX_UPLOAD_SIZE, UploadError, spool_upload, validate_upload
+from validation import DIAGNOSTIC_CATEGORIES
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24).hex()
@@ -34,52 +45,494 @@ def initialize_data():
 
 initialize_data()
 
+# Speicher-Backend: 'json' (Standard, Snapshot mit Journal) oder 'sqlite'
+store = GraphStore(create_storage(os.environ.get('ATTACK_TREE_STORAGE', 'json')))
+store.load()
+
+simulator = MonteCarloSimulator()
+scenario_sweep = ScenarioSweep()
+
+# Anzahl der Knoten je Seite der Knotenübersicht auf der Hauptseite
+NODE_OVERVIEW_PAGE_SIZE = 50
+
+
+@app.before_request
+def refresh_store():
+    """
+    Holt vor jeder Anfrage Änderungen anderer Prozesse nach, ohne auf laufende Schreibvorgänge zu warten,
+    und merkt sich die Version, auf der die Antwort beruht.
+
+    :return: None
+    """
+    if request.endpoint != 'static':
+        store.refresh()
+        g.version = store.version
+
+
+@app.after_request
+def add_version_etag(response):
+    """
+    Gibt die Version des Angriffsbaums als ETag zurück, damit Clients sie bei Änderungen per If-Match mitsenden
+    können. Antworten mit eigenem ETag (z.B. Dateien) bleiben unverändert.
+
+    :param response: Die Antwort
+    :return: Die Antwort mit ETag
+    """
+    if 'version' in g and 'ETag' not in response.headers:
+        response.set_etag(str(g.version))
+    return response
+
+
+def expected_versions():
+    """
+    Bestimmt die Versionen, auf denen eine Änderung beruhen darf: aus dem If-Match-Header, dem Formularfeld
+    'version' oder dem Feld 'version' einer JSON-Anfrage.
+
+    :return: Menge der Versionen oder None, falls keine Version angegeben wurde (keine Prüfung)
+    """
+    if request.if_match:
+        if request.if_match.star_tag:
+            return None
+        return {int(tag) for tag in request.if_match.as_set(include_weak=True) if tag.isdigit()}
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        version = payload.get('version') if isinstance(payload, dict) else None
+    else:
+        version = request.form.get('version')
+    if version is None or version == '':
+        return None
+    return {int(version)} if str(version).isdigit() else set()
+
+
+def versioned(view):
+    """
+    Führt eine ändernde Route in einer Transaktion des Graphspeichers aus (siehe GraphStore.transaction).
+    Beruht die Anfrage auf einer veralteten Version, antwortet errorhandler(VersionConflict) mit 409.
+
+    :param view: Die Route
+    :return: Die umschlossene Route
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with store.transaction(expected_versions()):
+            response = view(*args, **kwargs)
+            g.version = store.version
+        return response
+    return wrapper
+
+
+@app.errorhandler(VersionConflict)
+def version_conflict(error):
+    """
+    Beantwortet eine Änderung auf Basis einer veralteten Version mit 409 und der aktuellen Version.
+    JSON-Anfragen erhalten eine JSON-Antwort, Formulare die Hauptseite mit einer Fehlermeldung.
+
+    :param error: Der VersionConflict
+    :return: Antwort mit Status 409
+    """
+    g.version = error.version
+    if request.path.startswith('/api/') or request.is_json:
+        return jsonify({'error': str(error), 'version': error.version}), 409
+    flash(f"{error} Bitte die Seite neu laden und die Änderung erneut ausführen.", 'error')
+    return index(), 409
+
 
 @app.route('/')
 def index():
     """
     Lädt die Daten und rendert die Hauptseite der Anwendung.
-    Überprüft die Daten auf Korrektheit und erstellt ein Angriffsbaum-Bild.
+    Zeigt die Anzahl der Prüfergebnisse als Zusammenfassung an (Details unter /api/diagnostics) und beauftragt
+    das Rendern des Angriffsbaum-Bildes im Hintergrund.
+    Die Seite zeigt bis zur Fertigstellung das zuletzt gerenderte Bild an.
+    Die Knotenübersicht wird seitenweise angezeigt (Parameter 'page', Standard: 1).
 
     :return: Das gerenderte Template für die Hauptseite.
     """
+    nodes = store.nodes
+    edges = store.edges
+    diagnostic_counts = store.validation.report()['counts']
+    # Den Root-Knoten finden (Knoten ohne Eltern)
+    roots = store.topology.roots()
+    root_node = store.node(roots[0]) if roots else None
+
+    # Nur eine Seite der Knotenübersicht rendern, damit große Bäume die Hauptseite nicht aufblähen
+    page_count = max(1, -(-len(nodes) // NODE_OVERVIEW_PAGE_SIZE))
+    page = min(max(request.args.get('page', 1, type=int), 1), page_count)
+    overview_nodes = nodes[(page - 1) * NODE_OVERVIEW_PAGE_SIZE:page * NODE_OVERVIEW_PAGE_SIZE]
+
+    # Erfolgswahrscheinlichkeiten und Sensitivitäts-Heatmap optional im Bild anzeigen, Kennzahlen optional neben
+    # dem Baum (Einstellungen bleiben in der Sitzung erhalten)
+    for option in ('probabilities', 'heatmap', 'metrics'):
+        if option in request.args:
+            session[f'show_{option}'] = request.args[option] == '1'
+    show_probabilities = session.get('show_probabilities', False)
+    show_heatmap = session.get('show_heatmap', False)
+    show_metrics = session.get('show_metrics', False)
+    node_probabilities = store.probabilities.node_probabilities() if show_probabilities else None
+    edge_colors = sensitivity_edge_colors(store.probabilities.sensitivities(roots[0])) \
+        if show_heatmap and roots else None
+    render_version = render_scheduler.request(build_attack_tree_source(nodes, edges, node_probabilities,
+                                                                       edge_colors=edge_colors))
+
+    # Kennzahlen und Pareto-Front des Wurzelknotens nur berechnen, wenn sie angezeigt werden
+    root_metrics = store.metrics.node_metrics(roots[0]) if show_metrics and roots else None
+    metric_rows = [(label, format_metric(root_metrics[name])) for name, (label, _, _, _) in METRICS.items()] \
+        if root_metrics else []
+    pareto_front = store.metrics.pareto_front(roots[0]) if show_metrics and roots else []
+
+    # Extrahiere eindeutige Gruppen
+    groups = list(set(node.get('group') for node in nodes if node.get('group')))
+
+    return render_template('index.html', nodes=nodes, edges=edges, root_node=root_node,
+                           selected_node=None, groups=groups, overview_nodes=overview_nodes, page=page,
+                           page_count=page_count,
+                           render_version=render_version, published_version=render_scheduler.published_version,
+                           show_probabilities=show_probabilities, show_heatmap=show_heatmap, show_metrics=show_metrics,
+                           metric_rows=metric_rows, pareto_front=pareto_front,
+                           diagnostic_counts=diagnostic_counts, diagnostic_categories=DIAGNOSTIC_CATEGORIES)
+
+
+@app.route('/render_status/<version>')
+def render_status(version):
+    """
+    Gibt den Stand eines Hintergrund-Renderauftrags zurück.
+
+    :param version: Die Render-Version, die von der Hauptseite angefordert wurde
+    :return: JSON-Antwort mit 'ready', 'failed' und der aktuell bereitgestellten Version
+    """
+    return jsonify(render_scheduler.status(version))
+
+
+@app.route('/render/<key>.svg')
+def render_image(key):
+    """
+    Liefert ein gerendertes Angriffsbaum-Bild aus dem Render-Cache aus.
+    Da der Schlüssel ein Hash der DOT-Quelle ist, ändert sich der Inhalt unter einer URL nie.
+
+    :param key: Render-Version (Cache-Schlüssel)
+    :return: Das SVG-Bild oder 404, wenn es nicht (mehr) im Cache liegt
+    """
+    path = render_cache.get(key, 'svg')
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='image/svg+xml', max_age=86400)
+
+
+@app.route('/api/probabilities')
+def api_probabilities():
+    """
+    Gibt die Erfolgswahrscheinlichkeit aller Knoten zurück.
+    AND-Gruppen werden als Produkt, OR-Verknüpfungen als 1 - ∏(1 - p) ausgewertet.
+
+    :return: JSON-Antwort mit der Version, den Wurzelknoten und den Wahrscheinlichkeiten je Knoten
+    """
+    with store.lock:
+        version = store.version
+        probabilities = store.probabilities.node_probabilities()
+        roots = [{'id': root_id, 'name': store.node(root_id)['name'], 'probability': probabilities.get(root_id)}
+                 for root_id in store.topology.roots()]
+    return jsonify({'version': version, 'roots': roots, 'nodes': probabilities})
+
+
+@app.route('/api/simulation')
+def api_simulation():
+    """
+    Schätzt die Erfolgswahrscheinlichkeiten durch eine Monte-Carlo-Simulation.
+    Im Gegensatz zu /api/probabilities werden Knoten mit mehreren Elternknoten korreliert berücksichtigt.
+    Parameter: 'trials' (maximale Anzahl an Durchläufen), 'seed' (Startwert) und 'time_budget' (Sekunden).
+
+    :return: JSON-Antwort mit der Schätzung und dem 95-%-Konfidenzintervall je Wurzelknoten und den Trefferquoten je Knoten
+    """
     try:
-        data = load_data()
-    except FileNotFoundError:
-        initialize_data()
-        data = load_data()
-    check_and_groups_with_single_node(data.get('nodes', []))
-    check_parent_nodes_probability(data.get('nodes', []), data.get('edges', []))
-    root_node = None
+        trials = min(int(request.args.get('trials', 100_000)), 10_000_000)
+        seed = int(request.args['seed']) if request.args.get('seed') else None
+        time_budget = min(float(request.args.get('time_budget', 5.0)), 60.0)
+    except ValueError:
+        return jsonify({'error': "'trials', 'seed' und 'time_budget' müssen Zahlen sein."}), 400
+    if trials < 1 or time_budget <= 0:
+        return jsonify({'error': "'trials' und 'time_budget' müssen positiv sein."}), 400
+
+    with store.lock:
+        version = store.version
+        model = store.probabilities.model()
+        roots = [(root_id, store.node(root_id)['name']) for root_id in store.topology.roots()]
+    hits, done = simulator.run(model, trials, seed, time_budget)
+
+    frequencies = {node_id: (float(hits[position]) / done if model.active[position] else None)
+                   for position, node_id in enumerate(model.node_ids)}
+    root_results = []
+    for root_id, name in roots:
+        root_hits = int(hits[model.index[root_id]])
+        root_results.append({'id': root_id, 'name': name, 'probability': root_hits / done,
+                             'confidence_interval': wilson_interval(root_hits, done)})
+    return jsonify({'version': version, 'trials': done, 'seed': seed, 'roots': root_results,
+                    'nodes': frequencies})
+
+
+@app.route('/api/scenarios', methods=['POST'])
+def api_scenarios():
+    """
+    Wertet Was-wäre-wenn-Szenarien aus, ohne den Angriffsbaum zu ändern. Jedes Szenario überschreibt
+    ('probability') oder skaliert ('factor') einzelne Kantenwahrscheinlichkeiten; Knoten können per ID oder Name
+    angegeben werden. Mit 'nodes' kann die Ausgabe auf einzelne Knoten beschränkt werden.
 
-    # Den Root-Knoten finden (Knoten ohne Eltern)
-    for node in data['nodes']:
-        if not any(edge['child'] == node['id'] for edge in data['edges']):
-            root_node = node
-            break
+    :return: JSON-Antwort mit der Version und je Szenario dem Hash sowie den Wahrscheinlichkeiten der Wurzel- und
+             übrigen Knoten
+    """
+    payload = request.get_json(silent=True)
+    scenarios = payload.get('scenarios') if isinstance(payload, dict) else None
+    if not isinstance(scenarios, list) or not 0 < len(scenarios) <= 10_000:
+        return jsonify({'error': "Erwartet wird eine Liste von 1 bis 10000 Szenarien unter 'scenarios'."}), 400
+
+    def resolve(reference):
+        return reference if store.node(reference) else store.node_id_by_name(reference)
+
+    with store.lock:
+        version = store.version
+        model = store.probabilities.model()
+        root_ids = store.topology.roots()
+        try:
+            selected = [resolve(reference) for reference in payload.get('nodes') or model.node_ids]
+            if None in selected:
+                raise ScenarioError("Ein angegebener Knoten wurde nicht gefunden.")
+            normalized = [scenario_sweep.normalize(model, scenario, resolve) for scenario in scenarios]
+        except ScenarioError as e:
+            return jsonify({'error': str(e)}), 422
+    results = scenario_sweep.evaluate(model, normalized)
+
+    response = [{'name': scenario.get('name'), 'key': key, 'cached': cached,
+                 'roots': scenario_probabilities(model, values, root_ids),
+                 'nodes': scenario_probabilities(model, values, selected)}
+                for scenario, (key, values, cached) in zip(scenarios, results)]
+    return jsonify({'version': version, 'scenarios': response})
+
+
+@app.route('/api/nodes/search')
+def api_nodes_search():
+    """
+    Sucht Knoten über ihren Namen für die Auswahllisten der Formulare. Parameter: 'q' (Suchbegriff; ein oder zwei
+    Zeichen suchen am Namensanfang, längere Begriffe im ganzen Namen), 'offset' (Standard: 0) und 'limit'
+    (Standard: 20, höchstens 100).
 
-    id_to_name = {node['id']: node['name'] for node in data['nodes']}
+    :return: JSON-Antwort mit der Version, der Anzahl aller Treffer und der gewünschten Seite der Treffer
+    """
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': "'offset' und 'limit' müssen Zahlen sein."}), 400
 
-    # Füge jedem Knoten basierend auf den Kanten den Namen des Elternknotens hinzu
-    for node in data['nodes']:
-        parent_edge = next((edge for edge in data['edges'] if edge['child'] == node['id']), None)
-        parent_id = parent_edge['parent'] if parent_edge else None
-        node['parent_name'] = id_to_name.get(parent_id, 'None') if parent_id else 'None'
+    return jsonify(store.search.search(request.args.get('q', ''), offset=offset, limit=limit))
 
-    create_attack_tree_image(data['nodes'], data['edges'])
 
-    # Extrahiere eindeutige Gruppen
-    groups = list(set(node.get('group') for node in data['nodes'] if node.get('group')))
+def attribute_filters():
+    """
+    Liest die Filter einer Attributabfrage aus den Parametern der Anfrage. Der Parameter 'filter' kann mehrfach
+    angegeben werden und mehrere Filter durch ';' getrennt enthalten, z.B. 'OS=Windows; cost<1000'.
+
+    :return: Liste der Filter als Strings
+    """
+    return [expression for value in request.args.getlist('filter') for expression in value.split(';')
+            if expression.strip()]
 
-    return render_template('index.html', nodes=data['nodes'], edges=data['edges'], root_node=root_node,
-                           selected_node=None, groups=groups)
+
+@app.route('/api/attributes/search')
+def api_attributes_search():
+    """
+    Sucht Knoten über ihre Attribute. Parameter: 'filter' (siehe attribute_filters; '=' und '!=' vergleichen Text,
+    '<', '<=', '>' und '>=' Zahlen), 'q' (Suchwörter in den Attributwerten), 'facets' (durch Kommas getrennte
+    Attributnamen, deren Werte unter den Treffern gezählt werden), 'offset' (Standard: 0) und 'limit'
+    (Standard: 100, höchstens 1000).
+
+    :return: JSON-Antwort mit der Version, der Anzahl aller Treffer, der gewünschten Seite der Treffer und den
+             Facetten
+    """
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': "'offset' und 'limit' müssen Zahlen sein."}), 400
+    facets = [name for name in request.args.get('facets', '').split(',') if name.strip()]
+
+    try:
+        return jsonify(store.attribute_index.query(attribute_filters(), request.args.get('q', ''), facets,
+                                                   offset=offset, limit=limit))
+    except AttributeQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/diagnostics')
+def api_diagnostics():
+    """
+    Gibt die Prüfergebnisse des aktuellen Standes seitenweise zurück, zusammen mit der Anzahl je Kategorie.
+    Parameter: 'category' (optional, siehe DIAGNOSTIC_CATEGORIES), 'offset' (Standard: 0) und 'limit'
+    (Standard: 100, höchstens 1000).
+
+    :return: JSON-Antwort mit der Version, den Anzahlen je Kategorie und der gewünschten Seite der Prüfergebnisse
+    """
+    category = request.args.get('category') or None
+    if category is not None and category not in DIAGNOSTIC_CATEGORIES:
+        return jsonify({'error': f"Unbekannte Kategorie '{category}'."}), 400
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': "'offset' und 'limit' müssen Zahlen sein."}), 400
+
+    report = store.validation.report()
+    start, end = report['ranges'][category] if category else (0, len(report['items']))
+    page = report['items'][min(start + offset, end):min(start + offset + limit, end)]
+    return jsonify({'version': report['version'], 'counts': report['counts'], 'category': category,
+                    'total': end - start, 'offset': offset, 'limit': limit, 'items': page})
+
+
+@app.route('/api/sensitivities')
+def api_sensitivities():
+    """
+    Gibt die Ableitungen der Erfolgswahrscheinlichkeit eines Wurzelknotens nach allen Kantenwahrscheinlichkeiten zurück,
+    absteigend nach ihrem Betrag sortiert. Parameter: 'root' (ID, Standard: erster Wurzelknoten) und 'limit'.
+
+    :return: JSON-Antwort mit der Version, dem Wurzelknoten und der Rangliste der Kanten
+    """
+    try:
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        return jsonify({'error': "'limit' muss eine Zahl sein."}), 400
+
+    with store.lock:
+        version = store.version
+        roots = store.topology.roots()
+        root_id = request.args.get('root') or (roots[0] if roots else None)
+        if root_id not in roots:
+            return jsonify({'error': 'Der Wurzelknoten wurde nicht gefunden.'}), 404
+        sensitivities = store.probabilities.sensitivities(root_id)
+    ranking = [{'rank': rank, 'parent': parent, 'child': child, 'gradient': gradient}
+               for rank, ((parent, child), gradient) in enumerate(sensitivities[:limit], 1)]
+    return jsonify({'version': version, 'root': root_id, 'edges': ranking})
+
+
+@app.route('/api/attack_paths')
+def api_attack_paths():
+    """
+    Gibt die k wahrscheinlichsten Angriffspfade zurück (Parameter 'k', Standard: 10, höchstens 10000).
+    Bei AND-Gruppen enthält ein Angriffspfad alle Kindknoten der Gruppe samt deren Teilpfaden.
+
+    :return: JSON-Antwort mit der Version und den Pfaden (Wahrscheinlichkeit und Kanten)
+    """
+    try:
+        k = min(int(request.args.get('k', 10)), 10_000)
+    except ValueError:
+        return jsonify({'error': "'k' muss eine Zahl sein."}), 400
+    if k < 1:
+        return jsonify({'error': "'k' muss positiv sein."}), 400
+
+    with store.lock:
+        version = store.version
+        paths = store.probabilities.attack_paths()
+    result = [{'rank': rank, 'probability': probability,
+               'edges': [{'parent': parent, 'child': child} for parent, child in edges]}
+              for rank, (probability, edges) in enumerate(paths.paths(k), 1)]
+    return jsonify({'version': version, 'paths': result})
+
+
+@app.route('/api/cut_sets')
+def api_cut_sets():
+    """
+    Gibt die minimalen Angriffsszenarien (minimale Schnittmengen) eines Wurzelknotens absteigend nach
+    Wahrscheinlichkeit zurück, berechnet über ein binäres Entscheidungsdiagramm. Zusätzlich wird die exakte
+    Erfolgswahrscheinlichkeit geliefert, die gemeinsame Teilziele korrekt berücksichtigt.
+    Parameter: 'root' (ID, Standard: erster Wurzelknoten), 'k' (Standard: 20, höchstens 10000) und
+    'ordering' (Variablenordnung 'dfs' oder 'weighted').
+
+    :return: JSON-Antwort mit der Version, den Wahrscheinlichkeiten und den Szenarien (Kanten und Blattaktionen)
+    """
+    try:
+        k = min(int(request.args.get('k', 20)), 10_000)
+    except ValueError:
+        return jsonify({'error': "'k' muss eine Zahl sein."}), 400
+    ordering = request.args.get('ordering', 'dfs')
+    if k < 1 or ordering not in ('dfs', 'weighted'):
+        return jsonify({'error': "'k' muss positiv und 'ordering' 'dfs' oder 'weighted' sein."}), 400
+
+    with store.lock:
+        version = store.version
+        roots = store.topology.roots()
+        root_id = request.args.get('root') or (roots[0] if roots else None)
+        if root_id not in roots:
+            return jsonify({'error': 'Der Wurzelknoten wurde nicht gefunden.'}), 404
+        approximation = store.probabilities.probability(root_id)
+    try:
+        analysis = store.probabilities.cut_set_analysis(root_id, ordering)
+    except DiagramLimitError as e:
+        return jsonify({'error': str(e)}), 422
+
+    result = []
+    for rank, (probability, edges) in enumerate(analysis.cut_sets(k), 1):
+        parents = {parent for parent, _ in edges}
+        result.append({'rank': rank, 'probability': probability,
+                       'edges': [{'parent': parent, 'child': child} for parent, child in edges],
+                       'leaves': [child for _, child in edges if child not in parents]})
+    return jsonify({'version': version, 'root': root_id, 'probability': analysis.probability(),
+                    'independent_probability': approximation, 'diagram_nodes': len(analysis.diagram),
+                    'cut_sets': result})
+
+
+@app.route('/api/metrics')
+def api_metrics():
+    """
+    Gibt die aus den Attributen berechneten Kennzahlen (minimale Kosten, Zeit und Fähigkeit) aller Knoten zurück,
+    dazu je Wurzelknoten die Pareto-Front aus Kosten und Erfolgswahrscheinlichkeit.
+
+    :return: JSON-Antwort mit der Version, den Bezeichnungen der Kennzahlen, den Wurzelknoten und den Kennzahlen
+             je Knoten
+    """
+    with store.lock:
+        version = store.version
+        metrics = store.metrics.all_metrics()
+        roots = [{'id': root_id, 'name': store.node(root_id)['name'], 'metrics': metrics.get(root_id),
+                  'pareto_front': [{'cost': cost, 'probability': probability}
+                                   for cost, probability in store.metrics.pareto_front(root_id)]}
+                 for root_id in store.topology.roots()]
+    labels = {name: label for name, (label, _, _, _) in METRICS.items()}
+    return jsonify({'version': version, 'labels': labels, 'roots': roots, 'nodes': metrics})
+
+
+@app.route('/api/batch', methods=['POST'])
+@versioned
+def api_batch():
+    """
+    Wendet eine geordnete Liste von Operationen (add_node, add_edge, edit_edge, edit_node, delete_node, delete_edge)
+    in einem Schritt an. Die Operationen werden gemeinsam geprüft und im Speicher angewendet; schlägt eine fehl,
+    wird keine übernommen. Gespeichert und gerendert wird nur einmal am Ende.
+
+    :return: JSON-Antwort mit dem Ergebnis je Operation, der neuen Version und der Render-Version
+    """
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    if not isinstance(operations, list):
+        return jsonify({'error': "Erwartet wird eine Liste von Operationen unter 'operations'."}), 400
+
+    pending_flashes = len(session.get('_flashes', []))
+    applied, results = apply_batch(store, operations)
+    # Meldungen der Prüfungen wurden bereits in die Ergebnisse übernommen; ältere, noch nicht angezeigte
+    # Meldungen bleiben für die nächste Seite erhalten
+    if len(session.get('_flashes', [])) > pending_flashes:
+        session['_flashes'] = session['_flashes'][:pending_flashes]
+    if not applied:
+        return jsonify({'applied': False, 'version': store.version, 'results': results}), 422
+
+    store.save()
+    render_version = render_scheduler.request(build_attack_tree_source(store.nodes, store.edges))
+    return jsonify({'applied': True, 'version': store.version, 'render_version': render_version,
+                    'results': results})
 
 
 @app.route('/add_node', methods=['POST'])
+@versioned
 def add_node_route():
     """
     Fügt einen neuen Knoten basierend auf den Formulardaten hinzu.
-    Überprüft auf doppelte Attributnamen und vorhandene Knotennamen.
+    Überprüft auf doppelte Attributnamen, vorhandene Knotennamen und ob der Elternknoten existiert.
 
     :return: Weiterleitung zur Hauptseite.
     """
@@ -105,23 +558,26 @@ def add_node_route():
     # Füge Attribute nur hinzu, wenn beide Listen nicht leer sind
     attributes = create_attributes_dict(attribute_names, attribute_values, display_in_tree_flags)
 
-    data = load_data()
-
-    if node_name_exists(data, name):
+    if node_name_exists(store, name):
         flash("Der Knoten Name existiert bereits.", "error")
         return redirect(url_for('index'))
 
-    add_node(data, name, parent_id, probability, color, group, attributes)
-    save_data(data)
-    flash("Knoten erfolgreich hinzugefügt.", "success")
+    if not store.node(parent_id):
+        flash("Der Elternknoten wurde nicht gefunden.", "error")
+        return redirect(url_for('index'))
+
+    if add_node(store, name, parent_id, probability, color, group, attributes):
+        store.save()
+        flash("Knoten erfolgreich hinzugefügt.", "success")
     return redirect(url_for('index'))
 
 
 @app.route('/add_edge', methods=['POST'])
+@versioned
 def add_edge_route():
     """
     Fügt eine neue Kante basierend auf den Formulardaten hinzu.
-    Überprüft, ob die Kante bereits existiert oder ob Parent und Child gleich sind.
+    Überprüft, ob beide Knoten existieren, ob die Kante bereits existiert oder ob Parent und Child gleich sind.
 
     :return: Weiterleitung zur Hauptseite.
     """
@@ -130,7 +586,11 @@ def add_edge_route():
     probability = request.form['probability']
     color = 'black'  # if request.form['and_or'] == 'and' else 'black'
 
-    data = load_data()
+    # Überprüfe, ob Parent und Child Node existieren (wie resolve_node_id bei /api/batch)
+    for node_id in (parent_id, child_id):
+        if not store.node(node_id):
+            flash(f"Der Knoten '{node_id}' wurde nicht gefunden.", "error")
+            return redirect(url_for('index'))
 
     # Überprüfe, ob Parent und Child Node gleich sind
     if parent_id == child_id:
@@ -138,16 +598,14 @@ def add_edge_route():
         return redirect(url_for('index'))
 
     # Überprüfe, ob eine Kante zwischen Parent und Child bereits existiert
-    for edge in data['edges']:
-        if edge['parent'] == parent_id and edge['child'] == child_id:
-            flash("Eine Kante zwischen diesen beiden Knoten existiert bereits.", "error")
-            return redirect(url_for('index'))
+    if store.edge(parent_id, child_id):
+        flash("Eine Kante zwischen diesen beiden Knoten existiert bereits.", "error")
+        return redirect(url_for('index'))
 
     # Füge die neue Kante hinzu, falls sie noch nicht existiert
-    add_edge(data, parent_id, child_id, probability, color)
-    save_data(data)
-
-    flash("Kante erfolgreich hinzugefügt.", "success")
+    if add_edge(store, parent_id, child_id, probability, color):
+        store.save()
+        flash("Kante erfolgreich hinzugefügt.", "success")
     return redirect(url_for('index'))
 
 
@@ -159,14 +617,14 @@ def get_node_attributes(node_id):
     :param node_id: Die ID des Knotens
     :return: JSON-Antwort mit den Attributen des Knotens oder einer Fehlermeldung
     """
-    data = load_data()
-    for node in data['nodes']:
-        if node['id'] == node_id:
-            return jsonify({'attributes': node.get('attributes', {})})
+    node = store.node(node_id)
+    if node:
+        return jsonify({'attributes': node.get('attributes', {})})
     return jsonify({'error': 'Node not found'}), 404
 
 
 @app.route('/delete_edge', methods=['POST'])
+@versioned
 def delete_edge_route():
     """
     Löscht eine Kante basierend auf den Formulardaten.
@@ -176,34 +634,15 @@ def delete_edge_route():
     """
     parent_id = request.form['parent']
     child_id = request.form['child']
-    data = load_data()
 
-    # Überprüfe, ob es eine weitere Kante zum Kindknoten gibt
-    child_edges = [edge for edge in data['edges'] if edge['child'] == child_id]
-    if len(child_edges) <= 1:
-        flash("Die Kante kann nicht gelöscht werden, da keine zweite Kante zum Kindknoten existiert.", "error")
-        return redirect(url_for('index'))
-
-    # Entferne die Kante
-    data['edges'] = [edge for edge in data['edges'] if not (edge['parent'] == parent_id and edge['child'] == child_id)]
-
-    # Überprüfe, ob der Kindknoten noch mit einem Elternknoten verbunden ist
-    remaining_edges = [edge for edge in data['edges'] if edge['child'] == child_id]
-    if not remaining_edges:
-        # Finde einen neuen Elternknoten für den Kindknoten
-        new_parent_id = find_new_parent_id(data, child_id)
-        if new_parent_id:
-            for node in data['nodes']:
-                if node['id'] == child_id:
-                    node['parent'] = new_parent_id
-                    break
-
-    save_data(data)
-    flash("Kante erfolgreich gelöscht.", "success")
+    if delete_edge(store, parent_id, child_id):
+        store.save()
+        flash("Kante erfolgreich gelöscht.", "success")
     return redirect(url_for('index'))
 
 
 @app.route('/edit_node', methods=['POST'])
+@versioned
 def edit_node_route():
     """
     Bearbeitet einen Knoten basierend auf den Formulardaten.
@@ -211,45 +650,43 @@ def edit_node_route():
 
     :return: Weiterleitung zur Hauptseite.
     """
-    data = load_data()
     node_id = request.form['node_id']
     new_and_or = request.form.get('new_and_or')
 
-    update_node_name(data, node_id, request.form.get('new_name'))
-    #update_edge_probability(data, node_id, request.form.get('new_probability'))
-    update_edge_color(data, node_id, new_and_or)
-    update_node_parent(data, node_id, request.form.get('new_parent'))
-
-    if new_and_or == 'or':
-        # Entferne die Gruppe, wenn 'OR' ausgewählt ist
-        for node in data['nodes']:
-            if node['id'] == node_id:
-                node.pop('group', None)
-                break
-    else:
-        update_node_group(data, node_id, request.form.get('new_group'))
-
     # Rufe Attributnamen, -werte und display_in_tree Flags ab
     attribute_names = request.form.getlist('edit_attribute_name[]')
     attribute_values = request.form.getlist('edit_attribute_value[]')
     display_in_tree_flags = request.form.getlist('display_in_tree[]')
 
-    # Überprüfe, ob Attributnamen doppelt vorkommen
+    # Überprüfe vor der ersten Änderung, ob Attributnamen doppelt vorkommen, da die Transaktion bei einem
+    # vorzeitigen Rücksprung alle bis dahin vorgenommenen Änderungen speichern würde
     if len(attribute_names) != len(set(attribute_names)):
         flash("Attributnamen dürfen nicht doppelt vorkommen.", "error")
         return redirect(url_for('index'))
 
+    update_node_name(store, node_id, request.form.get('new_name'))
+    #update_edge_probability(store, node_id, request.form.get('new_probability'))
+    update_edge_color(store, node_id, new_and_or)
+    update_node_parent(store, node_id, request.form.get('new_parent'))
+
+    if new_and_or == 'or':
+        # Entferne die Gruppe, wenn 'OR' ausgewählt ist
+        store.update_node(node_id, removed=['group'])
+    else:
+        update_node_group(store, node_id, request.form.get('new_group'))
+
     # Aktualisiere Knotenattribute mit dem neuen Format
     attributes = create_attributes_dict(attribute_names, attribute_values, display_in_tree_flags)
 
-    update_node_attributes(data, node_id, attributes)
+    update_node_attributes(store, node_id, attributes)
 
-    save_data(data)
+    store.save()
     flash("Der Knoten wurde erfolgreich bearbeitet.", "success")
     return redirect(url_for('index'))
 
 
 @app.route('/edit_name/<node_id>', methods=['POST'])
+@versioned
 def edit_name_route(node_id):
     """
     Bearbeitet den Namen eines Knotens basierend auf den Formulardaten.
@@ -259,13 +696,13 @@ def edit_name_route(node_id):
     :return: Weiterleitung zur Hauptseite
     """
     new_name = request.form['new_name']
-    data = load_data()
-    edit_node_name(data, node_id, new_name)
-    save_data(data)
+    edit_node_name(store, node_id, new_name)
+    store.save()
     return redirect(url_for('index'))
 
 
 @app.route('/edit_probability/<node_id>', methods=['POST'])
+@versioned
 def edit_probability_route(node_id):
     """
     Bearbeitet die Wahrscheinlichkeit einer Kante basierend auf den Formulardaten.
@@ -275,13 +712,13 @@ def edit_probability_route(node_id):
     :return: Weiterleitung zur Hauptseite
     """
     new_probability = request.form['new_probability']
-    data = load_data()
-    edit_edge_probability(data, node_id, new_probability)
-    save_data(data)
+    edit_edge_probability(store, node_id, new_probability)
+    store.save()
     return redirect(url_for('index'))
 
 
 @app.route('/edit_and_or/<node_id>', methods=['POST'])
+@versioned
 def edit_and_or_route(node_id):
     """
     Bearbeitet die Farbe einer Kante basierend auf den Formulardaten.
@@ -291,13 +728,13 @@ def edit_and_or_route(node_id):
     :return: Weiterleitung zur Hauptseite
     """
     new_and_or = request.form['and_or']
-    data = load_data()
-    edit_edge_color(data, node_id, 'black' if new_and_or == 'and' else 'black')
-    save_data(data)
+    edit_edge_color(store, node_id, 'black' if new_and_or == 'and' else 'black')
+    store.save()
     return redirect(url_for('index'))
 
 
 @app.route('/edit_parentnode/<node_id>', methods=['POST'])
+@versioned
 def edit_parentnode_route(node_id):
     """
     Bearbeitet den Elternknoten eines Knotens basierend auf den Formulardaten.
@@ -307,20 +744,19 @@ def edit_parentnode_route(node_id):
     :return: Weiterleitung zur Hauptseite
     """
     new_parent_id = request.form['parent']
-    data = load_data()
-    for node in data['nodes']:
-        if node['id'] == node_id:
-            node['parent'] = new_parent_id
-            break
-    for edge in data['edges']:
-        if edge['child'] == node_id:
-            edge['parent'] = new_parent_id
-            break
-    save_data(data)
+    if store.topology.creates_cycle(new_parent_id, node_id):
+        flash('Der Vaterknoten kann nicht geändert werden, da sonst ein Zyklus entstehen würde.', 'error')
+        return redirect(url_for('index'))
+    store.update_node(node_id, {'parent': new_parent_id})
+    parent_edge = store.first_parent_edge(node_id)
+    if parent_edge:
+        store.move_edge(parent_edge, new_parent_id)
+    store.save()
     return redirect(url_for('index'))
 
 
 @app.route('/delete_node', methods=['POST'])
+@versioned
 def delete_node_route():
     """
     Löscht einen Knoten basierend auf den Formulardaten.
@@ -329,128 +765,154 @@ def delete_node_route():
     :return: Weiterleitung zur Hauptseite.
     """
     node_id = request.form['node_id']
-    data = load_data()
 
-    # Überprüfe, ob der zu löschende Knoten der Root-Knoten ist
-    root_node = next((node for node in data['nodes'] if
-                      node['id'] == node_id and not any(edge['child'] == node_id for edge in data['edges'])), None)
-    if root_node:
-        flash('Der Root Knoten kann nicht gelöscht werden.', 'error')
-        return redirect(url_for('index'))
+    if delete_node_and_move_children(store, node_id):
+        store.save()
+        flash("Der Knoten wurde erfolgreich gelöscht und Kanten wurden aktualisiert.", "success")
+    return redirect(url_for('index'))
 
-    # Weist die Kinderknoten einem neuen Elternknoten zu
-    parent_id = find_new_parent_id(data, node_id)
-    for edge in data['edges']:
-        if edge['parent'] == node_id:
-            edge['parent'] = parent_id
 
-    delete_node(data, node_id)
-    save_data(data)
-    flash("Der Knoten wurde erfolgreich gelöscht und Kanten wurden aktualisiert.", "success")
-    return redirect(url_for('index'))
+def send_export(export, download_name, mimetype):
+    """
+    Sendet einen Export aus dem Speicher als Download mit Content-Length und ETag.
+    Stimmt der ETag mit If-None-Match überein, wird nur 304 zurückgegeben; Range-Anfragen werden unterstützt.
+
+    :param export: Tupel aus Inhalt als Bytes und ETag (siehe ExportCache.get)
+    :param download_name: Dateiname des Downloads
+    :param mimetype: MIME-Typ der Datei
+    :return: Die Antwort mit der Datei
+    """
+    content, etag = export
+    return send_file(io.BytesIO(content), as_attachment=True, download_name=download_name, mimetype=mimetype,
+                     etag=etag, conditional=True)
 
 
 @app.route('/export_dot', methods=['POST'])
 def export_dot():
     """
     Exportiert das Angriffsbaum-Bild in das angegebene Format.
-    Lädt die Daten, erstellt das Bild und sendet die Datei als Download.
+    Das Bild wird im Speicher erzeugt (bzw. aus dem Export-Cache geholt) und als Download gesendet.
 
     :return: Datei-Download der exportierten Angriffsbaum-Bilddatei.
     """
-    data = load_data()
     export_format = request.form.get('export_format', 'pdf').lower()
-    path = f'export/attack_tree'
 
-    create_attack_tree_image(data['nodes'], data['edges'], file_path=path, format=export_format)
+    export = export_attack_tree(store.nodes, store.edges, format=export_format)
 
-    return send_file(f"export/attack_tree.{export_format}", as_attachment=True,
-                     download_name=f'attack_tree.{export_format}',
-                     mimetype=f'application/{export_format}')
+    return send_export(export, f'attack_tree.{export_format}', f'application/{export_format}')
 
 
-@app.route('/export_nodes', methods=['GET'])
-def export_nodes():
+@app.route('/export_attack_paths', methods=['GET'])
+def export_attack_paths():
     """
-    Exportiert die Knoten und deren Attribute in eine CSV-Datei.
+    Exportiert das Angriffsbaum-Bild mit den k wahrscheinlichsten Angriffspfaden hervorgehoben.
 
-    :return: Datei-Download der exportierten CSV-Datei.
+    :return: Datei-Download der exportierten Angriffsbaum-Bilddatei.
     """
-    data = load_data()
-    nodes = data['nodes']
-
-    # Erstelle den CSV-Inhalt
-    csv_content = "Name,Attribute\n"
-    for node in nodes:
-        attributes = "; ".join(
-            [f"{key}: {value['value']} (Sichtbar im Angriffspfad: {value['display_in_tree']})" for key, value in
-             node['attributes'].items()])
-        csv_content += f"{node['name']},{attributes}\n"
+    export_format = request.args.get('export_format', 'svg').lower()
+    try:
+        k = min(max(int(request.args.get('k', 5)), 1), 10_000)
+    except ValueError:
+        flash('Die Anzahl der Angriffspfade muss eine Zahl sein.', 'error')
+        return redirect(url_for('index'))
 
-    # Speichere die CSV-Datei
-    csv_path = 'export/nodes_overview.csv'
-    with open(csv_path, 'w', encoding='utf-8') as file:
-        file.write(csv_content)
+    highlighted_edges = {edge for _, edges in store.probabilities.attack_paths().paths(k) for edge in edges}
+    export = export_attack_tree(store.nodes, store.edges, format=export_format, highlighted_edges=highlighted_edges)
 
-    return send_file(csv_path, as_attachment=True, download_name='nodes_overview.csv', mimetype='text/csv')
+    return send_export(export, f'attack_tree_paths.{export_format}', f'application/{export_format}')
 
 
-@app.route('/export_nodes_pdf', methods=['GET'])
-def export_nodes_pdf():
+@app.route('/export_filtered_tree', methods=['GET'])
+def export_filtered_tree():
     """
-    Exportiert die Knoten und deren Attribute in eine PDF-Datei.
-    Sendet die PDF-Datei als Download an den Benutzer.
+    Exportiert den Ausschnitt des Angriffsbaums mit den Knoten, die eine Attributabfrage erfüllen, und ihren
+    Vorfahren. Die Kanten in die Treffer werden hervorgehoben. Parameter wie bei /api/attributes/search.
 
-    :return: Datei-Download der exportierten PDF-Datei.
+    :return: Datei-Download der exportierten Angriffsbaum-Bilddatei.
     """
-    data = load_data()
-    nodes = data['nodes']
+    export_format = request.args.get('export_format', 'svg').lower()
+    try:
+        nodes, edges, highlighted_edges = store.attribute_index.filtered_tree(attribute_filters(),
+                                                                              request.args.get('q', ''))
+    except AttributeQueryError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('index'))
+    if not nodes:
+        flash('Kein Knoten erfüllt die Abfrage.', 'error')
+        return redirect(url_for('index'))
+
+    export = export_attack_tree(nodes, edges, format=export_format, highlighted_edges=highlighted_edges)
 
-    pdf_path = 'export/nodes_overview.pdf'
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-    elements = []
+    return send_export(export, f'attack_tree_filtered.{export_format}', f'application/{export_format}')
 
-    styles = getSampleStyleSheet()
-    title = Paragraph("Knoten Übersicht", styles['Title'])
-    elements.append(title)
 
-    table_data = [["Name", "Attribute"]]
-    for node in nodes:
-        attributes = "<br/>".join([f"{key}: {value['value']}" for key, value in node['attributes'].items()])
-        attributes_paragraph = Paragraph(attributes, styles['Normal'])
-        table_data.append([Paragraph(node['name'], styles['Normal']), attributes_paragraph])
+@app.route('/export_nodes', methods=['GET'])
+def export_nodes():
+    """
+    Exportiert die Knoten, ihre Attribute (eine Spalte je Attribut) und Kennzahlen in eine CSV-Datei.
+    Die Datei wird aus einer Momentaufnahme des Angriffsbaums blockweise erzeugt und direkt gestreamt;
+    mit dem Parameter 'gzip' wird sie komprimiert ausgeliefert.
 
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('ALIGN', (0, 1), (0, -1), 'RIGHT'),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
+    :return: Datei-Download der exportierten CSV-Datei.
+    """
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'on')
+    with store.lock:
+        version = store.version
+        etag = f"nodes-{version}{'-gzip' if compress else ''}"
+        # make_conditional würde den Generator zur Längenberechnung vollständig einlesen
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        nodes = store.nodes
+        metric_index, metric_values = store.metrics.metric_table()
+
+    chunks = iter_nodes_csv(nodes, metric_index, metric_values)
+    download_name, mimetype = 'nodes_overview.csv', 'text/csv'
+    if compress:
+        chunks = iter_gzip(chunks)
+        download_name, mimetype = 'nodes_overview.csv.gz', 'application/gzip'
+
+    response = app.response_class(chunks, mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.set_etag(etag)
+    return response
 
-    # Füge abwechselnde Zeilenfarben hinzu
-    for i in range(1, len(table_data)):
-        if i % 2 == 1:
-            table.setStyle(TableStyle([('BACKGROUND', (0, i), (-1, i), colors.lightgrey)]))
 
-    elements.append(table)
-    doc.build(elements)
+@app.route('/export_nodes_pdf', methods=['GET'])
+def export_nodes_pdf():
+    """
+    Exportiert die Knoten, deren Attribute und Kennzahlen samt Bild des Angriffsbaums in eine PDF-Datei.
+    Die Datei wird im Speicher erzeugt und je Stand des Angriffsbaums zwischengespeichert.
 
-    return send_file(pdf_path, as_attachment=True, download_name='nodes_overview.pdf', mimetype='application/pdf')
+    :return: Datei-Download der exportierten PDF-Datei.
+    """
+    def create():
+        with store.lock:
+            nodes, edges = store.nodes, store.edges
+            metric_index, metric_values = store.metrics.metric_table()
+        tree_image = None
+        if len(nodes) <= PDF_TREE_IMAGE_LIMIT:
+            try:
+                tree_image, _ = export_attack_tree(nodes, edges, format='png')
+            except (ExecutableNotFound, CalledProcessError):
+                # Ohne Graphviz enthält der Bericht nur die Tabellen
+                pass
+        return build_nodes_pdf(nodes, metric_index, metric_values, tree_image)
+
+    export = export_cache.get(('pdf', store.version), create)
+    return send_export(export, 'nodes_overview.pdf', 'application/pdf')
 
 
 @app.route('/download_json')
 def download_json():
     """
-    Lädt die JSON-Datei mit den Angriffsdaten herunter.
+    Lädt den aktuellen Stand der Angriffsdaten als JSON-Datei herunter.
+    Der Stand wird aus dem Speicher erzeugt, da der Snapshot auf der Festplatte dem Journal hinterherlaufen kann.
 
     :return: Datei-Download der JSON-Datei.
     """
-    output_file = 'config/attack_tree_data.json'
+    output_file = io.BytesIO(json.dumps(store.to_dict(), indent=4).encode('utf-8'))
     flash("Die JSON Datei wird heruntergeladen.", "success")
     return send_file(output_file, as_attachment=True, download_name='attack_tree_data.json',
                      mimetype='application/json')
@@ -459,11 +921,17 @@ def download_json():
 @app.route('/upload_json', methods=['POST'])
 def upload_json():
     """
-    Lädt eine JSON-Datei hoch und speichert sie.
-    Überprüft, ob die Datei gültig ist und erstellt ein Bild basierend auf den Daten.
+    Lädt eine JSON-Datei hoch und ersetzt damit den Angriffsbaum.
+    Die Datei wird blockweise in eine temporäre Datei geschrieben und schrittweise gegen das Schema geprüft.
+    Nur wenn die Prüfung erfolgreich ist, wird der Speicher in einem Schritt ersetzt; andernfalls bleibt der
+    bisherige Stand erhalten. Das Bild wird anschließend im Hintergrund gerendert.
 
     :return: Weiterleitung zur Hauptseite.
     """
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_SIZE + 64 * 1024:
+        flash(f"Die Datei ist größer als {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.", 'error')
+        return redirect(url_for('index'))
+
     if 'file' not in request.files:
         flash('Keine Datei hochgeladen!', 'error')
         return redirect(url_for('index'))
@@ -474,21 +942,31 @@ def upload_json():
         flash('Keine ausgewählte Datei!', 'error')
         return redirect(url_for('index'))
 
-    if file and file.filename.endswith('.json'):
-        file_path = os.path.join('config', 'attack_tree_data.json')
-        file.save(file_path)
+    if not file.filename.endswith('.json'):
+        flash('Bitte eine gültige JSON-Datei hochladen!', 'error')
+        return redirect(url_for('index'))
 
-        # Überprüft, ob die JSON-Datei ein Bild generieren kann
-        try:
-            data = load_data(file_path)
-            create_attack_tree_image(data['nodes'], data['edges'])
-            flash('JSON-Datei erfolgreich hochgeladen!', 'success')
-        except Exception as e:
-            flash("Bitte eine gültige JSON-Datei hochladen!", 'error')
-            os.remove(file_path)
-    else:
+    tmp_path = None
+    try:
+        tmp_path = spool_upload(file.stream, 'config')
+        validate_upload(tmp_path)
+        data = load_data(tmp_path)
+        # Die DOT-Quelle wird vor dem Ersetzen erstellt, damit ein Fehler dabei den bisherigen Stand nicht verliert
+        source = build_attack_tree_source(data['nodes'], data['edges'])
+        with store.transaction(expected_versions()):
+            store.reset(data)
+    except UploadError as e:
+        flash(f"Bitte eine gültige JSON-Datei hochladen! {e}", 'error')
+        return redirect(url_for('index'))
+    except (OSError, UnicodeDecodeError, ValueError, KeyError, TypeError, AttributeError):
         flash('Bitte eine gültige JSON-Datei hochladen!', 'error')
+        return redirect(url_for('index'))
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
+    render_scheduler.request(source)
+    flash('JSON-Datei erfolgreich hochgeladen!', 'success')
     return redirect(url_for('index'))
 
 
@@ -501,12 +979,11 @@ def view_nodes():
 
     :return: Das gerenderte Template für die Knoten-Ansicht.
     """
-    data = load_data()
-    nodes = data['nodes']
-    return render_template('view_nodes.html', nodes=nodes)
+    return render_template('view_nodes.html', nodes=store.nodes)
 
 
 @app.route('/edit_edge', methods=['POST'])
+@versioned
 def edit_edge():
     """
     Bearbeitet die Wahrscheinlichkeit einer Kante basierend auf den Formulardaten.
@@ -517,43 +994,24 @@ def edit_edge():
     parent_id = request.form['parent']
     child_id = request.form['child']
     new_probability = request.form['probability']
-    data = load_data()
 
-    # Überprüft, ob der neue Wahrscheinlichkeitswert eine gültige Zahl ist
-    try:
-        new_probability_value = float(new_probability.replace(',', '.'))
-    except ValueError:
-        flash('Die Wahrscheinlichkeit muss einen Zahlenwert sein.', 'error')
-        return redirect(url_for('index'))
-
-    # Findet die zu bearbeitende Kante
-    edge = next((edge for edge in data['edges'] if edge['parent'] == parent_id and edge['child'] == child_id), None)
-    if edge:
-        # Überprüft, ob der neue Wahrscheinlichkeitswert gültig ist
-        total_probability = sum(
-            float(e['probability'].replace(',', '.')) for e in data['edges']
-            if e['parent'] == parent_id and e['child'] != child_id
-        )
-        if total_probability + new_probability_value > 1:
-            flash('Die Gesamtwahrscheinlichkeit der Kindknoten darf 1 nicht überschreiten.', 'error')
-        else:
-            edge['probability'] = new_probability
-            save_data(data)
-            flash("Die Kante wurde erfolgreich bearbeitet.", "success")
-    else:
-        flash("Die Kante wurde nicht gefunden.", "error")
+    if set_edge_probability(store, parent_id, child_id, new_probability):
+        store.save()
+        flash("Die Kante wurde erfolgreich bearbeitet.", "success")
 
     return redirect(url_for('index'))
 
 
 @app.route('/new_project', methods=['POST'])
+@versioned
 def new_project():
     """
     Erstellt ein neues Projekt mit den Anfangsdaten.
 
     :return: Weiterleitung zur Hauptseite.
     """
-    save_data(initial_data)
+    store.reset(copy.deepcopy(initial_data))
+    store.save()
     flash('Neues Projekt erfolgreich angelegt!', 'success')
     return redirect(url_for('index'))
 
@@ -0,0 +1,203 @@
+import heapq
+import math
+import threading
+
+import numpy as np
+
+
+class AttackPathEnumerator:
+    """
+    Zählt die wahrscheinlichsten Angriffspfade eines ProbabilityModel in absteigender Wahrscheinlichkeit auf.
+
+    Ein Angriffspfad wählt ausgehend von einem Wurzelknoten je Knoten einen Term: einen einzelnen Kindknoten (OR)
+    oder alle Kindknoten einer AND-Gruppe, die dann gemeinsam weiterverfolgt werden. Ohne AND-Gruppen entspricht
+    ein Angriffspfad einem Pfad von der Wurzel zu einem Blatt. Die Wahrscheinlichkeit ist das Produkt der
+    Kantenwahrscheinlichkeiten; gerechnet wird mit den Gewichten -log(p).
+
+    Die Aufzählung folgt dem Lazy-k-best-Verfahren für Hypergraphen (Huang und Chiang): Je Knoten werden nur so viele
+    Pfade berechnet, wie für die angefragten Ergebnisse nötig sind. Bereits berechnete Pfade werden für spätere
+    Anfragen mit größerem k wiederverwendet.
+    """
+
+    def __init__(self, model):
+        """
+        Erstellt die Aufzählung für das angegebene Modell.
+
+        :param model: Das ProbabilityModel des Angriffsbaums
+        """
+        self.model = model
+        self.lock = threading.Lock()
+        self._slot = np.full(len(model.node_ids), -1, dtype=np.int64)
+        self._slot[model.parents] = np.arange(len(model.parents))
+        self._term_bounds = np.r_[model.parent_start, len(model.term_start)]
+        self._edge_bounds = np.r_[model.term_start, len(model.edge_child)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._edge_cost = -np.log(model.edge_probability)
+        # Ein virtueller Knoten (-1) verbindet alle Wurzelknoten über Terme ohne Gewicht
+        has_parent = np.zeros(len(model.node_ids), dtype=bool)
+        has_parent[model.edge_child] = True
+        self._root_terms = [(0.0, (int(root),), ()) for root in np.flatnonzero(model.active & ~has_parent)]
+        self._node_terms = {}
+        self._derivations = {}
+        self._candidates = {}
+        self._expanded = {}
+        self._seen = {}
+        self._results = []
+
+    def _terms(self, node):
+        """
+        Gibt die Terme eines Knotens als Liste von (Gewicht, Kindknoten, Kanten) zurück.
+        Terme mit Wahrscheinlichkeit 0 oder ungültiger Wahrscheinlichkeit werden ausgelassen.
+
+        :param node: Index des Knotens oder -1 für den virtuellen Wurzelknoten
+        :return: Liste der Terme
+        """
+        if node == -1:
+            return self._root_terms
+        slot = self._slot[node]
+        if slot < 0:
+            return []
+        terms = []
+        for term in range(self._term_bounds[slot], self._term_bounds[slot + 1]):
+            first_edge, last_edge = int(self._edge_bounds[term]), int(self._edge_bounds[term + 1])
+            cost = float(self._edge_cost[first_edge:last_edge].sum())
+            if math.isfinite(cost):
+                terms.append((cost, tuple(int(child) for child in self.model.edge_child[first_edge:last_edge]),
+                              tuple(range(first_edge, last_edge))))
+        return terms
+
+    def _resolved(self, node, rank):
+        """
+        Überprüft, ob der Pfad mit dem angegebenen Rang berechnet ist oder feststeht, dass es ihn nicht gibt.
+
+        :param node: Index des Knotens
+        :param rank: Rang des Pfades (0 = bester Pfad)
+        :return: True, wenn keine weitere Berechnung nötig ist, sonst False
+        """
+        derivations = self._derivations.get(node)
+        if derivations is None:
+            return False
+        return len(derivations) > rank or (not self._candidates[node] and self._expanded[node] == len(derivations))
+
+    def _initialize(self, node):
+        """
+        Legt die Kandidaten eines Knotens an: je Term die Kombination der jeweils besten Pfade der Kindknoten.
+        Die besten Pfade aller Kindknoten müssen bereits berechnet sein.
+
+        :param node: Index des Knotens
+        :return: None
+        """
+        terms = self._node_terms[node]
+        if node != -1 and self._slot[node] < 0:
+            # Blatt: genau ein Pfad ohne Kanten. Knoten, deren Terme alle Wahrscheinlichkeit 0 haben, haben keinen Pfad
+            candidates = [(0.0, None, ())]
+        else:
+            candidates = [
+                (cost + sum(self._derivations[child][0][0] for child in children), term, (0,) * len(children))
+                for term, (cost, children, _) in enumerate(terms)
+                if all(self._derivations[child] for child in children)
+            ]
+            heapq.heapify(candidates)
+        self._derivations[node] = []
+        self._candidates[node] = candidates
+        self._expanded[node] = 0
+        self._seen[node] = {(term, ranks) for _, term, ranks in candidates}
+
+    def _ensure(self, node, rank):
+        """
+        Berechnet die Pfade eines Knotens bis zum angegebenen Rang, soweit sie existieren.
+        Die Abhängigkeiten zu den Kindknoten werden mit einem expliziten Stapel statt rekursiv aufgelöst,
+        damit auch sehr tiefe Bäume keine Rekursionsgrenze erreichen.
+
+        :param node: Index des Knotens
+        :param rank: Rang des Pfades (0 = bester Pfad)
+        :return: None
+        """
+        stack = [(node, rank)]
+        while stack:
+            node, rank = stack[-1]
+            if node not in self._derivations:
+                terms = self._node_terms.get(node)
+                if terms is None:
+                    terms = self._node_terms[node] = self._terms(node)
+                missing = [(child, 0) for _, children, _ in terms for child in children if not self._resolved(child, 0)]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                self._initialize(node)
+            if self._resolved(node, rank):
+                stack.pop()
+                continue
+
+            derivations = self._derivations[node]
+            if self._expanded[node] < len(derivations):
+                # Nachfolger des zuletzt gewählten Pfades: je Kindknoten dessen nächstbesten Pfad verwenden
+                _, term, ranks = derivations[-1]
+                if term is not None:
+                    children = self._node_terms[node][term][1]
+                    missing = [(child, child_rank + 1) for child, child_rank in zip(children, ranks)
+                               if not self._resolved(child, child_rank + 1)]
+                    if missing:
+                        stack.extend(missing)
+                        continue
+                    self._push_successors(node, term, ranks)
+                self._expanded[node] = len(derivations)
+            if self._candidates[node]:
+                derivations.append(heapq.heappop(self._candidates[node]))
+
+    def _push_successors(self, node, term, ranks):
+        """
+        Fügt die Nachbarn einer Kombination (ein Kindknoten jeweils einen Rang schlechter) zu den Kandidaten hinzu.
+
+        :param node: Index des Knotens
+        :param term: Index des Terms
+        :param ranks: Ränge der Pfade der Kindknoten
+        :return: None
+        """
+        cost, children, _ = self._node_terms[node][term]
+        for position, child in enumerate(children):
+            next_ranks = ranks[:position] + (ranks[position] + 1,) + ranks[position + 1:]
+            if next_ranks[position] >= len(self._derivations[child]) or (term, next_ranks) in self._seen[node]:
+                continue
+            self._seen[node].add((term, next_ranks))
+            total = cost + sum(self._derivations[grandchild][grandchild_rank][0]
+                               for grandchild, grandchild_rank in zip(children, next_ranks))
+            heapq.heappush(self._candidates[node], (total, term, next_ranks))
+
+    def _edges(self, node, rank):
+        """
+        Gibt die Kanten (Positionen im Modell) eines berechneten Pfades zurück.
+
+        :param node: Index des Knotens
+        :param rank: Rang des Pfades
+        :return: Liste der Kantenpositionen
+        """
+        edges = []
+        stack = [(node, rank)]
+        while stack:
+            node, rank = stack.pop()
+            _, term, ranks = self._derivations[node][rank]
+            if term is None:
+                continue
+            _, children, term_edges = self._node_terms[node][term]
+            edges.extend(term_edges)
+            stack.extend(zip(children, ranks))
+        return edges
+
+    def paths(self, k):
+        """
+        Gibt die k wahrscheinlichsten Angriffspfade zurück (oder weniger, falls es nicht so viele gibt).
+
+        :param k: Anzahl der Pfade
+        :return: Liste von Tupeln aus Wahrscheinlichkeit und Liste der Kanten als (Eltern-ID, Kind-ID)
+        """
+        with self.lock:
+            if k > len(self._results):
+                self._ensure(-1, k - 1)
+            node_ids = self.model.node_ids
+            while len(self._results) < min(k, len(self._derivations[-1])):
+                cost = self._derivations[-1][len(self._results)][0]
+                edges = [(node_ids[self.model.edge_parent[edge]], node_ids[self.model.edge_child[edge]])
+                         for edge in self._edges(-1, len(self._results))]
+                self._results.append((math.exp(-cost), edges))
+            return self._results[:k]
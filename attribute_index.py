@@ -0,0 +1,397 @@
+import heapq
+import math
+import operator
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import islice
+
+# Bis zu dieser Anzahl werden neue Zahlen einzeln in die sortierte Spalte eingefügt, darüber wird neu sortiert
+SORTED_INSERT_LIMIT = 64
+# Vergleichsoperatoren der Filter; die längeren Operatoren müssen vor ihren Präfixen stehen
+FILTER_OPERATORS = ('<=', '>=', '!=', '=', '<', '>')
+NUMBER_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+FILTER_PATTERN = re.compile(r'^\s*(.+?)\s*(' + '|'.join(re.escape(op) for op in FILTER_OPERATORS) + r')\s*(.*?)\s*$')
+TOKEN_PATTERN = re.compile(r'\w+')
+# Maximale Anzahl an Knoten eines gefilterten Angriffsbaums (Treffer und ihre Vorfahren)
+FILTERED_TREE_LIMIT = 2000
+
+
+class AttributeQueryError(Exception):
+    """
+    Fehler in einer Abfrage über die Attribute der Knoten.
+    """
+
+
+def attribute_number(value):
+    """
+    Liest den numerischen Wert eines Attributs (Dezimalkomma erlaubt).
+
+    :param value: Der Wert des Attributs
+    :return: Wert als float oder None, falls der Wert keine endliche Zahl ist
+    """
+    try:
+        number = float(str(value).replace(',', '.'))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_filter(expression):
+    """
+    Zerlegt einen Filter der Form 'Schlüssel Operator Wert', z.B. 'OS=Windows' oder 'cost<1000'.
+    '=' und '!=' vergleichen den Wert als Text (ohne Beachtung der Groß- und Kleinschreibung), '<', '<=', '>' und
+    '>=' als Zahl.
+
+    :param expression: Der Filter als String
+    :return: Tupel aus Schlüssel (in Kleinschreibung), Operator und Wert (Text in Kleinschreibung bzw. Zahl)
+    """
+    match = FILTER_PATTERN.match(expression)
+    if not match or not match.group(1):
+        raise AttributeQueryError(f"Ungültiger Filter '{expression}'. Erwartet wird z.B. 'OS=Windows' oder "
+                                  f"'cost<1000'.")
+    key, comparison, value = match.groups()
+    if comparison in ('=', '!='):
+        return key.casefold(), comparison, value.casefold()
+    number = attribute_number(value)
+    if number is None:
+        raise AttributeQueryError(f"Der Filter '{expression}' benötigt eine Zahl.")
+    return key.casefold(), comparison, number
+
+
+class AttributeIndex:
+    """
+    Invertierter Index über die Attribute der Knoten für Filter, Volltextsuche und Facetten.
+
+    Je Attributname und Wert sowie je Wort der Attributwerte wird die Menge der Knoten-IDs gehalten,
+    je Attributname zusätzlich eine nach Wert sortierte Spalte der numerischen Werte für Bereichsabfragen.
+    Neue Zahlen werden zunächst gesammelt und erst beim nächsten Zugriff auf die Spalte einsortiert, damit das
+    Laden großer Bäume nicht für jeden Knoten die ganze Spalte verschiebt.
+    Der Graphspeicher meldet jede Änderung eines Knotens, sodass nur die Einträge des geänderten Knotens
+    nachgeführt werden. Eine Abfrage beginnt mit dem Filter mit den wenigsten Treffern und prüft die übrigen
+    Filter nur für dessen Treffer.
+    """
+
+    def __init__(self, store):
+        """
+        Erstellt den Attributindex für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        """
+        self.store = store
+        self.clear()
+
+    def clear(self):
+        """
+        Leert den Index (z.B. bevor der Speicher neu befüllt wird).
+
+        :return: None
+        """
+        self._attributes = {}
+        self._postings = {}
+        self._terms = {}
+        self._numbers = {}
+        self._unsorted = {}
+        self._labels = {}
+
+    @staticmethod
+    def _entries(node):
+        """
+        Gibt die indizierten Attribute eines Knotens zurück.
+
+        :param node: Der Knoten
+        :return: Dictionary von Attributname (Kleinschreibung) zu Tupel aus Wert (Kleinschreibung), Zahl oder None
+                 und ursprünglichem Wert
+        """
+        entries = {}
+        attributes = node.get('attributes')
+        if not isinstance(attributes, dict):
+            return entries
+        for name, attribute in attributes.items():
+            value = str(attribute.get('value', '')).strip() if isinstance(attribute, dict) else ''
+            entries[str(name).strip().casefold()] = (value.casefold(), attribute_number(value), value)
+        return entries
+
+    def node_changed(self, old_node, new_node):
+        """
+        Führt den Index nach dem Hinzufügen, Ändern oder Entfernen eines Knotens nach.
+
+        :param old_node: Der bisherige Knoten oder None
+        :param new_node: Der neue Knoten oder None
+        :return: None
+        """
+        if old_node is not None and new_node is not None \
+                and old_node.get('attributes') == new_node.get('attributes'):
+            return
+        if old_node is not None:
+            self._remove(old_node['id'])
+        if new_node is not None and new_node.get('attributes'):
+            self._add(new_node['id'], self._entries(new_node))
+
+    def _add(self, node_id, entries):
+        """
+        Nimmt die Attribute eines Knotens in den Index auf.
+
+        :param node_id: ID des Knotens
+        :param entries: Indizierte Attribute (siehe _entries)
+        :return: None
+        """
+        if not entries:
+            return
+        self._attributes[node_id] = entries
+        for key, (value, number, label) in entries.items():
+            self._postings.setdefault(key, {}).setdefault(value, set()).add(node_id)
+            self._labels.setdefault((key, value), label)
+            for token in set(TOKEN_PATTERN.findall(value)):
+                self._terms.setdefault(token, set()).add(node_id)
+            if number is not None:
+                self._unsorted.setdefault(key, []).append((number, node_id))
+
+    def _remove(self, node_id):
+        """
+        Entfernt die Attribute eines Knotens aus dem Index.
+
+        :param node_id: ID des Knotens
+        :return: None
+        """
+        entries = self._attributes.pop(node_id, None)
+        if not entries:
+            return
+        for key, (value, number, _) in entries.items():
+            values = self._postings[key]
+            self._discard(values, value, node_id)
+            if value not in values:
+                self._labels.pop((key, value), None)
+                if not values:
+                    del self._postings[key]
+            for token in set(TOKEN_PATTERN.findall(value)):
+                self._discard(self._terms, token, node_id)
+            if number is not None:
+                column = self._column(key)
+                del column[bisect_left(column, (number, node_id))]
+                if not column:
+                    del self._numbers[key]
+
+    @staticmethod
+    def _discard(index, key, node_id):
+        """
+        Entfernt eine Knoten-ID aus einer Menge des Index und löscht leere Mengen.
+
+        :param index: Dictionary von Schlüssel zu Menge von Knoten-IDs
+        :param key: Schlüssel der Menge
+        :param node_id: ID des Knotens
+        :return: None
+        """
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(node_id)
+            if not ids:
+                del index[key]
+
+    def _column(self, key):
+        """
+        Gibt die sortierte Spalte der Zahlen eines Attributs zurück und sortiert zuvor gesammelte Zahlen ein.
+
+        :param key: Attributname
+        :return: Nach Wert sortierte Liste von Tupeln aus Zahl und Knoten-ID
+        """
+        column = self._numbers.setdefault(key, [])
+        pending = self._unsorted.pop(key, None)
+        if pending is not None:
+            if len(pending) <= SORTED_INSERT_LIMIT:
+                for entry in pending:
+                    insort(column, entry)
+            else:
+                column.extend(pending)
+                column.sort()
+        if not column:
+            del self._numbers[key]
+        return column
+
+    def _range(self, key, comparison, number):
+        """
+        Bestimmt den Bereich einer numerischen Spalte, der einen Vergleich erfüllt.
+
+        :param key: Attributname
+        :param comparison: '<', '<=', '>' oder '>='
+        :param number: Vergleichswert
+        :return: Tupel aus Spalte und Start- und Endposition
+        """
+        column = self._column(key)
+        first = operator.itemgetter(0)
+        if comparison == '<':
+            return column, 0, bisect_left(column, number, key=first)
+        if comparison == '<=':
+            return column, 0, bisect_right(column, number, key=first)
+        if comparison == '>':
+            return column, bisect_right(column, number, key=first), len(column)
+        return column, bisect_left(column, number, key=first), len(column)
+
+    def _matches(self, filters, tokens):
+        """
+        Bestimmt die IDs aller Knoten, die alle Filter und Suchwörter erfüllen.
+
+        :param filters: Liste der Filter (siehe parse_filter)
+        :param tokens: Liste der Suchwörter (Kleinschreibung)
+        :return: Menge der Knoten-IDs (kann eine Menge des Index sein und darf nicht verändert werden) oder None,
+                 falls weder Filter noch Suchwörter angegeben sind
+        """
+        # Bedingungen mit Index als Tupel aus der Anzahl ihrer Treffer, einer Funktion, die ihre Treffer liefert,
+        # und der Position ihrer Prüffunktion
+        sources = []
+        checks = []
+        for key, comparison, value in filters:
+            if comparison == '=':
+                ids = self._postings.get(key, {}).get(value, set())
+                sources.append((len(ids), lambda ids=ids: ids, len(checks)))
+                checks.append(ids.__contains__)
+            elif comparison == '!=':
+                attributes = self._attributes
+                checks.append(lambda node_id, key=key, value=value:
+                              node_id not in attributes or attributes[node_id].get(key, (None,))[0] != value)
+            else:
+                column, start, end = self._range(key, comparison, value)
+                sources.append((end - start, lambda column=column, start=start, end=end:
+                                {node_id for _, node_id in column[start:end]}, len(checks)))
+                checks.append(self._number_check(key, comparison, value))
+        for token in tokens:
+            ids = self._terms.get(token, set())
+            sources.append((len(ids), lambda ids=ids: ids, len(checks)))
+            checks.append(ids.__contains__)
+        if not checks:
+            return None
+        if sources:
+            size, create, chosen = min(sources, key=lambda source: source[0])
+            if not size:
+                return set()
+            candidates = create()
+            # Die Bedingung, deren Treffer die Kandidaten sind, muss nicht erneut geprüft werden
+            checks = checks[:chosen] + checks[chosen + 1:]
+            if not checks:
+                return candidates
+        else:
+            candidates = self.store.nodes_by_id.keys()
+        return {node_id for node_id in candidates if all(check(node_id) for check in checks)}
+
+    def _number_check(self, key, comparison, number):
+        """
+        Erstellt eine Prüffunktion für einen numerischen Vergleich.
+
+        :param key: Attributname
+        :param comparison: '<', '<=', '>' oder '>='
+        :param number: Vergleichswert
+        :return: Funktion, die für eine Knoten-ID angibt, ob der Vergleich erfüllt ist
+        """
+        attributes = self._attributes
+        compare = NUMBER_OPERATORS[comparison]
+
+        def check(node_id):
+            entry = attributes.get(node_id, {}).get(key)
+            return entry is not None and entry[1] is not None and compare(entry[1], number)
+
+        return check
+
+    def _facet(self, key, matches, size):
+        """
+        Zählt die häufigsten Werte eines Attributs unter den Treffern.
+
+        :param key: Attributname (Kleinschreibung)
+        :param matches: Menge der Treffer oder None für alle Knoten
+        :param size: Maximale Anzahl der Werte
+        :return: Liste von Dictionaries mit 'value' und 'count', absteigend nach Anzahl
+        """
+        values = self._postings.get(key, {})
+        if matches is None:
+            counts = {value: len(ids) for value, ids in values.items()}
+        elif len(matches) <= len(values):
+            attributes = self._attributes
+            counts = Counter(attributes[node_id][key][0] for node_id in matches
+                             if node_id in attributes and key in attributes[node_id])
+        else:
+            # Wenige verschiedene Werte: Schnittmengen der Wertmengen mit den Treffern zählen
+            counts = {value: count for value, ids in values.items()
+                      if (count := len(ids & matches) if len(ids) < len(matches) else len(matches & ids))}
+        top = heapq.nsmallest(size, counts.items(), key=lambda item: (-item[1], item[0]))
+        return [{'value': self._labels.get((key, value), value), 'count': count} for value, count in top]
+
+    def matching_ids(self, filters=(), text=''):
+        """
+        Gibt die IDs aller Knoten zurück, die alle Filter und Suchwörter erfüllen.
+
+        :param filters: Liste der Filter als Strings (siehe parse_filter)
+        :param text: Suchwörter, die in den Attributwerten vorkommen müssen
+        :return: Menge der Knoten-IDs
+        """
+        parsed = [parse_filter(expression) for expression in filters]
+        with self.store.lock:
+            matches = self._matches(parsed, TOKEN_PATTERN.findall(text.casefold()))
+            return set(self.store.nodes_by_id) if matches is None else set(matches)
+
+    def filtered_tree(self, filters=(), text='', max_nodes=FILTERED_TREE_LIMIT):
+        """
+        Gibt den Ausschnitt des Angriffsbaums zurück, der die Treffer einer Abfrage mit allen ihren Vorfahren bis zur
+        Wurzel enthält. Knoten und Kanten behalten die Reihenfolge des Graphspeichers.
+
+        :param filters: Liste der Filter als Strings (siehe parse_filter)
+        :param text: Suchwörter, die in den Attributwerten vorkommen müssen
+        :param max_nodes: Maximale Anzahl an Knoten des Ausschnitts
+        :return: Tupel aus Knoten, Kanten und der Menge der Kanten (Eltern-ID, Kind-ID), die in einen Treffer führen
+        """
+        parsed = [parse_filter(expression) for expression in filters]
+        store = self.store
+        with store.lock:
+            matches = self._matches(parsed, TOKEN_PATTERN.findall(text.casefold()))
+            if matches is None:
+                matches = store.nodes_by_id.keys()
+            if len(matches) > max_nodes:
+                raise AttributeQueryError(f"Die Abfrage liefert {len(matches)} Knoten; gefilterte Angriffsbäume "
+                                          f"sind auf {max_nodes} Knoten beschränkt.")
+            selected = set(matches)
+            pending = list(selected)
+            while pending:
+                for parent_id in store.parent_edges.get(pending.pop(), {}):
+                    if parent_id not in selected:
+                        selected.add(parent_id)
+                        pending.append(parent_id)
+            if len(selected) > max_nodes:
+                raise AttributeQueryError(f"Die Treffer der Abfrage haben mit ihren Vorfahren {len(selected)} Knoten; "
+                                          f"gefilterte Angriffsbäume sind auf {max_nodes} Knoten beschränkt.")
+            nodes = [node for node in store.nodes_by_id.values() if node['id'] in selected]
+            edges = [edge for node in nodes for edge in store.parent_edges.get(node['id'], {}).values()
+                     if edge['parent'] in selected]
+            highlighted_edges = {(edge['parent'], edge['child']) for edge in edges if edge['child'] in matches}
+            return nodes, edges, highlighted_edges
+
+    def query(self, filters=(), text='', facets=(), offset=0, limit=100, facet_size=20):
+        """
+        Sucht Knoten über ihre Attribute und zählt die Werte der gewünschten Facetten unter den Treffern.
+
+        :param filters: Liste der Filter als Strings (siehe parse_filter)
+        :param text: Suchwörter, die in den Attributwerten vorkommen müssen
+        :param facets: Attributnamen, deren Werte gezählt werden
+        :param offset: Anzahl der zu überspringenden Treffer
+        :param limit: Maximale Anzahl der gelieferten Treffer
+        :param facet_size: Maximale Anzahl der Werte je Facette
+        :return: Dictionary mit 'version', 'total', 'offset', 'limit', 'items' (Treffer mit 'id' und 'name', nach ID
+                 sortiert; ohne Filter in der Reihenfolge des Graphspeichers) und 'facets' (je Attributname die
+                 häufigsten Werte)
+        """
+        parsed = [parse_filter(expression) for expression in filters]
+        tokens = TOKEN_PATTERN.findall(text.casefold())
+        store = self.store
+        with store.lock:
+            matches = self._matches(parsed, tokens)
+            if matches is None:
+                total = len(store.nodes_by_id)
+                page = list(islice(store.nodes_by_id, offset, offset + limit))
+            else:
+                total = len(matches)
+                page = heapq.nsmallest(offset + limit, matches)[offset:]
+            return {
+                'version': store.version,
+                'total': total,
+                'offset': offset,
+                'limit': limit,
+                'items': [{'id': node_id, 'name': store.nodes_by_id[node_id]['name']} for node_id in page],
+                'facets': {name: self._facet(name.strip().casefold(), matches, facet_size) for name in facets},
+            }
@@ -0,0 +1,203 @@
+from flask import message_flashed, request
+
+from edge_functions import add_edge, delete_edge, set_edge_probability, update_edge_color
+from node_functions import (add_node, create_attributes_dict, delete_node_and_move_children, node_name_exists,
+                            update_node_attributes, update_node_group, update_node_name, update_node_parent)
+
+
+class BatchOperationError(Exception):
+    """
+    Fehler bei einer einzelnen Operation eines Batch-Auftrags.
+    """
+
+
+def resolve_node_id(store, reference):
+    """
+    Bestimmt die ID eines Knotens anhand seiner ID oder seines Namens.
+    So können Operationen auf Knoten verweisen, die weiter vorne im selben Batch angelegt wurden.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param reference: ID oder Name des Knotens
+    :return: ID des Knotens
+    """
+    if store.node(reference):
+        return reference
+    node_id = store.node_id_by_name(reference)
+    if node_id is None:
+        raise BatchOperationError(f"Der Knoten '{reference}' wurde nicht gefunden.")
+    return node_id
+
+
+def attributes_from_operation(operation):
+    """
+    Erstellt das Attribut-Dictionary aus einer Operation.
+    Attribute können als {"Name": "Wert"} oder {"Name": {"value": "Wert", "display_in_tree": "true"}} angegeben werden.
+
+    :param operation: Die Operation
+    :return: Dictionary der Attribute
+    """
+    attribute_names, attribute_values, display_in_tree_flags = [], [], []
+    for name, attribute in (operation.get('attributes') or {}).items():
+        if not isinstance(attribute, dict):
+            attribute = {"value": attribute}
+        attribute_names.append(str(name))
+        attribute_values.append(str(attribute.get('value', '')))
+        display_in_tree_flags.append(str(attribute.get('display_in_tree', 'false')))
+    return create_attributes_dict(attribute_names, attribute_values, display_in_tree_flags)
+
+
+def batch_add_node(store, operation):
+    """
+    Fügt einen Knoten samt Kante zum Elternknoten hinzu (wie /add_node).
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'name', 'parent', 'probability' und optional 'group' und 'attributes'
+    :return: Dictionary mit der ID des neuen Knotens
+    """
+    name = str(operation['name'])
+    if node_name_exists(store, name):
+        raise BatchOperationError("Der Knoten Name existiert bereits.")
+    parent_id = resolve_node_id(store, operation['parent'])
+    node_id = add_node(store, name, parent_id, str(operation['probability']), 'black', operation.get('group'),
+                       attributes_from_operation(operation))
+    return {'id': node_id}
+
+
+def batch_add_edge(store, operation):
+    """
+    Fügt eine Kante zwischen zwei vorhandenen Knoten hinzu (wie /add_edge).
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'parent', 'child' und 'probability'
+    :return: None
+    """
+    parent_id = resolve_node_id(store, operation['parent'])
+    child_id = resolve_node_id(store, operation['child'])
+    if parent_id == child_id:
+        raise BatchOperationError("Eltern- und Kind Knoten dürfen nicht gleich sein.")
+    if store.edge(parent_id, child_id):
+        raise BatchOperationError("Eine Kante zwischen diesen beiden Knoten existiert bereits.")
+    add_edge(store, parent_id, child_id, str(operation['probability']), 'black')
+
+
+def batch_edit_edge(store, operation):
+    """
+    Ändert die Wahrscheinlichkeit einer Kante (wie /edit_edge).
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'parent', 'child' und 'probability'
+    :return: None
+    """
+    set_edge_probability(store, resolve_node_id(store, operation['parent']),
+                         resolve_node_id(store, operation['child']), str(operation['probability']))
+
+
+def batch_edit_node(store, operation):
+    """
+    Bearbeitet einen Knoten (wie /edit_node). Nur die angegebenen Felder werden geändert.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'node' und optional 'name', 'and_or', 'parent', 'group' und 'attributes'
+    :return: None
+    """
+    node_id = resolve_node_id(store, operation['node'])
+    new_and_or = operation.get('and_or')
+    update_node_name(store, node_id, operation.get('name'))
+    update_edge_color(store, node_id, new_and_or)
+    if operation.get('parent'):
+        update_node_parent(store, node_id, resolve_node_id(store, operation['parent']))
+    if new_and_or == 'or':
+        store.update_node(node_id, removed=['group'])
+    else:
+        update_node_group(store, node_id, operation.get('group'))
+    if 'attributes' in operation:
+        update_node_attributes(store, node_id, attributes_from_operation(operation))
+
+
+def batch_delete_node(store, operation):
+    """
+    Löscht einen Knoten und hängt seine Kindknoten um (wie /delete_node).
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'node'
+    :return: None
+    """
+    delete_node_and_move_children(store, resolve_node_id(store, operation['node']))
+
+
+def batch_delete_edge(store, operation):
+    """
+    Löscht eine Kante (wie /delete_edge).
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Operation mit 'parent' und 'child'
+    :return: None
+    """
+    delete_edge(store, resolve_node_id(store, operation['parent']), resolve_node_id(store, operation['child']))
+
+
+BATCH_OPERATIONS = {
+    'add_node': batch_add_node,
+    'add_edge': batch_add_edge,
+    'edit_edge': batch_edit_edge,
+    'edit_node': batch_edit_node,
+    'delete_node': batch_delete_node,
+    'delete_edge': batch_delete_edge,
+}
+
+
+def run_batch_operation(store, operation):
+    """
+    Führt eine einzelne Operation aus und sammelt die dabei gemeldeten Fehler.
+    Die Prüfungen der Knoten- und Kantenfunktionen melden Fehler über flash(); diese Meldungen
+    werden für die Dauer der Operation abgefangen und als Fehler der Operation zurückgegeben.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operation: Die Operation als Dictionary mit dem Feld 'op'
+    :return: Tupel aus dem Ergebnis der Operation und der Liste der Fehlermeldungen
+    """
+    if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+        return None, ["Unbekannte Operation."]
+
+    current_request = request._get_current_object()
+    errors = []
+
+    def collect(sender, message, category, **extra):
+        if category == 'error' and request._get_current_object() is current_request:
+            errors.append(message)
+
+    with message_flashed.connected_to(collect):
+        try:
+            result = BATCH_OPERATIONS[operation['op']](store, operation)
+        except BatchOperationError as e:
+            return None, [str(e)]
+        except KeyError as e:
+            return None, [f"Das Feld {e} fehlt."]
+    return result, errors
+
+
+def apply_batch(store, operations):
+    """
+    Wendet eine geordnete Liste von Operationen als Einheit auf den Speicher an.
+    Schlägt eine Operation fehl, werden alle bereits ausgeführten Operationen zurückgenommen
+    und die folgenden übersprungen.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param operations: Liste der Operationen
+    :return: Tupel aus einem Flag, ob alle Operationen angewendet wurden, und der Liste der Ergebnisse je Operation
+    """
+    results = []
+    with store.lock:
+        checkpoint = store.checkpoint()
+        for index, operation in enumerate(operations):
+            result, errors = run_batch_operation(store, operation)
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if errors:
+                results.append({'index': index, 'op': op, 'status': 'error', 'errors': errors})
+                results.extend({'index': skipped, 'op': later.get('op') if isinstance(later, dict) else None,
+                                'status': 'skipped'}
+                               for skipped, later in enumerate(operations[index + 1:], index + 1))
+                store.rollback(checkpoint)
+                return False, results
+            results.append({'index': index, 'op': op, 'status': 'ok', **(result or {})})
+    return True, results
@@ -0,0 +1,111 @@
+import random
+import time
+import uuid
+
+from helper_functions import build_attack_tree_source
+from probability import ProbabilityModel
+from scenarios import ScenarioSweep
+
+
+def create_synthetic_tree(node_count, group_count, seed=0):
+    """
+    Erstellt einen zufälligen Angriffsbaum mit der angegebenen Anzahl an Knoten und AND-Gruppen.
+
+    :param node_count: Anzahl der Knoten
+    :param group_count: Anzahl der AND-Gruppen
+    :param seed: Startwert für den Zufallsgenerator
+    :return: Daten im JSON-Format mit 'nodes' und 'edges'
+    """
+    rng = random.Random(seed)
+    nodes = []
+    edges = []
+    # Jeder step-te Knoten erhält eine eigene Gruppe, sodass genau group_count Gruppen entstehen
+    step = max(node_count // group_count, 1)
+    for index in range(node_count):
+        node = {"id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"Node {index}", "attributes": {}}
+        if index % 3 == 0:
+            node['attributes']['cost'] = {"value": str(rng.randint(1, 1000)), "display_in_tree": "true"}
+        if index % step == step - 1 and index // step < group_count:
+            node['group'] = f"Gruppe {index // step}"
+        nodes.append(node)
+        if index:
+            parent = nodes[rng.randrange(max(0, index - 50), index)]
+            probability = f"{rng.random():.2f}".replace('.', ',')
+            edges.append({"parent": parent['id'], "child": node['id'], "probability": probability, "color": "black"})
+    return {"nodes": nodes, "edges": edges}
+
+
+def benchmark_dot_source(sizes=(25_000, 50_000, 100_000), group_count=5_000):
+    """
+    Misst die Erstellung der DOT-Quelle für synthetische Bäume unterschiedlicher Größe.
+    Bei linearer Laufzeit bleibt die Zeit pro Knoten über alle Größen annähernd gleich.
+
+    :param sizes: Anzahl der Knoten je Messung
+    :param group_count: Anzahl der AND-Gruppen je Baum
+    :return: None
+    """
+    for size in sizes:
+        data = create_synthetic_tree(size, group_count)
+        start = time.perf_counter()
+        source = build_attack_tree_source(data['nodes'], data['edges'])
+        duration = time.perf_counter() - start
+        print(f"DOT-Quelle: {size:>7} Knoten, {group_count} AND-Gruppen: {duration:6.2f} s "
+              f"({duration / size * 1e6:5.1f} µs/Knoten, {len(source) / 1e6:.1f} MB)")
+
+
+def benchmark_probability(sizes=(100_000, 1_000_000), group_count=5_000):
+    """
+    Misst das Kompilieren und Auswerten des Wahrscheinlichkeitsmodells für synthetische Bäume.
+
+    :param sizes: Anzahl der Knoten je Messung
+    :param group_count: Anzahl der AND-Gruppen je Baum
+    :return: None
+    """
+    for size in sizes:
+        data = create_synthetic_tree(size, group_count)
+        # Die Kanten sind nach Kindknoten sortiert und zeigen immer auf einen früheren Knoten
+        levels = {data['nodes'][0]['id']: 0}
+        for edge in data['edges']:
+            levels[edge['child']] = levels[edge['parent']] + 1
+        start = time.perf_counter()
+        model = ProbabilityModel(data['nodes'], data['edges'], levels)
+        compiled = time.perf_counter()
+        model.evaluate()
+        evaluated = time.perf_counter()
+        print(f"Wahrscheinlichkeiten: {size:>7} Knoten: Kompilieren {compiled - start:6.2f} s, "
+              f"Auswerten {evaluated - compiled:6.3f} s ({len(model.levels)} Ebenen)")
+
+
+def benchmark_scenarios(size=10_000, scenario_count=1_000, overrides=20):
+    """
+    Misst die gemeinsame Auswertung vieler Szenarien und die erneute Abfrage aus dem Cache.
+
+    :param size: Anzahl der Knoten des synthetischen Baums
+    :param scenario_count: Anzahl der Szenarien
+    :param overrides: Anzahl der geänderten Kanten je Szenario
+    :return: None
+    """
+    data = create_synthetic_tree(size, size // 20)
+    levels = {data['nodes'][0]['id']: 0}
+    for edge in data['edges']:
+        levels[edge['child']] = levels[edge['parent']] + 1
+    model = ProbabilityModel(data['nodes'], data['edges'], levels)
+    rng = random.Random(1)
+    scenarios = [{'overrides': [{'parent': edge['parent'], 'child': edge['child'], 'factor': 0.5}
+                                for edge in rng.sample(data['edges'], overrides)]}
+                 for _ in range(scenario_count)]
+    sweep = ScenarioSweep()
+    normalized = [sweep.normalize(model, scenario, lambda reference: reference) for scenario in scenarios]
+    start = time.perf_counter()
+    sweep.evaluate(model, normalized)
+    evaluated = time.perf_counter()
+    sweep.evaluate(model, normalized)
+    cached = time.perf_counter()
+    print(f"Szenarien: {scenario_count} × {size} Knoten: Auswerten {evaluated - start:6.3f} s, "
+          f"aus dem Cache {cached - evaluated:6.3f} s")
+
+
+if __name__ == '__main__':
+    benchmark_dot_source()
+    benchmark_probability()
+    benchmark_scenarios()
@@ -0,0 +1,368 @@
+import heapq
+import itertools
+import threading
+
+import numpy as np
+
+FALSE = 0
+TRUE = 1
+
+
+class DiagramLimitError(Exception):
+    """
+    Das Entscheidungsdiagramm überschreitet die maximale Anzahl an Knoten.
+    """
+
+
+class BinaryDecisionDiagram:
+    """
+    Reduziertes, geordnetes binäres Entscheidungsdiagramm (ROBDD) mit gemeinsam genutzten Knoten.
+    Knoten werden über eine Unique-Tabelle nur einmal angelegt und sind durch ganze Zahlen bezeichnet
+    (0 = falsch, 1 = wahr). Da ein Knoten erst nach seinen Nachfolgern entsteht, sind die Nummern topologisch
+    sortiert. Alle Operationen werden mit einem expliziten Stapel statt rekursiv berechnet und zwischengespeichert,
+    damit auch sehr tiefe Diagramme keine Rekursionsgrenze erreichen.
+    """
+
+    def __init__(self, variable_count, max_nodes=1_000_000):
+        """
+        Erstellt ein leeres Diagramm.
+
+        :param variable_count: Anzahl der Variablen (Variable 0 steht in der Ordnung ganz oben)
+        :param max_nodes: Maximale Anzahl an Knoten
+        """
+        self.max_nodes = max_nodes
+        # Die Terminalknoten stehen in der Ordnung unter allen Variablen
+        self.var = [variable_count, variable_count]
+        self.low = [FALSE, TRUE]
+        self.high = [FALSE, TRUE]
+        self._unique = {}
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.var)
+
+    def node(self, var, low, high):
+        """
+        Gibt den Knoten für ite(var, high, low) zurück und legt ihn bei Bedarf an.
+
+        :param var: Variable des Knotens
+        :param low: Nachfolger, falls die Variable falsch ist
+        :param high: Nachfolger, falls die Variable wahr ist
+        :return: Nummer des Knotens
+        """
+        if low == high:
+            return low
+        key = (var, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            if len(self.var) >= self.max_nodes:
+                raise DiagramLimitError(f"Das Entscheidungsdiagramm überschreitet {self.max_nodes} Knoten.")
+            node = self._unique[key] = len(self.var)
+            self.var.append(var)
+            self.low.append(low)
+            self.high.append(high)
+        return node
+
+    def variable(self, var):
+        """
+        Gibt den Knoten der einzelnen Variable zurück.
+
+        :param var: Variable
+        :return: Nummer des Knotens
+        """
+        return self.node(var, FALSE, TRUE)
+
+    def conjunction(self, f, g):
+        """
+        :return: Knoten für f ∧ g
+        """
+        return self._compute('and', f, g)
+
+    def disjunction(self, f, g):
+        """
+        :return: Knoten für f ∨ g
+        """
+        return self._compute('or', f, g)
+
+    def minimal_solutions(self, f):
+        """
+        Berechnet die minimalen Lösungen einer monotonen Funktion (Verfahren nach Rauzy).
+        Im Ergebnis steht jeder Pfad zur 1 für eine Lösung aus den Variablen, deren wahrer Zweig gewählt wird;
+        übersprungene Variablen gehören nicht zur Lösung.
+
+        :param f: Knoten der monotonen Funktion
+        :return: Knoten des Diagramms der minimalen Lösungen
+        """
+        return self._compute('minimal', f, FALSE)
+
+    def probability(self, f, probabilities):
+        """
+        Berechnet die exakte Wahrscheinlichkeit einer Funktion bei unabhängigen Variablen (Shannon-Zerlegung).
+
+        :param f: Knoten der Funktion
+        :param probabilities: Wahrscheinlichkeit je Variable
+        :return: Wahrscheinlichkeit
+        """
+        values = [0.0, 1.0]
+        var, low, high = self.var, self.low, self.high
+        for node in range(2, f + 1):
+            p = probabilities[var[node]]
+            values.append(p * values[high[node]] + (1.0 - p) * values[low[node]])
+        return values[f]
+
+    def _step(self, op, f, g):
+        """
+        Versucht, eine Operation aus bereits berechneten Teilergebnissen zu bestimmen.
+
+        :param op: Operation ('and', 'or', 'without' oder 'minimal')
+        :param f: Erster Knoten
+        :param g: Zweiter Knoten (bei 'minimal' ohne Bedeutung)
+        :return: Ergebnisknoten oder Liste der noch fehlenden Teilprobleme
+        """
+        var, low, high, cache = self.var, self.low, self.high, self._cache
+        if op == 'and':
+            if f == FALSE or g == FALSE:
+                return FALSE
+            if f == TRUE or f == g:
+                return g
+            if g == TRUE:
+                return f
+        elif op == 'or':
+            if f == TRUE or g == TRUE:
+                return TRUE
+            if f == FALSE or f == g:
+                return g
+            if g == FALSE:
+                return f
+        elif op == 'without':
+            # Entfernt aus der Lösungsmenge f alle Lösungen, die eine Lösung aus g enthalten
+            if f == FALSE or g == TRUE or f == g:
+                return FALSE
+            if g == FALSE:
+                return f
+            if f == TRUE:
+                # Die leere Lösung enthält nur die leere Lösung
+                while g > TRUE:
+                    g = low[g]
+                return FALSE if g == TRUE else TRUE
+        elif f <= TRUE:
+            return f
+
+        if op == 'minimal':
+            needed = [('minimal', low[f], FALSE), ('minimal', high[f], FALSE)]
+            if all(key in cache for key in needed):
+                needed.append(('without', cache[needed[1]], cache[needed[0]]))
+                if needed[2] in cache:
+                    return self.node(var[f], cache[needed[0]], cache[needed[2]])
+        elif op == 'without':
+            if var[f] < var[g]:
+                needed = [('without', low[f], g), ('without', high[f], g)]
+                if all(key in cache for key in needed):
+                    return self.node(var[f], cache[needed[0]], cache[needed[1]])
+            elif var[f] > var[g]:
+                needed = [('without', f, low[g])]
+                if needed[0] in cache:
+                    return cache[needed[0]]
+            else:
+                # Lösungen mit der Variable dürfen weder eine Lösung mit noch eine ohne die Variable enthalten
+                needed = [('without', low[f], low[g]), ('without', high[f], high[g])]
+                if all(key in cache for key in needed):
+                    needed.append(('without', cache[needed[1]], low[g]))
+                    if needed[2] in cache:
+                        return self.node(var[f], cache[needed[0]], cache[needed[2]])
+        else:
+            top = min(var[f], var[g])
+            f_low, f_high = (low[f], high[f]) if var[f] == top else (f, f)
+            g_low, g_high = (low[g], high[g]) if var[g] == top else (g, g)
+            needed = [(op, f_low, g_low), (op, f_high, g_high)]
+            if all(key in cache for key in needed):
+                return self.node(top, cache[needed[0]], cache[needed[1]])
+        return [key for key in needed if key not in cache]
+
+    def _compute(self, op, f, g):
+        """
+        Berechnet eine Operation mit einem expliziten Stapel der offenen Teilprobleme.
+
+        :param op: Operation ('and', 'or', 'without' oder 'minimal')
+        :param f: Erster Knoten
+        :param g: Zweiter Knoten
+        :return: Ergebnisknoten
+        """
+        cache = self._cache
+        stack = [(op, f, g)]
+        while stack:
+            key = stack[-1]
+            if key in cache:
+                stack.pop()
+                continue
+            result = self._step(*key)
+            if isinstance(result, list):
+                stack.extend(result)
+            else:
+                cache[key] = result
+                stack.pop()
+        return cache[(op, f, g)]
+
+
+def variable_order(model, root, ordering='dfs'):
+    """
+    Bestimmt die Reihenfolge der Kanten als Variablen des Entscheidungsdiagramms.
+    Die Kanten werden in Tiefensuche ab dem Wurzelknoten nummeriert, jede Kante direkt vor dem Teilbaum ihres
+    Kindknotens. So liegen die Variablen eines Teilbaums in der Ordnung beieinander, und das Diagramm bleibt für
+    Bäume linear groß; nur gemeinsame Teilziele lassen es wachsen. Bei 'dfs' (Standard) werden die Kindknoten in der
+    Reihenfolge des Modells besucht, bei 'weighted' die Kindknoten mit den größten Teilbäumen zuerst.
+
+    :param model: Das ProbabilityModel
+    :param root: Index des Wurzelknotens
+    :param ordering: 'dfs' oder 'weighted'
+    :return: Array mit der Variable je Kante des Modells (-1 für vom Wurzelknoten aus nicht erreichbare Kanten)
+    """
+    if ordering not in ('dfs', 'weighted'):
+        raise ValueError(f"Unbekannte Variablenordnung: {ordering}")
+    outgoing = {}
+    for edge, parent in enumerate(model.edge_parent.tolist()):
+        outgoing.setdefault(parent, []).append(edge)
+    children = model.edge_child.tolist()
+    if ordering == 'weighted':
+        # Anzahl der Kanten unterhalb jedes Knotens (gemeinsame Teilziele mehrfach gezählt), tiefste Ebene zuerst
+        weight = np.zeros(len(model.node_ids), dtype=np.float64)
+        for first_edge, last_edge, level_children, _, _, _ in model.levels:
+            np.add.at(weight, model.edge_parent[first_edge:last_edge], 1.0 + weight[level_children])
+        outgoing = {parent: sorted(edges, key=lambda edge: -weight[children[edge]])
+                    for parent, edges in outgoing.items()}
+
+    order = np.full(len(children), -1, dtype=np.int64)
+    visited = {root}
+    pending = list(reversed(outgoing.get(root, [])))
+    position = 0
+    while pending:
+        edge = pending.pop()
+        order[edge] = position
+        position += 1
+        child = children[edge]
+        if child not in visited:
+            visited.add(child)
+            pending.extend(reversed(outgoing.get(child, [])))
+    return order
+
+
+class CutSetAnalysis:
+    """
+    Berechnet die minimalen Angriffsszenarien (minimale Schnittmengen) eines Wurzelknotens
+    und seine exakte Erfolgswahrscheinlichkeit über ein binäres Entscheidungsdiagramm.
+
+    Jede Kante ist ein eigenes Ereignis mit ihrer Wahrscheinlichkeit; ein Knoten ohne Kindknoten gilt als erreicht.
+    Ein Knoten ist erreicht, wenn für einen seiner Terme (einzelner Kindknoten oder AND-Gruppe) alle Kanten gelingen
+    und deren Kindknoten erreicht sind. Anders als bei ProbabilityModel werden Knoten mit mehreren Elternknoten
+    dabei nur einmal berücksichtigt, sodass die Wahrscheinlichkeit auch bei gemeinsamen Teilzielen exakt ist.
+    """
+
+    def __init__(self, model, root, ordering='dfs', max_nodes=1_000_000):
+        """
+        Baut das Entscheidungsdiagramm für den angegebenen Wurzelknoten auf.
+
+        :param model: Das ProbabilityModel
+        :param root: Index des Wurzelknotens
+        :param ordering: Heuristik für die Variablenordnung ('dfs' oder 'weighted', siehe variable_order)
+        :param max_nodes: Maximale Anzahl an Knoten des Diagramms
+        """
+        self.model = model
+        self.lock = threading.Lock()
+        order = variable_order(model, root, ordering)
+        # Kanten, die vom Wurzelknoten aus nicht erreichbar sind, kommen nicht vor
+        reachable = np.flatnonzero(order >= 0)
+        self.edges = reachable[np.argsort(order[reachable])]
+        self.probabilities = np.nan_to_num(model.edge_probability[self.edges], nan=0.0).tolist()
+        self.diagram = BinaryDecisionDiagram(len(self.edges), max_nodes)
+
+        diagram = self.diagram
+        functions = {}
+        edge_parent = model.edge_parent
+        for first_edge, last_edge, children, term_start, parent_start, parents in model.levels:
+            term_bounds = np.r_[term_start, last_edge - first_edge] + first_edge
+            terms = {}
+            for term, parent in enumerate(edge_parent[term_bounds[:-1]].tolist()):
+                term_edges = sorted(range(term_bounds[term], term_bounds[term + 1]), key=lambda edge: order[edge])
+                if order[term_edges[0]] >= 0:
+                    terms.setdefault(parent, []).append(term_edges)
+            # Von hinten nach vorne in der Variablenordnung verknüpfen, damit jeder Teil nur einmal kopiert wird
+            for parent, parent_terms in terms.items():
+                function = FALSE
+                for term_edges in sorted(parent_terms, key=lambda term_edges: -order[term_edges[0]]):
+                    term_function = TRUE
+                    for edge in reversed(term_edges):
+                        literal = diagram.variable(int(order[edge]))
+                        child = functions.get(int(model.edge_child[edge]), TRUE)
+                        term_function = diagram.conjunction(diagram.conjunction(literal, child), term_function)
+                    function = diagram.disjunction(term_function, function)
+                functions[parent] = function
+        self.function = functions.get(root, TRUE)
+        self.solutions = diagram.minimal_solutions(self.function)
+        self._results = []
+        self._queue = None
+
+    def probability(self):
+        """
+        Gibt die exakte Erfolgswahrscheinlichkeit des Wurzelknotens zurück.
+
+        :return: Wahrscheinlichkeit
+        """
+        return self.diagram.probability(self.function, self.probabilities)
+
+    def _initialize_queue(self):
+        """
+        Legt die Warteschlange der Bestensuche über das Diagramm der minimalen Lösungen an.
+        Als Schranke dient je Knoten die größte Wahrscheinlichkeit, mit der von ihm aus die 1 erreicht werden kann.
+
+        :return: None
+        """
+        diagram, probabilities = self.diagram, self.probabilities
+        best = [0.0, 1.0]
+        for node in range(2, self.solutions + 1):
+            best.append(max(probabilities[diagram.var[node]] * best[diagram.high[node]], best[diagram.low[node]]))
+        self._best = best
+        self._counter = itertools.count()
+        self._queue = [] if self.solutions == FALSE else [(-best[self.solutions], 0, self.solutions, 1.0, None)]
+
+    def cut_sets(self, k):
+        """
+        Gibt die k wahrscheinlichsten minimalen Angriffsszenarien zurück (oder weniger, falls es nicht so viele gibt).
+        Die Szenarien werden in absteigender Wahrscheinlichkeit aufgezählt und für spätere Anfragen wiederverwendet.
+
+        :param k: Maximale Anzahl an Szenarien
+        :return: Liste von Tupeln aus Wahrscheinlichkeit und Liste der Kanten als (Eltern-ID, Kind-ID)
+        """
+        with self.lock:
+            if self._queue is None:
+                self._initialize_queue()
+            diagram, probabilities, best, queue = self.diagram, self.probabilities, self._best, self._queue
+            while len(self._results) < k and queue:
+                _, _, node, prefix, chosen = heapq.heappop(queue)
+                if node == TRUE:
+                    self._results.append((prefix, self._edge_ids(chosen)))
+                    continue
+                var = diagram.var[node]
+                if diagram.high[node] != FALSE:
+                    high_prefix = prefix * probabilities[var]
+                    heapq.heappush(queue, (-high_prefix * best[diagram.high[node]], next(self._counter),
+                                           diagram.high[node], high_prefix, (var, chosen)))
+                if diagram.low[node] != FALSE:
+                    heapq.heappush(queue, (-prefix * best[diagram.low[node]], next(self._counter),
+                                           diagram.low[node], prefix, chosen))
+            return self._results[:k]
+
+    def _edge_ids(self, chosen):
+        """
+        Wandelt die gewählten Variablen eines Szenarios in Kanten um.
+
+        :param chosen: Verkettete Liste (Variable, Rest) der gewählten Variablen
+        :return: Liste der Kanten als (Eltern-ID, Kind-ID) in der Variablenordnung
+        """
+        node_ids, model = self.model.node_ids, self.model
+        edges = []
+        while chosen is not None:
+            var, chosen = chosen
+            edge = self.edges[var]
+            edges.append((node_ids[model.edge_parent[edge]], node_ids[model.edge_child[edge]]))
+        edges.reverse()
+        return edges
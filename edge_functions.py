@@ -1,66 +1,127 @@
 from flask import flash
+from helper_functions import find_new_parent_id
 from node_functions import get_node_level
+from probability import probability_value
 
 
-def add_edge(data, parent_id, child_id, probability, color):
+def add_edge(store, parent_id, child_id, probability, color):
     """
     Fügt eine neue Kante zu den Daten hinzu, wenn die Knoten nicht auf der gleichen Ebene sind.
-    Überprüft die Ebenen der Knoten und fügt die Kante hinzu, wenn sie unterschiedlich sind.
+    Überprüft, ob die Kante einen Zyklus erzeugen würde, sowie die Ebenen der Knoten
+    und fügt die Kante hinzu, wenn sie unterschiedlich sind.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param parent_id: ID des Elternknotens
     :param child_id: ID des Kindknotens
     :param probability: Wahrscheinlichkeit der Kante
     :param color: Farbe der Kante (wird verwendet, um AND-Gruppen zu kennzeichnen)
-    :return: None
+    :return: True, wenn die Kante hinzugefügt wurde, sonst False
     """
-    parent_level = get_node_level(data, parent_id)
-    child_level = get_node_level(data, child_id)
+    if store.topology.creates_cycle(parent_id, child_id):
+        flash('Die Kante kann nicht hinzugefügt werden, da sonst ein Zyklus entstehen würde.', 'error')
+        return False
+
+    parent_level = get_node_level(store, parent_id)
+    child_level = get_node_level(store, child_id)
 
     if parent_level == child_level:
         flash('Kanten können nicht zwischen Knoten auf der gleichen Ebene hinzugefügt werden.', 'error')
-        return
+        return False
 
     new_edge = {"parent": parent_id, "child": child_id, "probability": probability, "color": color}
-    data['edges'].append(new_edge)
+    store.add_edge(new_edge)
+    return True
+
+
+def set_edge_probability(store, parent_id, child_id, new_probability):
+    """
+    Setzt die Wahrscheinlichkeit der Kante zwischen zwei Knoten.
+    Überprüft, ob der neue Wert eine gültige Zahl ist und die Gesamtwahrscheinlichkeit der Kindknoten 1 nicht überschreitet.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param parent_id: ID des Elternknotens
+    :param child_id: ID des Kindknotens
+    :param new_probability: Neue Wahrscheinlichkeit für die Kante
+    :return: True, wenn die Kante geändert wurde, sonst False
+    """
+    try:
+        new_probability_value = probability_value(new_probability)
+    except ValueError:
+        flash('Die Wahrscheinlichkeit muss einen Zahlenwert sein.', 'error')
+        return False
+
+    if not store.edge(parent_id, child_id):
+        flash("Die Kante wurde nicht gefunden.", "error")
+        return False
+
+    if store.validation.exceeds_total(parent_id, new_probability_value, replaced_child_id=child_id):
+        flash('Die Gesamtwahrscheinlichkeit der Kindknoten darf 1 nicht überschreiten.', 'error')
+        return False
+
+    store.update_edge(parent_id, child_id, {'probability': new_probability})
+    return True
+
+
+def delete_edge(store, parent_id, child_id):
+    """
+    Löscht die Kante zwischen zwei Knoten.
+    Die Kante kann nur gelöscht werden, wenn eine weitere Kante zum Kindknoten existiert.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param parent_id: ID des Elternknotens
+    :param child_id: ID des Kindknotens
+    :return: True, wenn die Kante gelöscht wurde, sonst False
+    """
+    # Überprüfe, ob es eine weitere Kante zum Kindknoten gibt
+    if len(store.edges_to(child_id)) <= 1:
+        flash("Die Kante kann nicht gelöscht werden, da keine zweite Kante zum Kindknoten existiert.", "error")
+        return False
+
+    store.remove_edge(parent_id, child_id)
+
+    # Überprüfe, ob der Kindknoten noch mit einem Elternknoten verbunden ist
+    if not store.first_parent_edge(child_id):
+        # Finde einen neuen Elternknoten für den Kindknoten
+        new_parent_id = find_new_parent_id(store, child_id)
+        if new_parent_id:
+            store.update_node(child_id, {'parent': new_parent_id})
+    return True
 
 
-def edit_edge_probability(data, node_id, new_probability):
+def edit_edge_probability(store, node_id, new_probability):
     """
     Bearbeitet die Wahrscheinlichkeit einer Kante.
     Überprüft, ob der neue Wahrscheinlichkeitswert eine gültige Zahl ist und aktualisiert die Kante entsprechend.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des Kindknotens der Kante
     :param new_probability: Neue Wahrscheinlichkeit für die Kante
     :return: None
     """
     try:
-        probability_value = float(new_probability.replace(',', '.'))
+        probability_value(new_probability)
     except ValueError:
         flash('Die Wahrscheinlichkeit muss einen Zahlenwert sein.', 'error')
         return
 
-    for edge in data['edges']:
-        if edge['child'] == node_id:
-            edge['probability'] = new_probability
-            break
+    edge = store.first_parent_edge(node_id)
+    if edge:
+        store.update_edge(edge['parent'], node_id, {'probability': new_probability})
 
 
-def edit_edge_color(data, node_id, new_color):
+def edit_edge_color(store, node_id, new_color):
     """
     Bearbeitet die Farbe einer Kante.
-    Durchsucht die Kanten nach der Kante mit der angegebenen Kindknoten-ID und aktualisiert deren Farbe.
+    Sucht die Kante mit der angegebenen Kindknoten-ID über den Index und aktualisiert deren Farbe.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des Kindknotens der Kante
     :param new_color: Neue Farbe für die Kante
     :return: None
     """
-    for edge in data['edges']:
-        if edge['child'] == node_id:
-            edge['color'] = new_color
-            break
+    edge = store.first_parent_edge(node_id)
+    if edge:
+        store.update_edge(edge['parent'], node_id, {'color': new_color})
 
 
 #def update_edge_probability(data, node_id, new_probability):
@@ -68,15 +129,15 @@ def edit_edge_color(data, node_id, new_color):
 #        edit_edge_probability(data, node_id, new_probability)
 
 
-def update_edge_color(data, node_id, new_and_or):
+def update_edge_color(store, node_id, new_and_or):
     """
     Aktualisiert die Farbe einer Kante basierend auf dem neuen AND/OR-Wert.
     Setzt die Farbe der Kante auf 'schwarz', wenn der neue Wert 'and' oder 'or' ist.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des Kindknotens der Kante
     :param new_and_or: Neuer AND/OR-Wert
     :return: None
     """
     if new_and_or:
-        edit_edge_color(data, node_id, 'black' if new_and_or == 'and' else 'black')
+        edit_edge_color(store, node_id, 'black' if new_and_or == 'and' else 'black')
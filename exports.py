@@ -0,0 +1,209 @@
+import csv
+import hashlib
+import io
+import threading
+import zlib
+from collections import OrderedDict
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import CondPageBreak, Image, LongTable, Paragraph, SimpleDocTemplate, TableStyle
+
+from metrics import METRICS, format_metric
+
+# Aufbau der PDF-Knotenübersicht: Knoten je Tabelle, Anteile der Spalten an der Seitenbreite und Schrift der Zellen
+PDF_SECTION_SIZE = 200
+PDF_SECTION_MIN_HEIGHT = 4 * cm
+PDF_COLUMN_SHARES = (0.3, 0.35, 0.35)
+PDF_CELL_PADDING = 6
+PDF_FONT = 'Helvetica'
+PDF_FONT_SIZE = 10
+# Bis zu dieser Anzahl an Knoten enthält die PDF-Knotenübersicht das Bild des Angriffsbaums
+PDF_TREE_IMAGE_LIMIT = 500
+
+
+class ExportCache:
+    """
+    Hält die zuletzt erzeugten Exporte (Bilder, CSV- und PDF-Dateien) im Speicher.
+    Die Einträge werden über einen Schlüssel aus Art bzw. Format und dem Stand des Angriffsbaums adressiert und
+    mit einem ETag aus dem Hash ihres Inhalts ausgeliefert. Überschreitet der Cache die maximale Anzahl an Einträgen
+    oder die maximale Größe, werden die am längsten ungenutzten Einträge verworfen.
+    """
+
+    def __init__(self, max_entries=16, max_bytes=64 * 1024 * 1024):
+        """
+        Erstellt einen leeren Export-Cache.
+
+        :param max_entries: Maximale Anzahl gespeicherter Exporte (über alle Formate)
+        :param max_bytes: Maximale Gesamtgröße der gespeicherten Exporte in Bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key, create):
+        """
+        Gibt einen Export aus dem Cache zurück oder erzeugt ihn einmalig.
+        Die Erzeugung läuft ohne gehaltene Sperre, damit gleichzeitige Exporte anderer Formate nicht warten müssen.
+
+        :param key: Schlüssel des Exports, z.B. ('csv', Version des Angriffsbaums)
+        :param create: Funktion ohne Parameter, die den Inhalt als Bytes erzeugt
+        :return: Tupel aus Inhalt und ETag
+        """
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        content = create()
+        entry = (content, hashlib.sha256(content).hexdigest()[:32])
+        with self.lock:
+            if key not in self._entries:
+                self._size += len(content)
+            else:
+                self._size += len(content) - len(self._entries[key][0])
+            self._entries[key] = entry
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._size -= len(self._entries.popitem(last=False)[1][0])
+        return entry
+
+
+def iter_nodes_csv(nodes, metric_index, metric_values, chunk_size=64 * 1024):
+    """
+    Erzeugt die Knotenübersicht als CSV blockweise: Name, eine Spalte je Attribut (Vereinigung der Attributnamen
+    aller Knoten in der Reihenfolge ihres ersten Auftretens) und die berechneten Kennzahlen je Knoten.
+    Die Zeilen werden über das csv-Modul geschrieben, sodass Kommas, Anführungszeichen und Zeilenumbrüche in Namen
+    und Werten korrekt maskiert werden. Es liegt immer nur ein Block im Speicher.
+
+    :param nodes: Liste der Knoten
+    :param metric_index: Dictionary von Knoten-ID zur Zeile in metric_values (siehe MetricEngine.metric_table)
+    :param metric_values: Matrix der Kennzahlen (Knoten × Kennzahlen)
+    :param chunk_size: Ungefähre Größe der gelieferten Blöcke in Zeichen
+    :return: Generator über die Blöcke der CSV-Datei als Bytes (UTF-8)
+    """
+    attribute_keys = list(dict.fromkeys(key for node in nodes for key in node.get('attributes') or {}))
+    no_metrics = [None] * len(METRICS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Name", *attribute_keys, *(label for label, _, _, _ in METRICS.values())])
+    for node in nodes:
+        attributes = node.get('attributes') or {}
+        position = metric_index.get(node['id'])
+        values = metric_values[position].tolist() if position is not None else no_metrics
+        writer.writerow([node['name'],
+                         *(attributes[key].get('value', '') if key in attributes else '' for key in attribute_keys),
+                         *(format_metric(value) for value in values)])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_gzip(chunks, level=6):
+    """
+    Komprimiert einen Datenstrom blockweise im gzip-Format.
+
+    :param chunks: Iterierbare Blöcke als Bytes
+    :param level: Kompressionsstufe (1 bis 9)
+    :return: Generator über die komprimierten Blöcke
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def wrap_cell(lines, width):
+    """
+    Bricht die Zeilen einer Tabellenzelle auf die Spaltenbreite um.
+    Zellen werden als einfacher Text statt als Paragraph gesetzt; das ist deutlich schneller und erfordert kein
+    Maskieren von Sonderzeichen.
+
+    :param lines: Zeilen der Zelle
+    :param width: Breite der Spalte in Punkten (ohne Innenabstand)
+    :return: Inhalt der Zelle mit Zeilenumbrüchen
+    """
+    parts = []
+    for line in lines:
+        if stringWidth(line, PDF_FONT, PDF_FONT_SIZE) <= width:
+            parts.append(line)
+        else:
+            parts.extend(simpleSplit(line, PDF_FONT, PDF_FONT_SIZE, width))
+    return "\n".join(parts)
+
+
+def build_nodes_pdf(nodes, metric_index, metric_values, tree_image=None, section_size=PDF_SECTION_SIZE):
+    """
+    Erstellt die Knotenübersicht als PDF-Dokument im Speicher: optional das gerenderte Bild des Angriffsbaums,
+    danach je Abschnitt von section_size Knoten eine Tabelle mit Name, Attributen und Kennzahlen.
+    Die Tabellen werden über Seiten hinweg geteilt und wiederholen ihre Kopfzeile auf jeder Seite; die
+    abwechselnden Zeilenfarben werden über einen einzigen ROWBACKGROUNDS-Befehl gesetzt. Da reportlab beim Teilen
+    einer Tabelle alle verbleibenden Zeilen kopiert, hält die Aufteilung in Abschnitte den Aufwand linear.
+    Das Dokument enthält keine Zeitstempel, sodass derselbe Stand immer dieselben Bytes (und denselben ETag) ergibt.
+
+    :param nodes: Liste der Knoten
+    :param metric_index: Dictionary von Knoten-ID zur Zeile in metric_values (siehe MetricEngine.metric_table)
+    :param metric_values: Matrix der Kennzahlen (Knoten × Kennzahlen)
+    :param tree_image: Optionales Bild des Angriffsbaums als PNG-Bytes
+    :param section_size: Anzahl der Knoten je Tabelle
+    :return: Inhalt der PDF-Datei als Bytes
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=True, pageCompression=1)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph("Knoten Übersicht", styles['Title'])]
+
+    if tree_image is not None:
+        image = ImageReader(io.BytesIO(tree_image))
+        image_width, image_height = image.getSize()
+        scale = min(doc.width / image_width, doc.height * 0.8 / image_height, 1)
+        elements.append(Image(io.BytesIO(tree_image), width=image_width * scale, height=image_height * scale))
+
+    column_widths = [doc.width * share for share in PDF_COLUMN_SHARES]
+    text_widths = [width - 2 * PDF_CELL_PADDING for width in column_widths]
+    labels = [label for label, _, _, _ in METRICS.values()]
+    no_metrics = [None] * len(METRICS)
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('FONTNAME', (0, 1), (-1, -1), PDF_FONT),
+        ('FONTSIZE', (0, 1), (-1, -1), PDF_FONT_SIZE),
+        ('ALIGN', (0, 1), (0, -1), 'RIGHT'),
+        ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.lightgrey, colors.white]),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+    for start in range(0, len(nodes), section_size):
+        section = nodes[start:start + section_size]
+        table_data = [["Name", "Attribute", "Kennzahlen"]]
+        for node in section:
+            attributes = node.get('attributes') or {}
+            position = metric_index.get(node['id'])
+            values = metric_values[position].tolist() if position is not None else no_metrics
+            table_data.append([
+                wrap_cell([node['name']], text_widths[0]),
+                wrap_cell([f"{key}: {value.get('value', '')}" for key, value in attributes.items()], text_widths[1]),
+                wrap_cell([f"{label}: {format_metric(value)}" for label, value in zip(labels, values)],
+                          text_widths[2]),
+            ])
+        if len(nodes) > section_size:
+            elements.append(CondPageBreak(PDF_SECTION_MIN_HEIGHT))
+            elements.append(Paragraph(f"Knoten {start + 1} bis {start + len(section)}", styles['Heading3']))
+        elements.append(LongTable(table_data, colWidths=column_widths, repeatRows=1, style=style))
+
+    doc.build(elements)
+    return buffer.getvalue()
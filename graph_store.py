@@ -0,0 +1,585 @@
+import threading
+from contextlib import contextmanager
+
+from attribute_index import AttributeIndex
+from metrics import MetricEngine
+from node_search import NodeSearchIndex
+from probability import ProbabilityEngine
+from storage import JsonStorage
+from topology import TopologyEngine
+from validation import ValidationIndex
+
+
+class VersionConflict(Exception):
+    """
+    Der Angriffsbaum wurde seit dem Stand, auf dem eine Änderung beruht, bereits geändert.
+    """
+
+    def __init__(self, version):
+        """
+        Erstellt den Fehler mit der aktuellen Version.
+
+        :param version: Die aktuelle Version des Angriffsbaums
+        """
+        super().__init__(f"Der Angriffsbaum wurde bereits geändert (aktuelle Version {version}).")
+        self.version = version
+
+
+class GraphStore:
+    """
+    Hält den Angriffsbaum prozessweit im Speicher und pflegt Indizes für schnelle Zugriffe.
+    Gelesen wird ausschließlich aus dem Speicher; das Speicher-Backend (JSON mit Journal oder SQLite)
+    wird nur beim Laden gelesen und erhält bei Änderungen lediglich die einzelnen Änderungseinträge.
+
+    Knoten und Kanten werden nie direkt verändert, sondern bei Änderungen durch neue Dictionaries ersetzt.
+    Alle Änderungen müssen daher über die Methoden des Speichers erfolgen.
+
+    Laufen mehrere Prozesse mit eigenem Speicher, erfolgen Änderungen in transaction(): Die Sperre des
+    Speicher-Backends wird gehalten, Änderungen anderer Prozesse werden nachgeholt und die erwartete Version
+    geprüft (optimistische Nebenläufigkeit). Lesende Zugriffe holen Änderungen mit refresh() nach, ohne auf
+    Schreibvorgänge zu warten.
+    """
+
+    def __init__(self, storage=None):
+        """
+        Erstellt einen leeren Speicher für das angegebene Speicher-Backend.
+
+        :param storage: Das Speicher-Backend (Standard: JsonStorage für 'config/attack_tree_data.json')
+        """
+        self.storage = storage or JsonStorage()
+        self.lock = threading.RLock()
+        self.version = 0
+        self.nodes_by_id = {}
+        self.name_to_id = {}
+        self.edge_index = {}
+        self.parent_edges = {}
+        self.child_edges = {}
+        self._shared = {}
+        self._signature = None
+        self.topology_version = 0
+        self.topology = TopologyEngine(self)
+        self.probabilities = ProbabilityEngine(self)
+        self.metrics = MetricEngine(self)
+        self.validation = ValidationIndex(self)
+        self.search = NodeSearchIndex(self)
+        self.attribute_index = AttributeIndex(self)
+        self._pending = []
+
+    def load(self):
+        """
+        Lädt den gespeicherten Stand, wendet die noch ausstehenden Änderungseinträge an und baut alle Indizes auf.
+
+        :return: None
+        """
+        signature = self.storage.signature()
+        data, records = self.storage.load()
+        self._replace(data)
+        self.version = data.get('version', 0)
+        for record in records:
+            self._apply(record)
+            self.version = record['v']
+        self._signature = signature
+
+    def refresh(self, blocking=False):
+        """
+        Holt Änderungen nach, die andere Prozesse in das Speicher-Backend geschrieben haben.
+        Ohne blocking wird nichts nachgeholt, solange ein anderer Thread dieses Prozesses den Speicher ändert;
+        lesende Zugriffe müssen so nie warten.
+
+        :param blocking: Ob auf laufende Änderungen in diesem Prozess gewartet werden soll
+        :return: True, wenn Änderungen nachgeholt wurden
+        """
+        signature = self.storage.signature()
+        if signature == self._signature or not self.lock.acquire(blocking=blocking):
+            return False
+        try:
+            if signature == self._signature:
+                return False
+            records = self.storage.changes(self.version)
+            if records is None:
+                self.load()
+                return True
+            for record in records:
+                self._apply(record)
+                self.version = record['v']
+            self._signature = signature
+            return bool(records)
+        finally:
+            self.lock.release()
+
+    @contextmanager
+    def transaction(self, expected_versions=None):
+        """
+        Führt Änderungen exklusiv über alle Threads und Prozesse hinweg aus und speichert sie am Ende.
+        Zuerst werden Änderungen anderer Prozesse nachgeholt; danach wird geprüft, ob der Stand noch der erwarteten
+        Version entspricht. Bei einem Fehler im with-Block werden alle noch nicht gespeicherten Änderungen verworfen.
+
+        :param expected_versions: Versionen, auf denen die Änderung beruhen darf (None für keine Prüfung)
+        :return: Kontextmanager, der den Speicher liefert
+        """
+        with self.lock, self.storage.locked():
+            self.refresh(blocking=True)
+            if expected_versions is not None and self.version not in expected_versions:
+                raise VersionConflict(self.version)
+            try:
+                yield self
+            except BaseException:
+                # Verworfen wird durch Neuladen, da bereits gespeicherte Änderungen erhalten bleiben müssen
+                self._pending = []
+                self.load()
+                raise
+            self.save()
+            self._signature = self.storage.signature()
+
+    def save(self):
+        """
+        Übergibt alle noch nicht gespeicherten Änderungen an das Speicher-Backend.
+
+        :return: None
+        """
+        with self.lock:
+            pending, self._pending = self._pending, []
+            self.storage.write(pending, self.snapshot)
+
+    def reset(self, data):
+        """
+        Ersetzt den Inhalt des Speichers durch die übergebenen Daten.
+        Der neue Stand wird sofort vollständig in das Speicher-Backend geschrieben.
+
+        :param data: Daten im JSON-Format mit 'nodes' und 'edges'
+        :return: None
+        """
+        with self.lock:
+            self._replace(data)
+            self._pending = []
+            self.version += 1
+            self.storage.replace(self.snapshot())
+
+    def checkpoint(self):
+        """
+        Merkt sich den aktuellen Stand, um ihn mit rollback() wiederherstellen zu können.
+        Da Knoten und Kanten nie direkt verändert werden, genügt eine flache Kopie der Listen.
+
+        :return: Der gemerkte Stand
+        """
+        return self.version, self.nodes, self.edges, len(self._pending)
+
+    def rollback(self, checkpoint):
+        """
+        Stellt einen mit checkpoint() gemerkten Stand wieder her und verwirft die seitdem vorgemerkten Änderungen.
+
+        :param checkpoint: Der gemerkte Stand
+        :return: None
+        """
+        version, nodes, edges, pending_count = checkpoint
+        self._replace({"nodes": nodes, "edges": edges})
+        self.version = version
+        del self._pending[pending_count:]
+
+    def to_dict(self):
+        """
+        Gibt den aktuellen Stand im JSON-Format zurück.
+
+        :return: Dictionary mit 'nodes' und 'edges'
+        """
+        return {"nodes": self.nodes, "edges": self.edges}
+
+    def snapshot(self):
+        """
+        Gibt den aktuellen Stand zusammen mit der Version für den Snapshot zurück.
+
+        :return: Dictionary mit 'version', 'nodes' und 'edges'
+        """
+        return {"version": self.version, "nodes": self.nodes, "edges": self.edges}
+
+    @property
+    def nodes(self):
+        """
+        Liste aller Knoten in Einfügereihenfolge.
+        """
+        return list(self.nodes_by_id.values())
+
+    @property
+    def edges(self):
+        """
+        Liste aller Kanten in Einfügereihenfolge.
+        """
+        return list(self.edge_index.values())
+
+    def node(self, node_id):
+        """
+        Gibt den Knoten mit der angegebenen ID zurück.
+
+        :param node_id: ID des Knotens
+        :return: Der Knoten oder None
+        """
+        return self.nodes_by_id.get(node_id)
+
+    def node_id_by_name(self, name):
+        """
+        Gibt die ID des Knotens mit dem angegebenen Namen zurück.
+
+        :param name: Name des Knotens
+        :return: ID des Knotens oder None
+        """
+        return self.name_to_id.get(name)
+
+    def edge(self, parent_id, child_id):
+        """
+        Gibt die Kante zwischen zwei Knoten zurück.
+
+        :param parent_id: ID des Elternknotens
+        :param child_id: ID des Kindknotens
+        :return: Die Kante oder None
+        """
+        return self.edge_index.get((parent_id, child_id))
+
+    def edges_to(self, child_id):
+        """
+        Gibt alle Kanten zurück, die in den angegebenen Knoten führen.
+
+        :param child_id: ID des Kindknotens
+        :return: Liste der Kanten
+        """
+        return list(self.parent_edges.get(child_id, {}).values())
+
+    def edges_from(self, parent_id):
+        """
+        Gibt alle Kanten zurück, die vom angegebenen Knoten ausgehen.
+
+        :param parent_id: ID des Elternknotens
+        :return: Liste der Kanten
+        """
+        return list(self.child_edges.get(parent_id, {}).values())
+
+    def first_parent_edge(self, child_id):
+        """
+        Gibt die erste Kante zurück, die in den angegebenen Knoten führt.
+
+        :param child_id: ID des Kindknotens
+        :return: Die Kante oder None
+        """
+        return next(iter(self.parent_edges.get(child_id, {}).values()), None)
+
+    def add_node(self, node):
+        """
+        Fügt einen Knoten hinzu und aktualisiert die Indizes.
+
+        :param node: Der neue Knoten
+        :return: None
+        """
+        self._add_node(node)
+        self._record('add_node', node=node)
+
+    def rename_node(self, node_id, new_name):
+        """
+        Ändert den Namen eines Knotens und aktualisiert den Namensindex.
+
+        :param node_id: ID des Knotens
+        :param new_name: Neuer Name des Knotens
+        :return: None
+        """
+        if node_id in self.nodes_by_id:
+            self._rename_node(node_id, new_name)
+            self._record('rename_node', id=node_id, name=new_name)
+
+    def update_node(self, node_id, values=None, removed=()):
+        """
+        Setzt oder entfernt Felder eines Knotens (z.B. 'group', 'attributes', 'parent').
+
+        :param node_id: ID des Knotens
+        :param values: Dictionary der zu setzenden Felder
+        :param removed: Namen der zu entfernenden Felder
+        :return: None
+        """
+        if node_id in self.nodes_by_id:
+            self._update_node(node_id, values or {}, list(removed))
+            self._record('update_node', id=node_id, set=values or {}, unset=list(removed))
+
+    def remove_node(self, node_id):
+        """
+        Entfernt einen Knoten und alle mit ihm verbundenen Kanten.
+
+        :param node_id: ID des Knotens
+        :return: None
+        """
+        if node_id in self.nodes_by_id:
+            self._remove_node(node_id)
+            self._record('remove_node', id=node_id)
+
+    def add_edge(self, edge):
+        """
+        Fügt eine Kante hinzu und aktualisiert die Adjazenzindizes.
+
+        :param edge: Die neue Kante
+        :return: None
+        """
+        self._add_edge(edge)
+        self._record('add_edge', edge=edge)
+
+    def update_edge(self, parent_id, child_id, values):
+        """
+        Setzt Felder einer Kante (z.B. 'probability' oder 'color').
+
+        :param parent_id: ID des Elternknotens
+        :param child_id: ID des Kindknotens
+        :param values: Dictionary der zu setzenden Felder
+        :return: Die geänderte Kante oder None
+        """
+        if (parent_id, child_id) not in self.edge_index:
+            return None
+        self._update_edge(parent_id, child_id, values)
+        self._record('update_edge', parent=parent_id, child=child_id, set=values)
+        return self.edge_index[(parent_id, child_id)]
+
+    def remove_edge(self, parent_id, child_id):
+        """
+        Entfernt die Kante zwischen zwei Knoten.
+
+        :param parent_id: ID des Elternknotens
+        :param child_id: ID des Kindknotens
+        :return: Die entfernte Kante oder None
+        """
+        edge = self._remove_edge(parent_id, child_id)
+        if edge is not None:
+            self._record('remove_edge', parent=parent_id, child=child_id)
+        return edge
+
+    def move_edge(self, edge, new_parent_id):
+        """
+        Hängt eine Kante an einen neuen Elternknoten um.
+        Besteht bereits eine Kante vom neuen Elternknoten zum Kindknoten, bleibt diese erhalten und die umgehängte
+        Kante entfällt, statt sie zu überschreiben.
+
+        :param edge: Die umzuhängende Kante
+        :param new_parent_id: ID des neuen Elternknotens
+        :return: None
+        """
+        if self._move_edge(edge['parent'], edge['child'], new_parent_id):
+            self._record('move_edge', parent=edge['parent'], child=edge['child'], new_parent=new_parent_id)
+
+    def _record(self, op, **fields):
+        """
+        Vergibt die nächste Version und merkt die Änderung für das Speicher-Backend vor.
+        Da Knoten und Kanten nie direkt verändert werden, kann der Eintrag unverändert vorgemerkt werden.
+
+        :param op: Name der Operation
+        :param fields: Parameter der Operation
+        :return: None
+        """
+        self.version += 1
+        self._pending.append({"v": self.version, "op": op, **fields})
+
+    def _apply(self, record):
+        """
+        Wendet einen Journal-Eintrag auf den Speicher an, ohne ihn erneut aufzuzeichnen.
+
+        :param record: Der Journal-Eintrag
+        :return: None
+        """
+        op = record['op']
+        if op == 'add_node':
+            self._add_node(record['node'])
+        elif op == 'rename_node':
+            self._rename_node(record['id'], record['name'])
+        elif op == 'update_node':
+            self._update_node(record['id'], record['set'], record['unset'])
+        elif op == 'remove_node':
+            self._remove_node(record['id'])
+        elif op == 'add_edge':
+            self._add_edge(record['edge'])
+        elif op == 'update_edge':
+            self._update_edge(record['parent'], record['child'], record['set'])
+        elif op == 'remove_edge':
+            self._remove_edge(record['parent'], record['child'])
+        elif op == 'move_edge':
+            self._move_edge(record['parent'], record['child'], record['new_parent'])
+
+    def _replace(self, data):
+        """
+        Ersetzt den Inhalt des Speichers und baut die Indizes neu auf.
+
+        :param data: Daten im JSON-Format mit 'nodes' und 'edges'
+        :return: None
+        """
+        self.nodes_by_id = {}
+        self.name_to_id = {}
+        self.edge_index = {}
+        self.parent_edges = {}
+        self.child_edges = {}
+        self._shared = {}
+        self.validation.clear()
+        self.search.clear()
+        self.attribute_index.clear()
+        self.topology_version += 1
+        for node in data.get('nodes', []):
+            self._add_node(node)
+        for edge in data.get('edges', []):
+            self._add_edge(edge)
+
+    def _share(self, value):
+        """
+        Gibt für gleiche Strings (z.B. Wahrscheinlichkeiten, Farben, Attributnamen) immer dasselbe Objekt zurück,
+        damit wiederkehrende Werte nur einmal im Speicher liegen.
+
+        :param value: Der Wert
+        :return: Der gemeinsam genutzte String oder der unveränderte Wert, falls er kein String ist
+        """
+        if type(value) is not str:
+            return value
+        return self._shared.setdefault(value, value)
+
+    def _compact_node(self, node):
+        """
+        Gibt eine Kopie des Knotens zurück, deren wiederkehrende Strings gemeinsam genutzt werden.
+        Beim Laden erzeugt der JSON-Parser für jedes Vorkommen eines Wertes einen eigenen String.
+
+        :param node: Der Knoten
+        :return: Der Knoten mit gemeinsam genutzten Strings
+        """
+        share = self._share
+        compact = {key: (value if key in ('id', 'name') else share(value)) for key, value in node.items()}
+        attributes = node.get('attributes')
+        if isinstance(attributes, dict):
+            compact['attributes'] = {
+                share(name): ({share(key): share(value) for key, value in attribute.items()}
+                              if isinstance(attribute, dict) else attribute)
+                for name, attribute in attributes.items()
+            }
+        return compact
+
+    def _compact_edge(self, edge):
+        """
+        Gibt eine Kopie der Kante zurück, deren Strings gemeinsam genutzt werden.
+        Eltern- und Kind-ID verweisen auf dasselbe String-Objekt wie die ID des jeweiligen Knotens.
+
+        :param edge: Die Kante
+        :return: Die Kante mit gemeinsam genutzten Strings
+        """
+        compact = {key: self._share(value) for key, value in edge.items()}
+        for key in ('parent', 'child'):
+            node = self.nodes_by_id.get(edge.get(key))
+            if node is not None:
+                compact[key] = node['id']
+        return compact
+
+    def _add_node(self, node):
+        """
+        Fügt einen Knoten hinzu, ohne die Änderung aufzuzeichnen.
+        """
+        node = self._compact_node(node)
+        old_node = self.nodes_by_id.get(node['id'])
+        self.nodes_by_id[node['id']] = node
+        self.name_to_id[node['name']] = node['id']
+        self.validation.node_changed(old_node, node)
+        self.search.node_changed(old_node, node)
+        self.attribute_index.node_changed(old_node, node)
+        self.topology_version += 1
+
+    def _rename_node(self, node_id, new_name):
+        """
+        Ersetzt den Knoten durch eine Kopie mit neuem Namen, ohne die Änderung aufzuzeichnen.
+        """
+        node = self.nodes_by_id.get(node_id)
+        if node is None:
+            return
+        if self.name_to_id.get(node['name']) == node_id:
+            del self.name_to_id[node['name']]
+        self.nodes_by_id[node_id] = {**node, 'name': new_name}
+        self.name_to_id[new_name] = node_id
+        self.search.node_changed(node, self.nodes_by_id[node_id])
+
+    def _update_node(self, node_id, values, removed):
+        """
+        Ersetzt den Knoten durch eine Kopie mit geänderten Feldern, ohne die Änderung aufzuzeichnen.
+        """
+        node = self.nodes_by_id.get(node_id)
+        if node is None:
+            return
+        old_node = node
+        node = self._compact_node({**node, **values})
+        for key in removed:
+            node.pop(key, None)
+        self.nodes_by_id[node_id] = node
+        self.validation.node_changed(old_node, node)
+        self.search.node_changed(old_node, node)
+        self.attribute_index.node_changed(old_node, node)
+        self.metrics.invalidate(node_id)
+        if old_node.get('group') != node.get('group'):
+            # Die Gruppe bestimmt, wie die Elternknoten ihre Kindknoten verknüpfen (AND-Term oder Alternative)
+            for parent_id in self.parent_edges.get(node_id, {}):
+                self.metrics.invalidate(parent_id)
+
+    def _remove_node(self, node_id):
+        """
+        Entfernt einen Knoten samt Kanten, ohne die Änderung aufzuzeichnen.
+        """
+        node = self.nodes_by_id.pop(node_id, None)
+        if node is None:
+            return
+        if self.name_to_id.get(node['name']) == node_id:
+            del self.name_to_id[node['name']]
+        self.validation.node_changed(node, None)
+        self.search.node_changed(node, None)
+        self.attribute_index.node_changed(node, None)
+        self.topology_version += 1
+        for edge in self.edges_to(node_id) + self.edges_from(node_id):
+            self._remove_edge(edge['parent'], edge['child'])
+
+    def _add_edge(self, edge):
+        """
+        Fügt eine Kante hinzu, ohne die Änderung aufzuzeichnen.
+        """
+        edge = self._compact_edge(edge)
+        old_edge = self.edge_index.get((edge['parent'], edge['child']))
+        self.edge_index[(edge['parent'], edge['child'])] = edge
+        self.parent_edges.setdefault(edge['child'], {})[edge['parent']] = edge
+        self.child_edges.setdefault(edge['parent'], {})[edge['child']] = edge
+        self.validation.edge_changed(old_edge, edge)
+        self.topology_version += 1
+
+    def _update_edge(self, parent_id, child_id, values):
+        """
+        Ersetzt die Kante durch eine Kopie mit geänderten Feldern, ohne die Änderung aufzuzeichnen.
+        """
+        old_edge = self.edge_index.get((parent_id, child_id))
+        if old_edge is None:
+            return
+        edge = self._compact_edge({**old_edge, **values})
+        self.edge_index[(parent_id, child_id)] = edge
+        self.parent_edges[child_id][parent_id] = edge
+        self.child_edges[parent_id][child_id] = edge
+        self.validation.edge_changed(old_edge, edge)
+        self.metrics.invalidate(parent_id)
+
+    def _remove_edge(self, parent_id, child_id):
+        """
+        Entfernt eine Kante, ohne die Änderung aufzuzeichnen.
+        """
+        edge = self.edge_index.pop((parent_id, child_id), None)
+        if edge is None:
+            return None
+        parents = self.parent_edges.get(child_id, {})
+        parents.pop(parent_id, None)
+        if not parents:
+            self.parent_edges.pop(child_id, None)
+        children = self.child_edges.get(parent_id, {})
+        children.pop(child_id, None)
+        if not children:
+            self.child_edges.pop(parent_id, None)
+        self.validation.edge_changed(edge, None)
+        self.topology_version += 1
+        return edge
+
+    def _move_edge(self, parent_id, child_id, new_parent_id):
+        """
+        Hängt eine Kante um, ohne die Änderung aufzuzeichnen.
+        """
+        if parent_id == new_parent_id:
+            return False
+        edge = self._remove_edge(parent_id, child_id)
+        if edge is None:
+            return False
+        if (new_parent_id, child_id) not in self.edge_index:
+            self._add_edge({**edge, 'parent': new_parent_id})
+        return True
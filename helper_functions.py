@@ -2,7 +2,17 @@ import json
 import os
 
 from flask import flash
-from graphviz import Digraph
+from graphviz import FORMATS
+from graphviz.quoting import ESCAPE_UNESCAPED_QUOTES, HTML_STRING, ID, KEYWORDS, quote_edge
+
+from exports import ExportCache
+from probability import probability_value
+from render_cache import RenderCache, write_file_atomic
+from render_queue import RenderScheduler, render_source
+
+render_cache = RenderCache()
+render_scheduler = RenderScheduler(render_cache, max_workers=int(os.environ.get('ATTACK_TREE_RENDER_WORKERS', 2)))
+export_cache = ExportCache()
 
 
 def load_data(file_path='config/attack_tree_data.json'):
@@ -19,12 +29,13 @@ def load_data(file_path='config/attack_tree_data.json'):
 def save_data(data, file_path='config/attack_tree_data.json'):
     """
     Speichert die Daten in die JSON-Datei.
+    Schreibt zunächst in eine temporäre Datei und ersetzt die JSON-Datei anschließend in einem Schritt,
+    sodass bei einem Absturz immer ein vollständiger Stand erhalten bleibt.
     :param data: Die zu speichernden Daten
     :param file_path: Pfad zur JSON-Datei
     :return: None
     """
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4)
+    write_file_atomic(file_path, json.dumps(data, indent=4).encode('utf-8'), sync=True)
 
 
 def initialize_data_file(file_path, initial_data):
@@ -39,22 +50,90 @@ def initialize_data_file(file_path, initial_data):
             json.dump(initial_data, file, indent=4)
 
 
-def create_attack_tree_image(nodes, edges, file_path='static/attack_tree', format='svg'):
+def export_attack_tree(nodes, edges, format='svg', highlighted_edges=None):
     """
-    Erstellt ein Attack-Tree-Bild basierend auf den Knoten und Kanten.
-    Fügt Knoten und Kanten zum Diagramm hinzu und gruppiert Knoten in AND-Gruppen.
-    Rendert das Bild und speichert es im angegebenen Dateipfad.
+    Gibt einen Angriffsbaum im angegebenen Format für den Download zurück, ohne eine Datei zu schreiben.
+    Der Export wird im Export-Cache gehalten; bei einem Fehlschlag wird ein bereits gerendertes Bild aus dem
+    Render-Cache gelesen oder Graphviz direkt in den Speicher gerendert.
 
     :param nodes: Liste der Knoten
     :param edges: Liste der Kanten
-    :param file_path: Pfad, unter dem das Bild gespeichert wird
     :param format: Format des Bildes (Standard: 'svg')
-    :return: None
+    :param highlighted_edges: Optionale Menge von Kanten (Eltern-ID, Kind-ID), die hervorgehoben werden
+    :return: Tupel aus Inhalt als Bytes und ETag
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unbekanntes Format: {format}")
+    source = build_attack_tree_source(nodes, edges, highlighted_edges=highlighted_edges)
+    key = render_cache.key(source)
+
+    def create():
+        path = render_cache.get(key, format)
+        if path is not None:
+            try:
+                with open(path, 'rb') as file:
+                    return file.read()
+            except FileNotFoundError:
+                pass
+        return render_source(source, format)
+
+    return export_cache.get(('image', format, key), create)
+
+
+def build_attack_tree_source(nodes, edges, node_probabilities=None, highlighted_edges=None, edge_colors=None):
+    """
+    Erstellt die DOT-Quelle des Angriffsbaums basierend auf den Knoten und Kanten.
+
+    :param nodes: Liste der Knoten
+    :param edges: Liste der Kanten
+    :param node_probabilities: Optionales Dictionary von Knoten-ID zu Erfolgswahrscheinlichkeit für die Beschriftung
+    :param highlighted_edges: Optionale Menge von Kanten (Eltern-ID, Kind-ID), die hervorgehoben werden
+    :param edge_colors: Optionales Dictionary von (Eltern-ID, Kind-ID) zu Farbe, ersetzt die Farbe der Kanten
+    :return: DOT-Quelltext als String
+    """
+    return ''.join(iter_attack_tree_dot(nodes, edges, node_probabilities, highlighted_edges, edge_colors))
+
+
+def iter_attack_tree_dot(nodes, edges, node_probabilities=None, highlighted_edges=None, edge_colors=None):
+    """
+    Erzeugt die DOT-Quelle des Angriffsbaums zeilenweise.
+    Fügt Knoten und Kanten zum Diagramm hinzu und gruppiert Knoten in AND-Gruppen.
+    Gruppenzugehörigkeit und Wahrscheinlichkeitssummen der Gruppen werden vorab in einem Durchlauf
+    über die Kanten bestimmt, sodass die Laufzeit linear in der Anzahl der Knoten und Kanten bleibt.
+
+    :param nodes: Liste der Knoten
+    :param edges: Liste der Kanten
+    :param node_probabilities: Optionales Dictionary von Knoten-ID zu Erfolgswahrscheinlichkeit für die Beschriftung
+    :param highlighted_edges: Optionale Menge von Kanten (Eltern-ID, Kind-ID), die rot und breiter gezeichnet werden
+    :param edge_colors: Optionales Dictionary von (Eltern-ID, Kind-ID) zu Farbe, ersetzt die Farbe der Kanten
+    :return: Generator, der die Zeilen der DOT-Quelle liefert
     """
-    dot = Digraph()
-    #dot.attr(rankdir='TB', nodesep='0.2', ranksep='0.2')  # Minimale Abstände setzen
+    quoted = {}
+
+    def q(identifier):
+        # Jeder Bezeichner wird nur einmal maskiert, Kanten verwenden die Ergebnisse der Knoten wieder
+        result = quoted.get(identifier)
+        if result is None:
+            result = quoted[identifier] = quote_dot_id(identifier)
+        return result
 
     group_to_nodes = create_and_groups(nodes)  # Funktion, die AND-Gruppen erstellt.
+    node_to_group = {
+        node_id: group for group, children in group_to_nodes.items() if group for node_id in children
+    }
+
+    # Wahrscheinlichkeitssumme je Gruppe und Gruppen mit eigenen Kindknoten bestimmen
+    group_probability = {group: 0.0 for group in group_to_nodes if group}
+    groups_with_children = set()
+    for edge in edges:
+        child_group = node_to_group.get(edge['child'])
+        if child_group:
+            group_probability[child_group] += probability_value(edge['probability'])
+        parent_group = node_to_group.get(edge['parent'])
+        if parent_group:
+            groups_with_children.add(parent_group)
+
+    yield 'digraph {\n'
 
     # Knoten hinzufügen
     for node in nodes:
@@ -63,7 +142,9 @@ def create_attack_tree_image(nodes, edges, file_path='static/attack_tree', forma
         for key, value in attributes.items():
             if value.get('display_in_tree', 'false').lower() == 'true':
                 label += f"<br/>{key}: {value['value']}"
-        dot.node(node['id'], f"<{label}>", shape='box')
+        if node_probabilities is not None and node_probabilities.get(node['id']) is not None:
+            label += f"<br/><i>P(Erfolg): {node_probabilities[node['id']]:.4f}</i>"
+        yield f"\t{q(node['id'])} [label={q(f'<{label}>')} shape=box]\n"
 
     cluster_index = 0
     group_to_cluster = {}
@@ -71,36 +152,27 @@ def create_attack_tree_image(nodes, edges, file_path='static/attack_tree', forma
     # Subgraphen (AND-Gruppen) hinzufügen
     for group, children in group_to_nodes.items():
         if group:  # Nur Gruppen mit Knoten berücksichtigen
-            total_probability = sum(
-                float(edge['probability'].replace(',', '.')) for edge in edges if edge['child'] in children)
-            total_probability = f"{total_probability:.2f}"  # Format auf 2 Dezimalstellen
-
-            with dot.subgraph(name=f'cluster_{cluster_index}') as c:
-                c.attr(
-                    style='dashed',
-                    label=f"AND Group: {group} (Total Prob.: {total_probability})",
-                    labelloc="t",
-                    labeljust="l",
-                    fontsize="12",
-                )
-
-                # Dummy-Node für die mittige Platzierung
-                if any(edge['parent'] in children for edge in edges):
-                    dummy_node_id = f"dummy_{cluster_index}"
-                    c.node(dummy_node_id, shape='point', width='0.01', height='0.01')
-
-                    for child in children:
-                        c.edge(child, dummy_node_id, minlen='1')
-
-                    group_to_cluster[group] = dummy_node_id
-
-                # Alle Kinderknoten hinzufügen
+            total_probability = f"{group_probability[group]:.2f}"  # Format auf 2 Dezimalstellen
+            label = quote_dot_id(f"AND Group: {group} (Total Prob.: {total_probability})")
+
+            yield f"\tsubgraph cluster_{cluster_index} {{\n"
+            yield f"\t\tfontsize=12 label={label} labeljust=l labelloc=t style=dashed\n"
+
+            # Dummy-Node für die mittige Platzierung
+            if group in groups_with_children:
+                dummy_node_id = f"dummy_{cluster_index}"
+                yield f"\t\t{dummy_node_id} [height=0.01 shape=point width=0.01]\n"
+
                 for child in children:
-                    c.node(child)
+                    yield f"\t\t{quote_dot_edge(child, q)} -> {dummy_node_id} [minlen=1]\n"
 
-                # Unsichtbare Kanten zwischen Kindern und Dummy-Node
+                group_to_cluster[group] = dummy_node_id
 
+            # Alle Kinderknoten hinzufügen
+            for child in children:
+                yield f"\t\t{q(child)}\n"
 
+            yield "\t}\n"
             cluster_index += 1
 
     # Kanten hinzufügen
@@ -110,12 +182,22 @@ def create_attack_tree_image(nodes, edges, file_path='static/attack_tree', forma
         parent = edge['parent']
         child = edge['child']
 
+        if edge_colors:
+            color = edge_colors.get((parent, child), color)
+
+        # Hervorgehobene Kanten (z.B. Angriffspfade) rot und breiter zeichnen
+        style = ''
+        if highlighted_edges and (parent, child) in highlighted_edges:
+            color = 'red'
+            style = ' penwidth=2.5'
+
         # Falls der Parent Teil einer Gruppe ist, Dummy-Node verwenden
-        parent_group = next((group for group, children in group_to_nodes.items() if parent in children), None)
+        parent_group = node_to_group.get(parent)
         if parent_group:
             parent = group_to_cluster[parent_group]
 
-        dot.edge(parent, child, label=label, color=color)
+        yield (f"\t{quote_dot_edge(parent, q)} -> {quote_dot_edge(child, q)}"
+               f" [label={q(label)} color={q(color)}{style}]\n")
 
     # Legende hinzufügen
 # legend = '''<
@@ -127,8 +209,68 @@ def create_attack_tree_image(nodes, edges, file_path='static/attack_tree', forma
 # >'''
 # dot.attr(label=legend, labelloc="b", labeljust="l")
 
-    # Bild rendern
-    dot.render(file_path, format=format, cleanup=True)
+    yield '}\n'
+
+
+def heatmap_color(value):
+    """
+    Gibt die Farbe einer Heatmap (blau über gelb nach rot) für einen Wert zwischen 0 und 1 zurück.
+
+    :param value: Wert zwischen 0 und 1
+    :return: Farbe als Hex-String (z.B. '#d7191c')
+    """
+    stops = ((0.0, (44, 123, 182)), (0.5, (255, 255, 191)), (1.0, (215, 25, 28)))
+    value = min(max(value, 0.0), 1.0)
+    for (start, low), (end, high) in zip(stops, stops[1:]):
+        if value <= end:
+            ratio = (value - start) / (end - start)
+            return '#' + ''.join(f"{round(a + (b - a) * ratio):02x}" for a, b in zip(low, high))
+    return '#d7191c'
+
+
+def sensitivity_edge_colors(sensitivities):
+    """
+    Erstellt die Kantenfarben für die Sensitivitäts-Heatmap.
+    Die Farbe richtet sich nach dem Betrag der Ableitung im Verhältnis zur größten Ableitung.
+
+    :param sensitivities: Liste von Tupeln aus (Eltern-ID, Kind-ID) und Ableitung
+    :return: Dictionary von (Eltern-ID, Kind-ID) zu Farbe
+    """
+    largest = max((abs(gradient) for _, gradient in sensitivities), default=0.0)
+    if not largest:
+        return {edge: heatmap_color(0.0) for edge, _ in sensitivities}
+    return {edge: heatmap_color(abs(gradient) / largest) for edge, gradient in sensitivities}
+
+
+def quote_dot_id(identifier):
+    """
+    Maskiert einen Bezeichner für die DOT-Sprache, falls nötig.
+    Entspricht graphviz.quoting.quote, verzichtet aber auf dessen Aufruf-Overhead.
+
+    :param identifier: Der Bezeichner (ID, Label oder Attributwert)
+    :return: Der maskierte Bezeichner
+    """
+    if HTML_STRING.match(identifier):
+        return identifier
+    if not ID.match(identifier) or identifier.lower() in KEYWORDS:
+        if '"' in identifier:
+            identifier = ESCAPE_UNESCAPED_QUOTES(identifier)
+        return f'"{identifier}"'
+    return identifier
+
+
+def quote_dot_edge(identifier, quote):
+    """
+    Maskiert einen Knotenbezeichner für eine Kantenanweisung.
+    Bezeichner mit Port-Angabe (':') werden an graphviz.quoting.quote_edge übergeben.
+
+    :param identifier: Der Knotenbezeichner
+    :param quote: Funktion zum Maskieren einfacher Bezeichner
+    :return: Der maskierte Bezeichner
+    """
+    if ':' in identifier:
+        return quote_edge(identifier)
+    return quote(identifier)
 
 
 def create_and_groups(nodes):
@@ -148,60 +290,16 @@ def create_and_groups(nodes):
             group_to_nodes[group].append(node['id'])
     return group_to_nodes
 
-def check_and_groups_with_single_node(nodes):
-    """
-    Überprüft, ob es AND-Gruppen mit nur einem Knoten gibt.
-    Durchsucht die Knoten nach AND-Gruppen und überprüft deren Größe.
-    Zeigt eine Info-Nachricht an, wenn eine AND-Gruppe nur einen Knoten enthält.
-
-    :param nodes: Liste der Knoten
-    :return: None
-    """
-    group_to_nodes = create_and_groups(nodes)
-
-    for group, children in group_to_nodes.items():
-        if len(children) == 1:
-            flash(f"Die AND Verknüpfung '{group}' besitzt nur einen Node!", 'info')
-
-
-def check_parent_nodes_probability(nodes, edges):
-    """
-    Überprüft, ob ein Elternknoten Kinder mit einer Gesamtwahrscheinlichkeit ungleich 1 hat.
-    Durchsucht die Kanten und berechnet die Gesamtwahrscheinlichkeit der Kinder für jeden Elternknoten.
-    Zeigt eine Info-Nachricht an, wenn die Gesamtwahrscheinlichkeit ungleich 1 ist.
-
-    :param nodes: Liste der Knoten
-    :param edges: Liste der Kanten
-    :return: None
-    """
-    id_to_name = {node['id']: node['name'] for node in nodes}
-    parent_to_children_prob = {}
-
-    for edge in edges:
-        parent = edge['parent']
-        probability = float(edge['probability'].replace(',', '.'))
-        if parent not in parent_to_children_prob:
-            parent_to_children_prob[parent] = 0
-        parent_to_children_prob[parent] += probability
-
-    for parent, total_probability in parent_to_children_prob.items():
-        total_probability = round(total_probability, 2)
-        if total_probability != 1:
-            parent_name = id_to_name.get(parent, 'Unbekannt')
-            flash(f"Der Knoten '{parent_name}' hat Kinder mir einer Gesamtwahrscheinlichkeit von {total_probability} !", 'info')
-
-def find_new_parent_id(data, child_id):
+def find_new_parent_id(store, child_id):
     """
     Findet die neue Eltern-ID für einen gegebenen Kindknoten.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param child_id: ID des Kindknotens
     :return: Neue Eltern-ID oder None
     """
-    new_parent_id = next((edge['parent'] for edge in data['edges'] if edge['child'] == child_id), None)
+    parent_edge = store.first_parent_edge(child_id)
+    new_parent_id = parent_edge['parent'] if parent_edge else None
     if new_parent_id:
-        for node in data['nodes']:
-            if node['id'] == child_id:
-                node['parent'] = new_parent_id
-                break
+        store.update_node(child_id, {'parent': new_parent_id})
     return new_parent_id
\ No newline at end of file
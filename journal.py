@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class MutationJournal:
+    """
+    Append-only Journal für Änderungen am Angriffsbaum.
+    Jede Änderung wird als kompakte JSON-Zeile mit laufender Versionsnummer angehängt.
+    Beim Verdichten wird das Journal in eine zweite Datei verschoben, bis der neue Snapshot geschrieben ist.
+    """
+
+    def __init__(self, file_path, compact_threshold=4 * 1024 * 1024):
+        """
+        Erstellt das Journal für den angegebenen Pfad.
+
+        :param file_path: Pfad zur Journal-Datei
+        :param compact_threshold: Größe in Bytes, ab der das Journal verdichtet werden soll
+        """
+        self.file_path = file_path
+        self.rotated_path = f"{file_path}.1"
+        self.compact_threshold = compact_threshold
+        self.size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+    def read(self, after_version=0):
+        """
+        Liest alle Einträge mit einer Version größer als after_version in der gespeicherten Reihenfolge.
+        Eine Zeile ohne Zeilenumbruch am Dateiende (gerade geschrieben oder nach einem Absturz beim Schreiben
+        abgebrochen) wird ignoriert; beschädigte Zeilen werden protokolliert und übersprungen.
+
+        :param after_version: Version des Snapshots, auf den die Einträge angewendet werden
+        :return: Generator über die Einträge als Dictionaries
+        """
+        for path in (self.rotated_path, self.file_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as file:
+                for number, line in enumerate(file, 1):
+                    if not line.endswith('\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning("Beschädigte Zeile %d im Journal %s wird übersprungen.", number, path)
+                        continue
+                    if record['v'] > after_version:
+                        yield record
+
+    def append(self, lines):
+        """
+        Hängt Einträge an das Journal an und schreibt sie dauerhaft auf die Festplatte.
+        Die Größe wird danach aus der Datei übernommen, da auch andere Prozesse anhängen können.
+
+        :param lines: Liste der bereits serialisierten Einträge (ohne Zeilenumbruch)
+        :return: None
+        """
+        content = ''.join(f"{line}\n" for line in lines).encode('utf-8')
+        with open(self.file_path, 'a+b') as file:
+            self._truncate_torn_tail(file)
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+            self.size = file.tell()
+
+    def _truncate_torn_tail(self, file, block_size=4096):
+        """
+        Schneidet eine unvollständige letzte Zeile (nach einem Absturz beim Schreiben) ab, damit neue Einträge
+        nicht an sie angehängt werden und beim Lesen mit ihr verloren gehen.
+        Muss unter der Sperre des Speicher-Backends aufgerufen werden.
+
+        :param file: Die im Modus 'a+b' geöffnete Journal-Datei
+        :param block_size: Größe der rückwärts gelesenen Blöcke in Bytes
+        :return: None
+        """
+        end = file.seek(0, os.SEEK_END)
+        if not end:
+            return
+        file.seek(end - 1)
+        if file.read(1) == b'\n':
+            return
+        keep = 0
+        position = end
+        while position > 0:
+            start = max(position - block_size, 0)
+            file.seek(start)
+            index = file.read(position - start).rfind(b'\n')
+            if index >= 0:
+                keep = start + index + 1
+                break
+            position = start
+        logger.warning("Unvollständige letzte Zeile im Journal %s (%d Bytes) wird abgeschnitten.",
+                       self.file_path, end - keep)
+        file.truncate(keep)
+
+    def needs_compaction(self):
+        """
+        Überprüft, ob das Journal die Größe für eine Verdichtung erreicht hat.
+
+        :return: True, wenn verdichtet werden soll, sonst False
+        """
+        return self.size >= self.compact_threshold
+
+    def rotate(self):
+        """
+        Verschiebt das aktuelle Journal zur Seite, damit neue Einträge in eine leere Datei geschrieben werden.
+        Existiert noch ein verschobenes Journal aus einer abgebrochenen Verdichtung, wird das aktuelle angehängt.
+
+        :return: None
+        """
+        if os.path.exists(self.file_path):
+            if os.path.exists(self.rotated_path):
+                with open(self.file_path, 'rb') as source, open(self.rotated_path, 'a+b') as target:
+                    self._truncate_torn_tail(target)
+                    target.write(source.read())
+                os.remove(self.file_path)
+            else:
+                os.replace(self.file_path, self.rotated_path)
+        self.size = 0
+
+    def discard_rotated(self):
+        """
+        Löscht das verschobene Journal, nachdem dessen Einträge im Snapshot enthalten sind.
+
+        :return: None
+        """
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def clear(self):
+        """
+        Löscht alle Journal-Dateien.
+
+        :return: None
+        """
+        self.discard_rotated()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        self.size = 0
@@ -0,0 +1,329 @@
+import heapq
+import math
+import threading
+
+import numpy as np
+
+from probability import parse_probability
+
+# Kennzahlen als Halbringe: (Bezeichnung, Attributnamen, Verknüpfung für AND, Verknüpfung mit dem eigenen Wert).
+# OR wählt immer das Minimum (die günstigste Alternative).
+METRICS = {
+    'cost': ("Minimale Kosten", ('cost', 'kosten'), 'sum', 'sum'),
+    'time': ("Minimale Zeit (parallel)", ('time', 'zeit', 'dauer'), 'max', 'sum'),
+    'time_sequential': ("Minimale Zeit (sequenziell)", ('time', 'zeit', 'dauer'), 'sum', 'sum'),
+    'skill': ("Minimale Fähigkeit", ('skill', 'fähigkeit'), 'max', 'max'),
+}
+METRIC_NAMES = list(METRICS)
+_AND_SUM = np.array([spec[2] == 'sum' for spec in METRICS.values()])
+_OWN_SUM = np.array([spec[3] == 'sum' for spec in METRICS.values()])
+
+
+def parse_metric_values(attributes):
+    """
+    Liest die numerischen Attribute eines Knotens für alle Kennzahlen.
+    Attributnamen werden ohne Beachtung der Groß- und Kleinschreibung verglichen; fehlende oder nicht
+    numerische Werte sind unbekannt (NaN) und zählen nicht als kostenlos.
+
+    :param attributes: Attribute des Knotens (siehe create_attributes_dict)
+    :return: Liste der Werte in der Reihenfolge von METRIC_NAMES
+    """
+    values = {}
+    for name, attribute in (attributes or {}).items():
+        try:
+            values[name.strip().lower()] = float(str(attribute.get('value', '')).replace(',', '.'))
+        except ValueError:
+            continue
+    result = []
+    for _, names, _, _ in METRICS.values():
+        value = next((values[name] for name in names if name in values), math.nan)
+        result.append(value if np.isfinite(value) else math.nan)
+    return result
+
+
+def format_metric(value):
+    """
+    Formatiert den Wert einer Kennzahl für die Anzeige und die Exporte.
+
+    :param value: Wert (unendlich, falls kein Angriff möglich ist; NaN, falls der Wert unbekannt ist) oder None
+    :return: Wert als String ('-', falls kein Angriff möglich ist, '?', falls der Wert unbekannt ist)
+    """
+    if value is None or math.isinf(value):
+        return '-'
+    if math.isnan(value):
+        return '?'
+    return f"{value:g}"
+
+
+def combine_and(first, second):
+    """
+    Verknüpft die Kennzahlen zweier Teilangriffe, die beide ausgeführt werden müssen (AND).
+    Ist einer der Teilangriffe nicht möglich (unendlich), ist es auch die Verknüpfung, selbst wenn der andere
+    Wert unbekannt ist.
+
+    :param first: Werte des ersten Teilangriffs
+    :param second: Werte des zweiten Teilangriffs
+    :return: Verknüpfte Werte
+    """
+    return np.where(np.isinf(first) | np.isinf(second), np.inf,
+                    np.where(_AND_SUM, first + second, np.maximum(first, second)))
+
+
+def combine_own(own, children):
+    """
+    Verknüpft die eigenen Werte eines Knotens mit den Werten seiner Kindknoten.
+    Ein fehlender eigener Wert (NaN) ist bei Knoten mit Kindknoten neutral, da sich ihr Wert aus den Kindknoten
+    ergibt; unbekannte Werte der Kindknoten bleiben dagegen unbekannt.
+
+    :param own: Eigene Werte des Knotens
+    :param children: Verknüpfte Werte der Kindknoten
+    :return: Werte des Knotens
+    """
+    return np.where(np.isnan(own), children, np.where(_OWN_SUM, own + children, np.maximum(own, children)))
+
+
+def pareto_prune(points, max_size):
+    """
+    Entfernt alle dominierten Punkte (höhere Kosten bei nicht höherer Wahrscheinlichkeit).
+    Enthält die Front mehr als max_size Punkte, werden gleichmäßig verteilte Punkte samt beiden Enden behalten.
+
+    :param points: Liste von Tupeln aus Kosten und Wahrscheinlichkeit
+    :param max_size: Maximale Anzahl an Punkten
+    :return: Nach Kosten aufsteigend sortierte Pareto-Front
+    """
+    front = []
+    for cost, probability in sorted(points, key=lambda point: (point[0], -point[1])):
+        if probability > 0 and (not front or probability > front[-1][1]):
+            front.append((cost, probability))
+    if len(front) > max_size:
+        step = (len(front) - 1) / (max_size - 1)
+        front = [front[round(index * step)] for index in range(max_size)]
+    return front
+
+
+class MetricEngine:
+    """
+    Berechnet Kennzahlen aus den Attributen der Knoten (Kosten, Zeit, Fähigkeit) in einem Durchlauf von den Blättern
+    zur Wurzel. Kindknoten derselben AND-Gruppe werden je Kennzahl summiert oder maximiert, Alternativen (OR) über das
+    Minimum verknüpft. Kanten mit Wahrscheinlichkeit 0 gelten als nicht gangbar (unendlich). Blätter ohne Wert sind
+    unbekannt (NaN); ein unbekannter Wert überträgt sich auf alle Vorfahren, da auch eine unbekannte Alternative die
+    günstigste sein könnte.
+
+    Die Attribute werden einmal in eine Matrix (Knoten × Kennzahlen) eingelesen. Ändert sich die Struktur des Baums,
+    wird die Matrix ebenenweise mit NumPy neu berechnet; ändern sich nur Attribute oder Kantenwahrscheinlichkeiten,
+    werden lediglich der betroffene Knoten und seine Vorfahren neu berechnet. Zusätzlich wird je Knoten die
+    Pareto-Front aus Kosten und Erfolgswahrscheinlichkeit bei Bedarf berechnet und zwischengespeichert.
+    """
+
+    def __init__(self, store, max_front_size=50):
+        """
+        Erstellt die Kennzahlenberechnung für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        :param max_front_size: Maximale Anzahl an Punkten je Pareto-Front
+        """
+        self.store = store
+        self.max_front_size = max_front_size
+        self.lock = threading.RLock()
+        self._topology_version = None
+        self._index = {}
+        self._own = None
+        self._values = None
+        self._fronts = {}
+        self._dirty = set()
+
+    def invalidate(self, node_id):
+        """
+        Merkt einen Knoten vor, dessen Attribute oder ausgehende Kanten sich geändert haben.
+        Er und seine Vorfahren werden beim nächsten Zugriff neu berechnet.
+
+        :param node_id: ID des Knotens
+        :return: None
+        """
+        with self.lock:
+            self._dirty.add(node_id)
+
+    def _rebuild(self):
+        """
+        Liest alle Attribute ein und berechnet die Kennzahlen aller Knoten ebenenweise neu.
+
+        :return: None
+        """
+        model = self.store.probabilities.model()
+        nodes_by_id = self.store.nodes_by_id
+        own = np.array([parse_metric_values(nodes_by_id[node_id].get('attributes')) for node_id in model.node_ids],
+                       dtype=np.float64).reshape(len(model.node_ids), len(METRICS))
+        values = own.copy()
+        values[~model.active] = np.nan
+        impossible = model.edge_probability == 0
+        for first_edge, last_edge, children, term_start, parent_start, parents in model.levels:
+            child_values = values[children]
+            child_values[impossible[first_edge:last_edge]] = np.inf
+            terms = np.where(_AND_SUM, np.add.reduceat(child_values, term_start, axis=0),
+                             np.maximum.reduceat(child_values, term_start, axis=0))
+            terms[np.logical_or.reduceat(np.isinf(child_values), term_start, axis=0)] = np.inf
+            values[parents] = combine_own(own[parents], np.minimum.reduceat(terms, parent_start, axis=0))
+        self._index = model.index
+        self._own = own
+        self._values = values
+        self._fronts = {}
+        self._dirty = set()
+        self._topology_version = self.store.topology_version
+
+    def _terms(self, node_id):
+        """
+        Gibt die Terme eines Knotens zurück: je AND-Gruppe bzw. einzelnem Kindknoten die Liste der Kindknoten
+        samt Kantenwahrscheinlichkeit. Kindknoten in einem Zyklus werden ausgelassen.
+
+        :param node_id: ID des Knotens
+        :return: Liste der Terme als Listen von Tupeln aus Kind-ID und Wahrscheinlichkeit
+        """
+        terms = {}
+        levels = self.store.topology.levels()
+        for child_id, edge in self.store.child_edges.get(node_id, {}).items():
+            child = self.store.node(child_id)
+            if child is None or child_id not in levels:
+                continue
+            key = child.get('group') or ('', child_id)
+            terms.setdefault(key, []).append((child_id, parse_probability(edge['probability'])))
+        return list(terms.values())
+
+    def _update(self):
+        """
+        Berechnet die vorgemerkten Knoten neu, tiefste Ebene zuerst. Die Elternknoten eines Knotens werden nur
+        neu berechnet, wenn sich seine Kennzahlen geändert haben; die Pareto-Fronten aller Vorfahren werden verworfen.
+
+        :return: None
+        """
+        levels = self.store.topology.levels()
+        dirty = {node_id for node_id in self._dirty if node_id in levels}
+        self._dirty = set()
+
+        if self._fronts:
+            stack = list(dirty)
+            while stack:
+                node_id = stack.pop()
+                if self._fronts.pop(node_id, None) is not None:
+                    stack.extend(self.store.parent_edges.get(node_id, {}))
+
+        values, own, index = self._values, self._own, self._index
+        for node_id in dirty:
+            own[index[node_id]] = parse_metric_values(self.store.node(node_id).get('attributes'))
+        queue = [(-levels[node_id], node_id) for node_id in dirty]
+        heapq.heapify(queue)
+        queued = set(dirty)
+        while queue:
+            _, node_id = heapq.heappop(queue)
+            position = index[node_id]
+            best = None
+            for term in self._terms(node_id):
+                term_values = None
+                for child_id, probability in term:
+                    child_values = values[index[child_id]] if probability != 0 else np.full(len(METRICS), np.inf)
+                    term_values = child_values if term_values is None else combine_and(term_values, child_values)
+                best = term_values if best is None else np.minimum(best, term_values)
+            updated = own[position] if best is None else combine_own(own[position], best)
+            if np.array_equal(updated, values[position], equal_nan=True):
+                continue
+            values[position] = updated
+            for parent_id in self.store.parent_edges.get(node_id, {}):
+                if parent_id in levels and parent_id not in queued:
+                    queued.add(parent_id)
+                    heapq.heappush(queue, (-levels[parent_id], parent_id))
+
+    def _refresh(self):
+        """
+        Bringt die Kennzahlen auf den aktuellen Stand des Graphspeichers.
+
+        :return: None
+        """
+        with self.store.lock, self.lock:
+            if self._topology_version != self.store.topology_version:
+                self._rebuild()
+            elif self._dirty:
+                self._update()
+
+    def node_metrics(self, node_id):
+        """
+        Gibt die Kennzahlen eines Knotens für die Anzeige zurück (siehe format_metric).
+
+        :param node_id: ID des Knotens
+        :return: Dictionary von Kennzahl zu Wert (unendlich, falls kein Angriff möglich ist; NaN, falls der Wert
+                 unbekannt ist oder der Knoten in einem Zyklus liegt) oder None für unbekannte Knoten
+        """
+        self._refresh()
+        position = self._index.get(node_id)
+        if position is None:
+            return None
+        return dict(zip(METRIC_NAMES, self._values[position].tolist()))
+
+    def all_metrics(self):
+        """
+        Gibt die Kennzahlen aller Knoten für JSON-Antworten zurück.
+
+        :return: Dictionary von Knoten-ID zu Kennzahlen (None, falls kein Angriff möglich, der Wert unbekannt ist
+                 oder der Knoten in einem Zyklus liegt)
+        """
+        self._refresh()
+        return {node_id: {name: (value if math.isfinite(value) else None) for name, value in zip(METRIC_NAMES, row)}
+                for node_id, row in zip(self._index, self._values.tolist())}
+
+    def metric_table(self):
+        """
+        Gibt eine Momentaufnahme der Kennzahlen aller Knoten als Matrix zurück, z.B. für Exporte, die nach und
+        nach ausgeliefert werden. Spätere Änderungen des Baums verändern die Momentaufnahme nicht.
+
+        :return: Tupel aus Dictionary von Knoten-ID zur Zeile und Matrix (Knoten × Kennzahlen in der Reihenfolge
+                 von METRIC_NAMES; nicht endliche Werte bedeuten, dass kein Angriff möglich ist)
+        """
+        self._refresh()
+        with self.lock:
+            return self._index, self._values.copy()
+
+    def pareto_front(self, node_id):
+        """
+        Gibt die Pareto-Front aus Kosten und Erfolgswahrscheinlichkeit eines Knotens zurück: alle Angriffe, die
+        nicht zugleich teurer und weniger wahrscheinlich sind als ein anderer. Kindknoten mit mehreren Elternknoten
+        werden dabei wie bei den Wahrscheinlichkeiten als unabhängig behandelt.
+
+        :param node_id: ID des Knotens
+        :return: Nach Kosten aufsteigend sortierte Liste von Tupeln aus Kosten und Wahrscheinlichkeit
+        """
+        self._refresh()
+        with self.store.lock, self.lock:
+            if node_id not in self._index or node_id not in self.store.topology.levels():
+                return []
+            fronts, own, index = self._fronts, self._own, self._index
+            cost = METRIC_NAMES.index('cost')
+            stack = [node_id]
+            while stack:
+                current = stack[-1]
+                if current in fronts:
+                    stack.pop()
+                    continue
+                terms = self._terms(current)
+                missing = [child_id for term in terms for child_id, _ in term if child_id not in fronts]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                own_cost = float(own[index[current], cost])
+                if not terms:
+                    # Angriffe über Blätter mit unbekannten Kosten lassen sich nicht einordnen
+                    front = [] if math.isnan(own_cost) else [(own_cost, 1.0)]
+                else:
+                    own_cost = 0.0 if math.isnan(own_cost) else own_cost
+                    points = []
+                    for term in terms:
+                        term_front = [(0.0, 1.0)]
+                        for child_id, probability in term:
+                            term_front = pareto_prune([(term_cost + child_cost, term_probability * probability
+                                                        * child_probability)
+                                                       for term_cost, term_probability in term_front
+                                                       for child_cost, child_probability in fronts[child_id]],
+                                                      self.max_front_size)
+                        points.extend(term_front)
+                    front = [(own_cost + point_cost, probability) for point_cost, probability
+                             in pareto_prune(points, self.max_front_size)]
+                fronts[current] = front
+                stack.pop()
+            return fronts[node_id]
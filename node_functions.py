@@ -1,36 +1,31 @@
 import uuid
 
 from flask import flash
+from helper_functions import find_new_parent_id
+from probability import probability_value
 
-from helper_functions import save_data
 
-
-def add_node(data, name, parent_id, probability, color, group=None, attributes=None):
+def add_node(store, name, parent_id, probability, color, group=None, attributes=None):
     """
     Fügt einen neuen Knoten und die entsprechende Kante zu den Daten hinzu.
     Überprüft die Wahrscheinlichkeit und fügt den neuen Knoten und die Kante zu den Daten hinzu.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param name: Name des neuen Knotens
     :param parent_id: ID des Elternknotens
     :param probability: Wahrscheinlichkeit der Kante
     :param color: Farbe der Kante (wird verwendet, um AND-Gruppen zu kennzeichnen)
     :param group: Gruppe des Knotens (für AND-Verknüpfungen)
     :param attributes: Attribute des Knotens
-    :return: None
+    :return: ID des neuen Knotens oder None, wenn der Knoten nicht hinzugefügt wurde
     """
     try:
-        probability_value = float(probability.replace(',', '.'))  # Wahrscheinlichkeit in eine Zahl umwandeln
+        new_probability_value = probability_value(probability)  # Wahrscheinlichkeit in eine Zahl umwandeln
     except ValueError:
         flash('Die Wahrscheinlichkeit muss einen Zahlenwert sein.', 'error')
         return
 
-    total_probability = sum(
-        float(edge['probability'].replace(',', '.')) for edge in data['edges']
-        if edge['parent'] == parent_id
-    )
-
-    if total_probability + probability_value > 1:
+    if store.validation.exceeds_total(parent_id, new_probability_value):
         flash('Die Gesamtwahrscheinlichkeit der Kindknoten darf 1 nicht überschreiten.', 'error')
         return
 
@@ -41,135 +36,147 @@ def add_node(data, name, parent_id, probability, color, group=None, attributes=N
         "group": group,
         "attributes": attributes or {}
     }
-    data['nodes'].append(new_node)
+    store.add_node(new_node)
     new_edge = {"parent": parent_id, "child": new_node['id'], "probability": probability, "color": color}
-    data['edges'].append(new_edge)
+    store.add_edge(new_edge)
+    return new_node['id']
 
 
-def edit_node_name(data, node_id, new_name):
+def edit_node_name(store, node_id, new_name):
     """
     Bearbeitet den Namen eines Knotens.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu bearbeitenden Knotens
     :param new_name: Neuer Name für den Knoten
     :return: None
     """
-    for node in data['nodes']:
-        if node['id'] == node_id:
-            node['name'] = new_name
-            break
+    store.rename_node(node_id, new_name)
 
 
-def delete_node(data, node_id):
+def delete_node(store, node_id):
     """
     Löscht einen Knoten und die entsprechenden Kanten aus den Daten.
     Entfernt den Knoten mit der angegebenen ID und alle Kanten, die mit diesem Knoten verbunden sind.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu löschenden Knotens
     :return: None
     """
-    data['nodes'] = [node for node in data['nodes'] if node['id'] != node_id]
-    data['edges'] = [edge for edge in data['edges'] if edge['parent'] != node_id and edge['child'] != node_id]
+    store.remove_node(node_id)
+
+
+def delete_node_and_move_children(store, node_id):
+    """
+    Löscht einen Knoten und hängt seine Kindknoten an einen neuen Elternknoten um.
+    Der Root-Knoten kann nicht gelöscht werden.
+
+    :param store: Der Graphspeicher mit den aktuellen Daten
+    :param node_id: ID des zu löschenden Knotens
+    :return: True, wenn der Knoten gelöscht wurde, sonst False
+    """
+    # Überprüfe, ob der zu löschende Knoten der Root-Knoten ist
+    if store.node(node_id) and store.topology.level(node_id) == 0:
+        flash('Der Root Knoten kann nicht gelöscht werden.', 'error')
+        return False
+
+    # Weist die Kinderknoten einem neuen Elternknoten zu
+    parent_id = find_new_parent_id(store, node_id)
+    if parent_id:
+        for edge in store.edges_from(node_id):
+            if store.edge(parent_id, edge['child']):
+                child = store.node(edge['child'])
+                flash(f"Der Knoten '{child['name'] if child else edge['child']}' hängt bereits am neuen "
+                      f"Elternknoten, die vorhandene Kante wurde beibehalten.", 'info')
+            store.move_edge(edge, parent_id)
+
+    delete_node(store, node_id)
+    return True
 
 
-def get_node_level(data, node_id):
+def get_node_level(store, node_id):
     """
     Bestimmt die Ebene eines Knotens in einem Baum.
-    Durchläuft die Kanten, um die Anzahl der Ebenen vom gegebenen Knoten bis zur Wurzel zu zählen.
+    Die Ebenen aller Knoten werden gemeinsam berechnet und bis zur nächsten Änderung der Kanten zwischengespeichert.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des Knotens
-    :return: Ebene des Knotens
+    :return: Ebene des Knotens oder None, wenn der Knoten in einem Zyklus liegt
     """
-    level = 0
-    current_node_id = node_id
-    while True:
-        parent_edge = next((edge for edge in data['edges'] if edge['child'] == current_node_id), None)
-        if not parent_edge:
-            break
-        level += 1
-        current_node_id = parent_edge['parent']
-    return level
+    return store.topology.level(node_id)
 
 
 
 
 
-def update_node_name(data, node_id, new_name):
+def update_node_name(store, node_id, new_name):
     """
     Aktualisiert den Namen eines Knotens.
     Überprüft, ob der neue Name bereits existiert und ändert den Namen des Knotens.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu bearbeitenden Knotens
     :param new_name: Neuer Name für den Knoten
     :return: None
     """
     if new_name:
-        if node_name_exists(data, new_name):
+        if node_name_exists(store, new_name):
             return flash('Ein Knoten mit diesem Namen existiert bereits.', 'error')
-        edit_node_name(data, node_id, new_name)
+        edit_node_name(store, node_id, new_name)
 
 
-def update_node_parent(data, node_id, new_parent_id):
+def update_node_parent(store, node_id, new_parent_id):
     """
     Aktualisiert die Eltern-ID eines Knotens.
     Überprüft, ob die neue Eltern-ID gültig ist und ändert die Eltern-ID des Knotens.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu bearbeitenden Knotens
     :param new_parent_id: Neue Eltern-ID für den Knoten
     :return: None
     """
     if new_parent_id and new_parent_id != "Keine Änderung":
-        for edge in data['edges']:
-            if edge['child'] == node_id:
-                edge['parent'] = new_parent_id
-                break
+        if store.topology.creates_cycle(new_parent_id, node_id):
+            return flash('Der Vaterknoten kann nicht geändert werden, da sonst ein Zyklus entstehen würde.', 'error')
+        parent_edge = store.first_parent_edge(node_id)
+        if parent_edge:
+            store.move_edge(parent_edge, new_parent_id)
 
 
-def update_node_group(data, node_id, new_group):
+def update_node_group(store, node_id, new_group):
     """
     Aktualisiert die Gruppenzugehörigkeit eines Knotens.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu bearbeitenden Knotens
     :param new_group: Neue Gruppe für den Knoten
     :return: None
     """
     if new_group:
-        for node in data['nodes']:
-            if node['id'] == node_id:
-                node['group'] = new_group
-                break
+        store.update_node(node_id, {'group': new_group})
 
 
-def update_node_attributes(data, node_id, attributes):
+def update_node_attributes(store, node_id, attributes):
     """
     Aktualisiert die Attribute eines Knotens.
-    Durchsucht die Knoten nach der gegebenen ID und ändert die Attribute des Knotens.
+    Ersetzt die Attribute des Knotens mit der gegebenen ID.
 
-    :param data: Die aktuellen Daten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param node_id: ID des zu bearbeitenden Knotens
     :param attributes: Neue Attribute für den Knoten
     :return: None
     """
-    for node in data['nodes']:
-        if node['id'] == node_id:
-            node['attributes'] = attributes
-            break
+    store.update_node(node_id, {'attributes': attributes})
 
-def node_name_exists(data, name):
+def node_name_exists(store, name):
     """
     Überprüft, ob ein Knotenname bereits in den Daten existiert.
 
-    :param data: Die Daten, die Knoten enthalten
+    :param store: Der Graphspeicher mit den aktuellen Daten
     :param name: Der zu überprüfende Knotenname
     :return: True, wenn der Knotenname existiert, sonst False
     """
-    return any(node['name'] == name for node in data['nodes'])
+    return store.node_id_by_name(name) is not None
 
 def create_attributes_dict(attribute_names, attribute_values, display_in_tree_flags):
     """
@@ -0,0 +1,119 @@
+import heapq
+from itertools import islice
+
+
+def search_keys(folded_name):
+    """
+    Gibt die Suchschlüssel eines Knotennamens zurück: die Präfixe der Länge 1 und 2 (mit '^' markiert) und alle
+    Trigramme des Namens.
+
+    :param folded_name: Der Name in Kleinschreibung (siehe str.casefold)
+    :return: Menge der Suchschlüssel
+    """
+    keys = {'^' + folded_name[:length] for length in (1, 2) if len(folded_name) >= length}
+    keys.update(folded_name[start:start + 3] for start in range(len(folded_name) - 2))
+    return keys
+
+
+class NodeSearchIndex:
+    """
+    Durchsucht die Knotennamen für die Auswahllisten der Formulare, ohne alle Knoten an den Browser zu senden.
+    Kurze Suchbegriffe (ein oder zwei Zeichen) finden Namen mit diesem Anfang, längere Suchbegriffe alle Namen,
+    die den Begriff enthalten; Groß- und Kleinschreibung wird nicht beachtet.
+
+    Der Index ordnet jedem Präfix und Trigramm die IDs der passenden Knoten zu. Der Graphspeicher meldet jede
+    Änderung eines Knotens, sodass nur die Schlüssel des geänderten Namens nachgeführt werden. Eine Suche schneidet
+    die Mengen der Trigramme des Suchbegriffs (kleinste zuerst) und prüft nur die verbleibenden Kandidaten.
+    """
+
+    def __init__(self, store):
+        """
+        Erstellt den Suchindex für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        """
+        self.store = store
+        self.clear()
+
+    def clear(self):
+        """
+        Leert den Index (z.B. bevor der Speicher neu befüllt wird).
+
+        :return: None
+        """
+        self._keys = {}
+        self._names = {}
+
+    def node_changed(self, old_node, new_node):
+        """
+        Führt den Index nach dem Hinzufügen, Umbenennen oder Entfernen eines Knotens nach.
+
+        :param old_node: Der bisherige Knoten oder None
+        :param new_node: Der neue Knoten oder None
+        :return: None
+        """
+        if old_node is not None and new_node is not None and old_node['name'] == new_node['name']:
+            return
+        if old_node is not None:
+            node_id = old_node['id']
+            for key in search_keys(self._names.pop(node_id, '')):
+                ids = self._keys.get(key)
+                if ids is not None:
+                    ids.discard(node_id)
+                    if not ids:
+                        del self._keys[key]
+        if new_node is not None:
+            node_id = new_node['id']
+            folded = str(new_node['name']).casefold()
+            self._names[node_id] = folded
+            for key in search_keys(folded):
+                self._keys.setdefault(key, set()).add(node_id)
+
+    def _candidates(self, folded_query):
+        """
+        Gibt die IDs aller Knoten zurück, deren Name zum Suchbegriff passt.
+
+        :param folded_query: Der Suchbegriff in Kleinschreibung (nicht leer)
+        :return: Liste der Knoten-IDs
+        """
+        if len(folded_query) < 3:
+            return list(self._keys.get('^' + folded_query, ()))
+        sets = sorted((self._keys.get(key, set()) for key in search_keys(folded_query) if not key.startswith('^')),
+                      key=len)
+        candidates = set(sets[0])
+        for ids in sets[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        names = self._names
+        # Trigramme sagen nichts über ihre Reihenfolge aus, daher wird der Treffer am Namen bestätigt
+        return [node_id for node_id in candidates if folded_query in names[node_id]]
+
+    def search(self, query, offset=0, limit=20):
+        """
+        Sucht Knoten über ihren Namen. Treffer am Namensanfang stehen vorne, danach wird alphabetisch sortiert.
+        Ohne Suchbegriff werden die Knoten in der Reihenfolge des Graphspeichers geliefert.
+
+        :param query: Der Suchbegriff
+        :param offset: Anzahl der zu überspringenden Treffer
+        :param limit: Maximale Anzahl der gelieferten Treffer
+        :return: Dictionary mit 'version', 'query', 'total' (Anzahl aller Treffer), 'offset', 'limit' und 'items'
+                 (Liste der Treffer mit 'id' und 'name')
+        """
+        store = self.store
+        folded_query = query.strip().casefold()
+        with store.lock:
+            if not folded_query:
+                total = len(store.nodes_by_id)
+                page = [node['id'] for node in islice(store.nodes_by_id.values(), offset, offset + limit)]
+            else:
+                names = self._names
+                candidates = self._candidates(folded_query)
+                total = len(candidates)
+                # Nur die Treffer bis zum Ende der Seite werden sortiert
+                page = heapq.nsmallest(offset + limit, candidates,
+                                       key=lambda node_id: (not names[node_id].startswith(folded_query),
+                                                            names[node_id], node_id))[offset:]
+            items = [{'id': node_id, 'name': store.nodes_by_id[node_id]['name']} for node_id in page]
+            return {'version': store.version, 'query': query, 'total': total, 'offset': offset, 'limit': limit,
+                    'items': items}
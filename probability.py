@@ -0,0 +1,320 @@
+from functools import lru_cache
+
+import numpy as np
+
+from attack_paths import AttackPathEnumerator
+from cut_sets import CutSetAnalysis
+
+
+@lru_cache(maxsize=65536)
+def probability_value(value):
+    """
+    Wandelt eine Wahrscheinlichkeit aus den Daten (z.B. '0,5') in eine Zahl um.
+    Da Wahrscheinlichkeiten nur wenige verschiedene Werte annehmen, wird jede Zeichenkette nur einmal umgewandelt.
+
+    :param value: Wahrscheinlichkeit als String oder Zahl
+    :return: Wahrscheinlichkeit als float
+    :raises ValueError: Wenn der Wert keine Zahl ist
+    """
+    return float(str(value).replace(',', '.'))
+
+
+def parse_probability(value):
+    """
+    Wandelt eine Wahrscheinlichkeit aus den Daten (z.B. '0,5') in eine Zahl um.
+
+    :param value: Wahrscheinlichkeit als String oder Zahl
+    :return: Wahrscheinlichkeit als float oder NaN, wenn der Wert keine Zahl ist
+    """
+    try:
+        return probability_value(value)
+    except ValueError:
+        return float('nan')
+
+
+def segment_starts(values):
+    """
+    Bestimmt die Anfänge der Abschnitte gleicher Werte in einem sortierten Array.
+
+    :param values: Sortiertes NumPy-Array
+    :return: Array der Startindizes
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+
+def parse_probabilities(values):
+    """
+    Wandelt eine Liste von Wahrscheinlichkeiten aus den Daten in ein NumPy-Array um.
+
+    :param values: Liste der Wahrscheinlichkeiten als String oder Zahl
+    :return: NumPy-Array der Wahrscheinlichkeiten (NaN für ungültige Werte)
+    """
+    try:
+        # Schneller Weg für gültige Werte: alle Strings werden in einem Schritt umgewandelt
+        parsed = np.array(';'.join(values).replace(',', '.').split(';') if values else [], dtype=np.float64)
+        if len(parsed) == len(values):
+            return parsed
+    except (TypeError, ValueError):
+        pass
+    return np.array([parse_probability(value) for value in values], dtype=np.float64)
+
+
+def exclusive_products(values, starts):
+    """
+    Berechnet je Element das Produkt aller anderen Elemente seines Abschnitts (ohne Division, auch bei Nullen).
+
+    :param values: NumPy-Array der Faktoren, nach Abschnitten sortiert
+    :param starts: Startindizes der Abschnitte
+    :return: NumPy-Array mit dem Produkt der übrigen Faktoren je Element
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.float64)
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(values)]))
+    zero = values == 0
+    zeros = np.add.reduceat(zero.astype(np.int64), starts)[segment]
+    nonzero_product = np.multiply.reduceat(np.where(zero, 1.0, values), starts)[segment]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        others = np.where(zero, np.where(zeros == 1, nonzero_product, 0.0),
+                          np.where(zeros == 0, nonzero_product / np.where(zero, 1.0, values), 0.0))
+    return others
+
+
+class ProbabilityModel:
+    """
+    Kompiliert den Angriffsbaum in NumPy-Arrays, um die Erfolgswahrscheinlichkeit aller Knoten zu berechnen.
+
+    Ein Knoten ohne Kindknoten gilt als erreicht (Wahrscheinlichkeit 1). Jede Kante trägt p(Kante) * P(Kind) bei.
+    Kindknoten eines Elternknotens, die zur selben AND-Gruppe gehören, bilden einen gemeinsamen Term (Produkt),
+    alle übrigen Kindknoten einen eigenen Term. Die Terme eines Elternknotens sind OR-verknüpft: 1 - ∏(1 - Term).
+    Knoten mit mehreren Elternknoten werden dabei als unabhängig behandelt.
+
+    Die Kanten werden nach Ebene des Elternknotens (tiefste zuerst), Elternknoten und Term sortiert,
+    sodass jede Ebene mit zwei reduceat-Aufrufen ausgewertet werden kann.
+    """
+
+    def __init__(self, nodes, edges, levels):
+        """
+        Kompiliert die Knoten und Kanten. Knoten, die in einem Zyklus liegen (ohne Ebene), und Kanten zu unbekannten
+        Knoten werden ignoriert.
+
+        :param nodes: Liste der Knoten
+        :param edges: Liste der Kanten
+        :param levels: Dictionary von Knoten-ID zu Ebene
+        """
+        self.node_ids = [node['id'] for node in nodes]
+        self.index = dict(zip(self.node_ids, range(len(self.node_ids))))
+        group_codes = {}
+        node_group = np.array([group_codes.setdefault(node['group'], len(group_codes)) if node.get('group') else -1
+                               for node in nodes], dtype=np.int64)
+        node_level = np.array([levels.get(node_id, -1) for node_id in self.node_ids], dtype=np.int64)
+        self.active = node_level >= 0
+
+        index = self.index
+        # Unbekannte Knoten-IDs erhalten den Index -1
+        parents = np.array([index.get(edge['parent'], -1) for edge in edges], dtype=np.int32)
+        children = np.array([index.get(edge['child'], -1) for edge in edges], dtype=np.int32)
+        probabilities = parse_probabilities([edge['probability'] for edge in edges])
+        positions = np.arange(len(edges))
+        known = (parents >= 0) & (children >= 0)
+        if not self.active.all() or not known.all():
+            # Kanten von oder zu Knoten in einem Zyklus oder zu unbekannten Knoten werden ignoriert
+            keep = known & self.active[parents] & self.active[children]
+            parents, children, probabilities, positions = \
+                parents[keep], children[keep], probabilities[keep], positions[keep]
+
+        # Kindknoten derselben AND-Gruppe bilden einen Term, alle übrigen Kindknoten jeweils einen eigenen
+        child_group = node_group[children]
+        term_key = np.where(child_group >= 0, child_group, len(group_codes) + children)
+        parent_levels = node_level[parents]
+        order = np.lexsort((term_key, parents, -parent_levels))
+
+        self.edge_parent = parents[order]
+        self.edge_child = children[order]
+        self.edge_probability = probabilities[order]
+        # Position jeder Kante des Modells in der ursprünglichen Kantenliste
+        self.edge_position = positions[order]
+
+        edge_count = len(order)
+        sorted_key = term_key[order]
+        changed = (self.edge_parent[1:] != self.edge_parent[:-1]) | (sorted_key[1:] != sorted_key[:-1])
+        self.term_start = np.flatnonzero(np.r_[edge_count > 0, changed])
+        term_parent = self.edge_parent[self.term_start]
+        self.parent_start = segment_starts(term_parent)
+        self.parents = term_parent[self.parent_start]
+        level_start = segment_starts(node_level[self.parents])
+
+        # Je Ebene: Kantenbereich [Start, Ende), Kindknoten, Term- und Elternanfänge relativ zum Bereich, Elternknoten
+        term_bounds = np.r_[self.parent_start, len(self.term_start)]
+        edge_bounds = np.r_[self.term_start, edge_count]
+        self.levels = []
+        for start, end in zip(level_start, np.r_[level_start[1:], len(self.parents)]):
+            first_term, last_term = term_bounds[start], term_bounds[end]
+            first_edge, last_edge = int(edge_bounds[first_term]), int(edge_bounds[last_term])
+            self.levels.append((first_edge, last_edge, self.edge_child[first_edge:last_edge],
+                                self.term_start[first_term:last_term] - first_edge,
+                                self.parent_start[start:end] - first_term, self.parents[start:end]))
+
+    def evaluate(self, edge_probability=None):
+        """
+        Berechnet die Erfolgswahrscheinlichkeit aller Knoten in einem Durchlauf von den Blättern zur Wurzel.
+        Mehrere Belegungen der Kantenwahrscheinlichkeiten können als Matrix (Belegungen × Kanten)
+        gemeinsam ausgewertet werden.
+
+        :param edge_probability: Kantenwahrscheinlichkeiten in der Reihenfolge des Modells (Standard: gespeicherte Werte)
+        :return: Array der Knotenwahrscheinlichkeiten (letzte Achse: Knoten in Einfügereihenfolge)
+        """
+        if edge_probability is None:
+            edge_probability = self.edge_probability
+        edge_probability = np.asarray(edge_probability, dtype=np.float64)
+        result = np.ones(edge_probability.shape[:-1] + (len(self.node_ids),), dtype=np.float64)
+        result[..., ~self.active] = np.nan
+        for first_edge, last_edge, children, term_start, parent_start, parents in self.levels:
+            values = edge_probability[..., first_edge:last_edge] * result[..., children]
+            terms = np.multiply.reduceat(values, term_start, axis=-1)
+            misses = np.multiply.reduceat(1.0 - terms, parent_start, axis=-1)
+            result[..., parents] = 1.0 - misses
+        return result
+
+    def gradient(self, root, edge_probability=None):
+        """
+        Berechnet die partiellen Ableitungen der Erfolgswahrscheinlichkeit eines Wurzelknotens nach allen
+        Kantenwahrscheinlichkeiten mit einem Vorwärts- und einem Rückwärtsdurchlauf (Reverse Mode).
+        Die lokalen Ableitungen werden für alle Kanten gemeinsam berechnet; nur die Weitergabe der Adjungierten
+        erfolgt ebenenweise von der Wurzel zu den Blättern, sodass der Beitrag eines Knotens aus allen
+        Elternknoten bereits vollständig ist, wenn er weitergegeben wird.
+
+        :param root: Index des Wurzelknotens
+        :param edge_probability: Kantenwahrscheinlichkeiten in der Reihenfolge des Modells (Standard: gespeicherte Werte)
+        :return: Tupel aus den Knotenwahrscheinlichkeiten und den Ableitungen je Kante (Reihenfolge des Modells)
+        """
+        if edge_probability is None:
+            edge_probability = self.edge_probability
+        probabilities = self.evaluate(edge_probability)
+
+        # Lokale Ableitungen für alle Kanten auf einmal:
+        # ∂P(Eltern)/∂Term = Produkt der übrigen (1 - Term), ∂Term/∂Wert = Produkt der übrigen Werte des Terms
+        values = edge_probability * probabilities[self.edge_child]
+        terms = np.multiply.reduceat(values, self.term_start) if len(values) else values
+        term_partial = exclusive_products(1.0 - terms, self.parent_start)
+        partial = np.repeat(term_partial, np.diff(np.r_[self.term_start, len(values)])) * \
+            exclusive_products(values, self.term_start)
+
+        # Adjungierte von der Wurzel zu den Blättern weitergeben
+        adjoint = np.zeros(len(self.node_ids), dtype=np.float64)
+        adjoint[root] = 1.0
+        child_factor = partial * edge_probability
+        for first_edge, last_edge, children, _, _, _ in reversed(self.levels):
+            np.add.at(adjoint, children,
+                      adjoint[self.edge_parent[first_edge:last_edge]] * child_factor[first_edge:last_edge])
+        gradient = adjoint[self.edge_parent] * partial * probabilities[self.edge_child]
+        return probabilities, gradient
+
+
+class ProbabilityEngine:
+    """
+    Stellt die Erfolgswahrscheinlichkeiten der Knoten des Graphspeichers bereit.
+    Das kompilierte Modell und das Ergebnis werden zwischengespeichert, bis sich der Graphspeicher ändert.
+    """
+
+    def __init__(self, store):
+        """
+        Erstellt die Wahrscheinlichkeitsberechnung für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        """
+        self.store = store
+        self._cache = None
+        self._paths = None
+        self._cut_sets = None
+
+    def _refresh(self):
+        """
+        Kompiliert das Modell und berechnet die Wahrscheinlichkeiten neu, falls sich der Graphspeicher geändert hat.
+
+        :return: Tupel aus dem Modell und den Knotenwahrscheinlichkeiten
+        """
+        cache = self._cache
+        if cache is None or cache[0] != self.store.version:
+            with self.store.lock:
+                version = self.store.version
+                model = ProbabilityModel(self.store.nodes, self.store.edges, self.store.topology.levels())
+            cache = self._cache = (version, model, model.evaluate())
+        return cache[1], cache[2]
+
+    def model(self):
+        """
+        Gibt das kompilierte Modell des aktuellen Standes zurück.
+
+        :return: Das ProbabilityModel
+        """
+        return self._refresh()[0]
+
+    def node_probabilities(self):
+        """
+        Gibt die Erfolgswahrscheinlichkeit aller Knoten zurück.
+
+        :return: Dictionary von Knoten-ID zu Wahrscheinlichkeit (None für Knoten in einem Zyklus)
+        """
+        model, values = self._refresh()
+        return {node_id: (None if np.isnan(value) else float(value)) for node_id, value in zip(model.node_ids, values)}
+
+    def probability(self, node_id):
+        """
+        Gibt die Erfolgswahrscheinlichkeit eines Knotens zurück.
+
+        :param node_id: ID des Knotens
+        :return: Wahrscheinlichkeit oder None
+        """
+        model, values = self._refresh()
+        position = model.index.get(node_id)
+        if position is None or np.isnan(values[position]):
+            return None
+        return float(values[position])
+
+    def sensitivities(self, root_id):
+        """
+        Gibt die Ableitungen der Erfolgswahrscheinlichkeit eines Wurzelknotens nach allen Kantenwahrscheinlichkeiten
+        zurück, absteigend nach ihrem Betrag sortiert.
+
+        :param root_id: ID des Wurzelknotens
+        :return: Liste von Tupeln aus (Eltern-ID, Kind-ID) und Ableitung
+        """
+        model = self.model()
+        _, gradient = model.gradient(model.index[root_id])
+        node_ids = model.node_ids
+        order = np.argsort(-np.abs(gradient), kind='stable')
+        return [((node_ids[model.edge_parent[edge]], node_ids[model.edge_child[edge]]), float(gradient[edge]))
+                for edge in order]
+
+    def attack_paths(self):
+        """
+        Gibt die Aufzählung der wahrscheinlichsten Angriffspfade für den aktuellen Stand zurück.
+        Die Aufzählung wird je Stand nur einmal erstellt, sodass bereits berechnete Pfade wiederverwendet werden.
+
+        :return: Der AttackPathEnumerator
+        """
+        model = self.model()
+        paths = self._paths
+        if paths is None or paths.model is not model:
+            paths = self._paths = AttackPathEnumerator(model)
+        return paths
+
+    def cut_set_analysis(self, root_id, ordering='dfs'):
+        """
+        Gibt die Analyse der minimalen Angriffsszenarien eines Wurzelknotens für den aktuellen Stand zurück.
+        Das Entscheidungsdiagramm wird je Stand, Wurzelknoten und Variablenordnung nur einmal aufgebaut.
+
+        :param root_id: ID des Wurzelknotens
+        :param ordering: Heuristik für die Variablenordnung ('dfs' oder 'weighted')
+        :return: Die CutSetAnalysis
+        """
+        model = self.model()
+        cut_sets = self._cut_sets
+        if cut_sets is None or cut_sets[0] is not model:
+            cut_sets = self._cut_sets = (model, {})
+        analysis = cut_sets[1].get((root_id, ordering))
+        if analysis is None:
+            analysis = cut_sets[1][(root_id, ordering)] = CutSetAnalysis(model, model.index[root_id], ordering)
+        return analysis
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+
+
+class RenderCache:
+    """
+    Speichert gerenderte Angriffsbaum-Dateien auf der Festplatte, adressiert über einen Hash der DOT-Quelle.
+    Ist der Baum unverändert, wird die vorhandene Datei wiederverwendet und Graphviz nicht erneut gestartet.
+    Überschreitet der Cache die maximale Anzahl an Einträgen, werden die am längsten ungenutzten Dateien gelöscht.
+    """
+
+    def __init__(self, directory='cache/render', max_entries=64):
+        """
+        Erstellt einen Render-Cache im angegebenen Verzeichnis.
+
+        :param directory: Verzeichnis, in dem die gerenderten Dateien abgelegt werden
+        :param max_entries: Maximale Anzahl gespeicherter Dateien (über alle Formate)
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(source):
+        """
+        Berechnet den Cache-Schlüssel für eine DOT-Quelle.
+
+        :param source: DOT-Quelltext des Angriffsbaums
+        :return: SHA-256-Hash als Hex-String
+        """
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def path(self, key, format):
+        """
+        Gibt den Pfad der gerenderten Datei für Schlüssel und Format zurück.
+
+        :param key: Cache-Schlüssel
+        :param format: Format der Datei (z.B. 'svg')
+        :return: Pfad zur Datei im Cache
+        """
+        return os.path.join(self.directory, f"{key}.{format}")
+
+    def get(self, key, format):
+        """
+        Gibt den Pfad einer bereits gerenderten Datei zurück und markiert sie als zuletzt verwendet.
+
+        :param key: Cache-Schlüssel
+        :param format: Format der Datei
+        :return: Pfad zur Datei oder None, wenn sie nicht im Cache liegt
+        """
+        path = self.path(key, format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, format, content):
+        """
+        Legt eine gerenderte Datei im Cache ab und entfernt bei Bedarf die ältesten Einträge.
+
+        :param key: Cache-Schlüssel
+        :param format: Format der Datei
+        :param content: Inhalt der Datei als Bytes
+        :return: Pfad zur Datei im Cache
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key, format)
+        write_file_atomic(path, content)
+        self._evict()
+        return path
+
+    def _evict(self):
+        """
+        Löscht die am längsten ungenutzten Dateien, bis die maximale Anzahl eingehalten wird.
+
+        :return: None
+        """
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def write_file_atomic(path, content, sync=False):
+    """
+    Schreibt eine Datei über eine temporäre Datei und ersetzt das Ziel anschließend in einem Schritt.
+
+    :param path: Zielpfad
+    :param content: Inhalt als Bytes
+    :param sync: Ob die Datei vor dem Ersetzen dauerhaft auf die Festplatte geschrieben werden soll
+    :return: None
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(content)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from graphviz import Source
+
+
+def render_source(source, format):
+    """
+    Rendert eine DOT-Quelle mit Graphviz. Wird in einem Worker-Prozess ausgeführt.
+
+    :param source: DOT-Quelltext des Angriffsbaums
+    :param format: Format des Bildes
+    :return: Inhalt der gerenderten Datei als Bytes
+    """
+    return Source(source).pipe(format=format)
+
+
+class RenderScheduler:
+    """
+    Rendert den Angriffsbaum im Hintergrund über einen begrenzten Pool von Worker-Prozessen.
+    Fertige Bilder bleiben im Render-Cache liegen und werden über ihren Cache-Schlüssel ausgeliefert, sodass
+    Sitzungen mit unterschiedlichen Ansichten sich nicht gegenseitig das Bild überschreiben.
+    Bis das neue Bild fertig ist, zeigt die Seite weiterhin das zuletzt erfolgreich gerenderte Bild an.
+    Es laufen höchstens max_workers Aufträge gleichzeitig (z. B. für verschiedene Ansichten mit und ohne
+    Wahrscheinlichkeiten). Sind alle Worker belegt, wird nur der neueste eingehende Stand vorgemerkt; ältere Stände
+    werden verworfen, da ihr Bild ohnehin sofort überholt wäre.
+    Fehlermeldungen werden je Render-Version für status() aufbewahrt, aber nur für die zuletzt fehlgeschlagenen
+    Versionen; ein erneuter Auftrag für dieselbe Version verwirft die Meldung.
+    """
+
+    def __init__(self, cache, format='svg', max_workers=2, max_failures=64):
+        """
+        Erstellt den Scheduler für Hintergrund-Renderaufträge.
+
+        :param cache: Der Render-Cache, in dem fertige Bilder abgelegt werden
+        :param format: Format des Bildes (Standard: 'svg')
+        :param max_workers: Maximale Anzahl an Worker-Prozessen
+        :param max_failures: Maximale Anzahl aufbewahrter Fehlermeldungen
+        """
+        self.cache = cache
+        self.format = format
+        self.max_workers = max(1, max_workers)
+        self.max_failures = max_failures
+        # Wiedereintrittsfähig, da add_done_callback bei bereits beendeten Aufträgen _finished sofort aufruft
+        self._lock = threading.RLock()
+        self._executor = None
+        self._sequence = 0
+        self._running = {}
+        self._pending = None
+        self._published = None
+        self._published_sequence = 0
+        self._failed = OrderedDict()
+
+    @property
+    def published_version(self):
+        """
+        Schlüssel des zuletzt fertiggestellten Bildes oder None.
+        """
+        return self._published
+
+    def request(self, source):
+        """
+        Fordert das Bild für die angegebene DOT-Quelle an.
+        Liegt es bereits im Cache, wird es sofort bereitgestellt, andernfalls wird ein Hintergrundauftrag eingeplant.
+
+        :param source: DOT-Quelltext des Angriffsbaums
+        :return: Render-Version (Cache-Schlüssel) des angeforderten Standes
+        """
+        key = self.cache.key(source)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            cached_path = self.cache.get(key, self.format)
+            if cached_path is not None:
+                self._publish(key, sequence)
+                return key
+            if key in self._running:
+                return key
+            self._failed.pop(key, None)
+            if len(self._running) < self.max_workers:
+                self._start(key, sequence, source)
+            else:
+                self._pending = (key, sequence, source)
+        return key
+
+    def status(self, version):
+        """
+        Gibt den Bearbeitungsstand einer Render-Version zurück.
+        Der Zustand im Speicher gilt nur für diesen Prozess; laufen mehrere App-Prozesse, kann das Bild von einem
+        anderen gerendert worden sein. Deshalb wird zusätzlich der gemeinsame Render-Cache auf der Platte geprüft.
+
+        :param version: Render-Version (Cache-Schlüssel)
+        :return: Dictionary mit 'ready', 'failed' und der aktuell bereitgestellten 'version'
+        """
+        with self._lock:
+            ready = self._published == version
+            failed = self._failed.get(version)
+            published = self._published
+        if not ready and self.cache.get(version, self.format) is not None:
+            ready = True
+            failed = None
+        return {'ready': ready, 'failed': failed, 'version': published}
+
+    def _executor_instance(self):
+        """
+        Erstellt den Prozess-Pool bei der ersten Verwendung.
+
+        :return: Der ProcessPoolExecutor
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _start(self, key, sequence, source):
+        """
+        Startet einen Renderauftrag. Muss mit gehaltener Sperre aufgerufen werden.
+
+        :param key: Render-Version (Cache-Schlüssel)
+        :param sequence: Laufende Nummer der Anfrage
+        :param source: DOT-Quelltext des Angriffsbaums
+        :return: None
+        """
+        self._running[key] = sequence
+        future = self._executor_instance().submit(render_source, source, self.format)
+        future.add_done_callback(lambda done: self._finished(key, sequence, done))
+
+    def _finished(self, key, sequence, future):
+        """
+        Legt ein fertiges Bild im Cache ab, stellt es bereit und startet den vorgemerkten Auftrag.
+
+        :param key: Render-Version (Cache-Schlüssel)
+        :param sequence: Laufende Nummer der Anfrage
+        :param future: Das abgeschlossene Future des Auftrags
+        :return: None
+        """
+        cached_path = None
+        error = None
+        try:
+            cached_path = self.cache.put(key, self.format, future.result())
+        except BrokenProcessPool as e:
+            self._executor = None
+            error = str(e) or 'Render-Prozess abgebrochen'
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+
+        with self._lock:
+            if cached_path is not None:
+                self._failed.pop(key, None)
+                self._publish(key, sequence)
+            else:
+                self._failed[key] = error
+                self._failed.move_to_end(key)
+                while len(self._failed) > self.max_failures:
+                    self._failed.popitem(last=False)
+            self._running.pop(key, None)
+            if self._pending is not None and len(self._running) < self.max_workers:
+                pending, self._pending = self._pending, None
+                self._start(*pending)
+
+    def _publish(self, key, sequence):
+        """
+        Merkt ein fertiges Bild als aktuellen Stand vor, sofern kein neuerer Stand bereits bereitgestellt wurde.
+        Muss mit gehaltener Sperre aufgerufen werden.
+
+        :param key: Render-Version (Cache-Schlüssel)
+        :param sequence: Laufende Nummer der Anfrage
+        :return: None
+        """
+        if sequence < self._published_sequence:
+            return
+        self._published = key
+        self._published_sequence = sequence
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ScenarioError(Exception):
+    """
+    Fehler in der Beschreibung eines Szenarios.
+    """
+
+
+def scenario_key(overrides):
+    """
+    Berechnet den Hash eines Szenarios aus seinen normalisierten Änderungen.
+    Szenarien mit denselben Änderungen (unabhängig von Reihenfolge und Namen) erhalten denselben Schlüssel.
+
+    :param overrides: Sortierte Liste von Tupeln aus (Eltern-ID, Kind-ID), Art ('probability' oder 'factor') und Wert
+    :return: SHA-256-Hash als Hex-String
+    """
+    return hashlib.sha256(json.dumps(overrides, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def scenario_probabilities(model, values, node_ids):
+    """
+    Wandelt die Knotenwahrscheinlichkeiten eines Szenarios in ein Dictionary um.
+
+    :param model: Das ProbabilityModel
+    :param values: Knotenwahrscheinlichkeiten des Szenarios (NumPy-Array)
+    :param node_ids: IDs der gewünschten Knoten
+    :return: Dictionary von Knoten-ID zu Wahrscheinlichkeit (None für Knoten in einem Zyklus)
+    """
+    selected = values[[model.index[node_id] for node_id in node_ids]].tolist()
+    return {node_id: (None if math.isnan(value) else value) for node_id, value in zip(node_ids, selected)}
+
+
+class ScenarioSweep:
+    """
+    Wertet Was-wäre-wenn-Szenarien aus, die einzelne Kantenwahrscheinlichkeiten überschreiben ('probability')
+    oder skalieren ('factor'), ohne den Angriffsbaum zu ändern.
+    Alle Szenarien einer Anfrage werden als Matrix (Szenarien × Kanten) gemeinsam ebenenweise ausgewertet.
+    Die Ergebnisse werden je Stand des Graphspeichers und Szenario-Hash zwischengespeichert; bei wiederholten
+    Anfragen werden nur die noch unbekannten Szenarien berechnet.
+    """
+
+    def __init__(self, max_cells=1 << 24, max_entries=4096):
+        """
+        Erstellt die Szenario-Auswertung.
+
+        :param max_cells: Maximale Größe der Ergebnismatrix (Szenarien × Knoten) je Block und im Cache
+        :param max_entries: Maximale Anzahl zwischengespeicherter Szenarien
+        """
+        self.max_cells = max_cells
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._model = None
+        self._edge_index = None
+        self._results = OrderedDict()
+        self._cells = 0
+
+    def _prepare(self, model):
+        """
+        Setzt den Cache zurück, falls sich das Modell geändert hat, und legt die Zuordnung der Kanten an.
+        Muss mit gehaltener Sperre aufgerufen werden.
+
+        :param model: Das ProbabilityModel des aktuellen Standes
+        :return: Dictionary von (Eltern-ID, Kind-ID) zur Position der Kante im Modell
+        """
+        if self._model is not model:
+            self._model = model
+            self._edge_index = {(model.node_ids[parent], model.node_ids[child]): edge for edge, (parent, child)
+                                in enumerate(zip(model.edge_parent.tolist(), model.edge_child.tolist()))}
+            self._results.clear()
+            self._cells = 0
+        return self._edge_index
+
+    def normalize(self, model, scenario, resolve):
+        """
+        Prüft die Änderungen eines Szenarios und bringt sie in eine eindeutige, sortierte Form.
+        Wird dieselbe Kante mehrfach angegeben, gilt die letzte Angabe.
+
+        :param model: Das ProbabilityModel des aktuellen Standes
+        :param scenario: Szenario als Dictionary mit 'overrides' (Liste aus 'parent', 'child' und 'probability'
+                         oder 'factor') und optional 'name'
+        :param resolve: Funktion, die eine Knotenreferenz (ID oder Name) in eine ID umwandelt oder None zurückgibt
+        :return: Sortierte Liste von Tupeln aus (Eltern-ID, Kind-ID), Art und Wert
+        """
+        overrides = scenario.get('overrides') if isinstance(scenario, dict) else None
+        if not isinstance(overrides, list):
+            raise ScenarioError("Jedes Szenario benötigt eine Liste 'overrides'.")
+        with self.lock:
+            edge_index = self._prepare(model)
+        normalized = {}
+        for override in overrides:
+            if not isinstance(override, dict):
+                raise ScenarioError("Jede Änderung muss ein Objekt sein.")
+            parent_id, child_id = resolve(override.get('parent')), resolve(override.get('child'))
+            if (parent_id, child_id) not in edge_index:
+                raise ScenarioError(f"Die Kante '{override.get('parent')}' -> '{override.get('child')}' "
+                                    f"wurde nicht gefunden.")
+            kind = 'probability' if 'probability' in override else 'factor' if 'factor' in override else None
+            if kind is None:
+                raise ScenarioError("Jede Änderung benötigt 'probability' oder 'factor'.")
+            try:
+                value = float(str(override[kind]).replace(',', '.'))
+            except ValueError:
+                raise ScenarioError(f"'{kind}' muss eine Zahl sein.")
+            if not math.isfinite(value) or value < 0 or (kind == 'probability' and value > 1):
+                raise ScenarioError("Wahrscheinlichkeiten müssen zwischen 0 und 1 liegen, Faktoren positiv sein.")
+            normalized[(parent_id, child_id)] = (kind, value)
+        return sorted((edge, kind, value) for edge, (kind, value) in normalized.items())
+
+    @staticmethod
+    def _matrix(model, edge_index, scenarios):
+        """
+        Erstellt die Matrix der Kantenwahrscheinlichkeiten (Szenarien × Kanten).
+
+        :param model: Das ProbabilityModel
+        :param edge_index: Zuordnung von (Eltern-ID, Kind-ID) zur Position der Kante im Modell
+        :param scenarios: Liste der normalisierten Szenarien
+        :return: NumPy-Array der Kantenwahrscheinlichkeiten je Szenario
+        """
+        matrix = np.tile(model.edge_probability, (len(scenarios), 1))
+        for kind in ('probability', 'factor'):
+            rows, edges, values = [], [], []
+            for row, overrides in enumerate(scenarios):
+                for edge, override_kind, value in overrides:
+                    if override_kind == kind:
+                        rows.append(row)
+                        edges.append(edge_index[edge])
+                        values.append(value)
+            if kind == 'probability':
+                matrix[rows, edges] = values
+            else:
+                matrix[rows, edges] *= values
+        return np.minimum(matrix, 1.0)
+
+    def evaluate(self, model, scenarios):
+        """
+        Berechnet die Knotenwahrscheinlichkeiten für die angegebenen Szenarien.
+
+        :param model: Das ProbabilityModel des aktuellen Standes
+        :param scenarios: Liste der normalisierten Szenarien (siehe normalize)
+        :return: Liste von Tupeln aus Szenario-Hash, Knotenwahrscheinlichkeiten und einem Flag, ob das Ergebnis
+                 aus dem Cache stammt
+        """
+        keys = [scenario_key(overrides) for overrides in scenarios]
+        with self.lock:
+            edge_index = self._prepare(model)
+            cached = {key: self._results[key] for key in keys if key in self._results}
+            for key in cached:
+                self._results.move_to_end(key)
+
+        missing = list({key: overrides for key, overrides in zip(keys, scenarios) if key not in cached}.items())
+        computed = {}
+        chunk_size = max(1, self.max_cells // max(len(model.node_ids), 1))
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            values = model.evaluate(self._matrix(model, edge_index, [overrides for _, overrides in chunk]))
+            # Zeilen kopieren, damit der Cache nicht den ganzen Block festhält
+            computed.update((key, row.copy()) for (key, _), row in zip(chunk, values))
+
+        with self.lock:
+            if self._model is model:
+                for key, values in computed.items():
+                    self._results[key] = values
+                    self._cells += len(values)
+                while self._results and (len(self._results) > self.max_entries or self._cells > self.max_cells):
+                    self._cells -= len(self._results.popitem(last=False)[1])
+        return [(key, cached[key], True) if key in cached else (key, computed[key], False) for key in keys]
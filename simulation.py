@@ -0,0 +1,130 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+
+def simulate_shard(levels, edge_probability, node_count, trials, seed, deadline, chunk_size):
+    """
+    Simuliert einen Teil der Durchläufe. Wird in einem Worker-Prozess ausgeführt.
+    Jede Kante gelingt je Durchlauf mit ihrer Wahrscheinlichkeit; ein Knoten gilt als erreicht, wenn für einen
+    seiner Terme alle Kanten gelingen und deren Kindknoten erreicht sind. Da jeder Knoten je Durchlauf nur einmal
+    ausgewertet wird, sind Knoten mit mehreren Elternknoten in allen Elternknoten identisch (korreliert).
+
+    :param levels: Ebenen des ProbabilityModel
+    :param edge_probability: Kantenwahrscheinlichkeiten in der Reihenfolge des Modells
+    :param node_count: Anzahl der Knoten
+    :param trials: Maximale Anzahl an Durchläufen
+    :param seed: Startwert (SeedSequence) für den Zufallsgenerator
+    :param deadline: Zeitpunkt (time.time()), nach dem keine weiteren Blöcke gestartet werden
+    :param chunk_size: Anzahl der Durchläufe, die gemeinsam als Bitmatrix ausgewertet werden
+    :return: Tupel aus den Treffern je Knoten und der Anzahl der ausgeführten Durchläufe
+    """
+    rng = np.random.default_rng(seed)
+    # Vergleich in float32, damit die Zufallszahlen nicht in float64 umgewandelt werden
+    edge_probability = np.asarray(edge_probability, dtype=np.float32)
+    hits = np.zeros(node_count, dtype=np.int64)
+    done = 0
+    while done < trials and (done == 0 or time.time() < deadline):
+        count = min(chunk_size, trials - done)
+        width = -(-count // 64) * 64
+        # Zustand als Bitmatrix Knoten × Durchläufe (64 Durchläufe je Wort), Blätter gelten als erreicht
+        state = np.full((node_count, width // 64), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for first_edge, last_edge, children, term_start, parent_start, parents in levels:
+            draws = rng.random((last_edge - first_edge, width), dtype=np.float32)
+            events = np.packbits(draws < edge_probability[first_edge:last_edge, None], axis=1).view(np.uint64)
+            terms = np.bitwise_and.reduceat(events & state[children], term_start, axis=0)
+            state[parents] = np.bitwise_or.reduceat(terms, parent_start, axis=0)
+        hits += np.unpackbits(state.view(np.uint8), axis=1, count=count).sum(axis=1, dtype=np.int64)
+        done += count
+    return hits, done
+
+
+def wilson_interval(hits, trials, z=1.96):
+    """
+    Berechnet das Wilson-Konfidenzintervall für einen geschätzten Anteil.
+
+    :param hits: Anzahl der Treffer
+    :param trials: Anzahl der Durchläufe
+    :param z: Quantil der Normalverteilung (Standard: 1.96 für 95 %)
+    :return: Tupel aus unterer und oberer Grenze
+    """
+    if not trials:
+        return 0.0, 1.0
+    estimate = hits / trials
+    denominator = 1 + z * z / trials
+    center = (estimate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(estimate * (1 - estimate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class MonteCarloSimulator:
+    """
+    Schätzt die Erfolgswahrscheinlichkeiten der Knoten durch zufällige Durchläufe des Angriffsbaums.
+    Die Durchläufe werden in eine feste Anzahl von Teilen mit eigenen Startwerten aufgeteilt, sodass das Ergebnis
+    bei gleichem Startwert und erreichter Anzahl an Durchläufen unabhängig von der Anzahl der Worker-Prozesse ist.
+    Kleine Simulationen werden ohne Prozess-Pool im aktuellen Prozess ausgeführt.
+    """
+
+    def __init__(self, max_workers=2, shards=8, max_cells=1 << 24, inline_limit=1 << 24):
+        """
+        Erstellt den Simulator.
+
+        :param max_workers: Maximale Anzahl an Worker-Prozessen
+        :param shards: Anzahl der Teile, in die die Durchläufe aufgeteilt werden
+        :param max_cells: Maximale Größe der Zustandsmatrix (Knoten × Durchläufe) je Block in Bits
+        :param inline_limit: Bis zu dieser Anzahl an Kanten × Durchläufen wird ohne Prozess-Pool simuliert
+        """
+        self.max_workers = max_workers
+        self.shards = shards
+        self.max_cells = max_cells
+        self.inline_limit = inline_limit
+        self._executor = None
+
+    def _executor_instance(self):
+        """
+        Erstellt den Prozess-Pool bei der ersten Verwendung.
+
+        :return: Der ProcessPoolExecutor
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def run(self, model, trials=100_000, seed=None, time_budget=5.0):
+        """
+        Führt die Simulation für das angegebene Modell aus.
+
+        :param model: Das ProbabilityModel des Angriffsbaums
+        :param trials: Maximale Anzahl an Durchläufen
+        :param seed: Startwert für reproduzierbare Ergebnisse (Standard: zufällig)
+        :param time_budget: Maximale Laufzeit in Sekunden; danach werden keine weiteren Blöcke gestartet
+        :return: Tupel aus den Treffern je Knoten (NumPy-Array) und der Anzahl der ausgeführten Durchläufe
+        """
+        node_count = len(model.node_ids)
+        chunk_size = max(64, min(8192, self.max_cells // max(node_count, 1)) // 64 * 64)
+        deadline = time.time() + time_budget
+        seeds = np.random.SeedSequence(seed).spawn(self.shards)
+        shard_trials = [trials // self.shards + (1 if index < trials % self.shards else 0)
+                        for index in range(self.shards)]
+        arguments = [(model.levels, model.edge_probability, node_count, count, shard_seed, deadline, chunk_size)
+                     for count, shard_seed in zip(shard_trials, seeds) if count]
+
+        if trials * len(model.edge_probability) <= self.inline_limit:
+            results = [simulate_shard(*shard) for shard in arguments]
+        else:
+            try:
+                futures = [self._executor_instance().submit(simulate_shard, *shard) for shard in arguments]
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                self._executor = None
+                raise
+
+        hits = np.zeros(node_count, dtype=np.int64)
+        done = 0
+        for shard_hits, shard_done in results:
+            hits += shard_hits
+            done += shard_done
+        return hits, done
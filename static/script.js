@@ -402,3 +402,123 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
+
+document.addEventListener('DOMContentLoaded', () => {
+    /**
+     * Tauscht das Angriffsbaum-Bild aus, sobald das Rendern im Hintergrund abgeschlossen ist.
+     * Fragt den Stand der angeforderten Render-Version beim Server ab, solange das Bild noch nicht bereitsteht.
+     */
+    // Wähle das Bild und den Link auf das Bild
+    const img = document.getElementById('attack-tree-img');
+    const link = document.getElementById('attack-tree-link');
+    const renderVersion = img.dataset.renderVersion;
+
+    // Wenn bereits das aktuelle Bild angezeigt wird, ist nichts zu tun
+    if (!renderVersion || img.dataset.publishedVersion === renderVersion) {
+        return;
+    }
+
+    // Frage den Stand des Renderauftrags ab und tausche das Bild aus, sobald es fertig ist
+    function pollRenderStatus() {
+        fetch(`/render_status/${renderVersion}`)
+            .then(response => response.json())
+            .then(status => {
+                if (status.ready) {
+                    img.src = img.dataset.renderSrc;
+                    link.href = img.dataset.renderSrc;
+                } else if (status.failed) {
+                    console.error('Error rendering attack tree:', status.failed);
+                } else {
+                    setTimeout(pollRenderStatus, 1000);
+                }
+            });
+    }
+
+    pollRenderStatus();
+});
+
+
+function searchNodes(query) {
+    /**
+     * Sucht Knoten über ihren Namen beim Server.
+     *
+     * @param {string} query - Der Suchbegriff (leer für die ersten Knoten des Baums).
+     * @return {Promise<Object>} - Die Antwort von /api/nodes/search mit 'total' und 'items'.
+     */
+    return fetch(`/api/nodes/search?q=${encodeURIComponent(query)}&limit=50`)
+        .then(response => response.json());
+}
+
+function fillNodeSelect(select, result) {
+    /**
+     * Ersetzt die Knoten einer Auswahlliste durch die Treffer einer Suche.
+     * Feste Einträge (z.B. "Keine Änderung") bleiben erhalten. Gibt es mehr Treffer als angezeigt werden,
+     * weist ein deaktivierter Eintrag darauf hin, die Suche zu verfeinern.
+     *
+     * @param {HTMLSelectElement} select - Die Auswahlliste.
+     * @param {Object} result - Die Antwort von /api/nodes/search.
+     */
+    // Entferne die Treffer der vorherigen Suche
+    select.querySelectorAll('option.node-option').forEach(option => option.remove());
+    // Füge die neuen Treffer hinzu
+    for (const node of result.items) {
+        const option = document.createElement('option');
+        option.className = 'node-option';
+        option.value = node.id;
+        option.textContent = node.name;
+        select.appendChild(option);
+    }
+    // Weise auf weitere Treffer hin
+    const remaining = result.total - result.offset - result.items.length;
+    if (remaining > 0) {
+        const option = document.createElement('option');
+        option.className = 'node-option';
+        option.disabled = true;
+        option.textContent = `… ${remaining} weitere Treffer, bitte Suche verfeinern`;
+        select.appendChild(option);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    /**
+     * Füllt die Knoten-Auswahllisten der Formulare über die Such-API, statt alle Knoten in die Seite zu schreiben.
+     * Beim Laden werden die ersten Knoten einmalig für alle Listen abgefragt; Eingaben in den Suchfeldern lösen
+     * nach einer kurzen Pause eine neue Suche für die zugehörige Liste aus.
+     */
+    // Wähle alle Knoten-Auswahllisten
+    const selects = document.querySelectorAll('select.node-select');
+    if (selects.length === 0) {
+        return;
+    }
+
+    // Fülle alle Listen mit den ersten Knoten des Baums
+    searchNodes('').then(result => selects.forEach(select => fillNodeSelect(select, result)));
+
+    document.querySelectorAll('input.node-search').forEach(input => {
+        const select = document.getElementById(input.dataset.select);
+        let timer = null;
+        let sequence = 0;
+
+        // Verhindere, dass Enter im Suchfeld das Formular absendet
+        input.addEventListener('keydown', event => {
+            if (event.key === 'Enter') {
+                event.preventDefault();
+            }
+        });
+
+        // Suche erst, wenn die Eingabe kurz ruht, und verwirf Antworten auf ältere Eingaben
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const current = ++sequence;
+                searchNodes(input.value).then(result => {
+                    if (current !== sequence) {
+                        return;
+                    }
+                    fillNodeSelect(select, result);
+                    select.dispatchEvent(new Event('change'));
+                });
+            }, 250);
+        });
+    });
+});
@@ -0,0 +1,499 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from helper_functions import load_data, save_data
+from journal import MutationJournal
+from render_cache import write_file_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Version am Anfang eines Snapshots (die Version wird immer als erstes Feld geschrieben)
+SNAPSHOT_VERSION = re.compile(rb'^\s*\{\s*"version"\s*:\s*(\d+)')
+
+
+def file_signature(path):
+    """
+    Gibt ein Merkmal zurück, das sich bei jeder Änderung der Datei ändert (Inode, Größe, Änderungszeit).
+
+    :param path: Pfad zur Datei
+    :return: Tupel oder None, falls die Datei nicht existiert
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class FileLock:
+    """
+    Exklusive Sperre über eine Sperrdatei, die auch zwischen mehreren Prozessen (z.B. Workern eines WSGI-Servers)
+    wirkt. Unter POSIX wird lockf verwendet, da diese Sperren anders als flock nicht an per fork gestartete
+    Kindprozesse (z.B. den Render-Pool) vererbt werden. Threads desselben Prozesses werden zusätzlich über eine
+    Thread-Sperre ausgeschlossen; innerhalb eines Threads kann die Sperre geschachtelt angefordert werden.
+    """
+
+    def __init__(self, path):
+        """
+        Erstellt die Sperre für die angegebene Sperrdatei.
+
+        :param path: Pfad zur Sperrdatei
+        """
+        self.path = path
+        self._mutex = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def acquire(self):
+        """
+        Wartet, bis die Sperre frei ist, und hält sie bis zum Ende des with-Blocks.
+
+        :return: Kontextmanager
+        """
+        with self._mutex:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a+b') as file:
+                file.seek(0)
+                if fcntl is not None:
+                    fcntl.lockf(file.fileno(), fcntl.LOCK_EX, 1, 0)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+                self._depth = 1
+                try:
+                    yield
+                finally:
+                    self._depth = 0
+                    file.seek(0)
+                    if fcntl is not None:
+                        fcntl.lockf(file.fileno(), fcntl.LOCK_UN, 1, 0)
+                    else:
+                        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class JsonStorage:
+    """
+    Speichert den Angriffsbaum als JSON-Snapshot mit einem Journal für die Änderungen seit dem letzten Snapshot.
+    Schreibzugriffe mehrerer Prozesse werden über eine Sperrdatei serialisiert. Andere Prozesse holen neue
+    Journal-Einträge nach, ohne dafür die Sperre zu benötigen: Das Journal wird nur angehängt und der Snapshot
+    nur atomar ersetzt.
+    """
+
+    def __init__(self, file_path='config/attack_tree_data.json', journal_path=None):
+        """
+        Erstellt den Speicher für die angegebene JSON-Datei.
+
+        :param file_path: Pfad zur JSON-Datei (Snapshot)
+        :param journal_path: Pfad zum Journal (Standard: Snapshot-Pfad mit Endung '.journal')
+        """
+        self.file_path = file_path
+        self.journal = MutationJournal(journal_path or f"{file_path.rsplit('.', 1)[0]}.journal")
+        self.lock = FileLock(f"{file_path.rsplit('.', 1)[0]}.lock")
+        self._compaction = None
+
+    def locked(self):
+        """
+        Sperrt den Speicher für Schreibzugriffe anderer Threads und Prozesse.
+
+        :return: Kontextmanager
+        """
+        return self.lock.acquire()
+
+    def signature(self):
+        """
+        Gibt ein Merkmal des gespeicherten Standes zurück, das sich bei jeder Änderung durch einen Prozess ändert.
+
+        :return: Vergleichbares Merkmal aus Snapshot und Journal-Dateien
+        """
+        return tuple(file_signature(path) for path in (self.file_path, self.journal.file_path,
+                                                       self.journal.rotated_path))
+
+    def snapshot_version(self):
+        """
+        Liest die Version des Snapshots, ohne die Datei vollständig zu laden.
+
+        :return: Die Version (0, falls der Snapshot keine Version enthält)
+        """
+        with open(self.file_path, 'rb') as file:
+            match = SNAPSHOT_VERSION.match(file.read(256))
+        return int(match.group(1)) if match else 0
+
+    def changes(self, after_version):
+        """
+        Gibt die Journal-Einträge zurück, die seit der angegebenen Version (z.B. von anderen Prozessen)
+        geschrieben wurden.
+
+        :param after_version: Die Version des Standes im Speicher
+        :return: Liste der Einträge oder None, falls der Stand vollständig neu geladen werden muss
+                 (z.B. nach dem Hochladen eines neuen Projekts oder einer Verdichtung)
+        """
+        records = list(self.journal.read(after_version))
+        if self.snapshot_version() > after_version:
+            return None
+        if records and records[0]['v'] != after_version + 1:
+            return None
+        return records
+
+    def load(self):
+        """
+        Lädt den Snapshot und die neueren Journal-Einträge.
+
+        :return: Tupel aus den Daten des Snapshots und der Liste der noch anzuwendenden Einträge
+        """
+        data = load_data(self.file_path)
+        return data, list(self.journal.read(data.get('version', 0)))
+
+    def write(self, records, snapshot):
+        """
+        Hängt die Einträge an das Journal an.
+        Startet die Verdichtung in den Snapshot, sobald das Journal die Größengrenze erreicht hat.
+
+        :param records: Liste der Journal-Einträge
+        :param snapshot: Funktion, die den aktuellen Stand inklusive Version liefert
+        :return: None
+        """
+        if records:
+            self.journal.append([json.dumps(record, separators=(',', ':')) for record in records])
+        if self.journal.needs_compaction() and self._compaction is None:
+            self._start_compaction(snapshot())
+
+    def replace(self, snapshot):
+        """
+        Schreibt einen vollständig neuen Stand als Snapshot und leert das Journal.
+
+        :param snapshot: Der neue Stand inklusive Version
+        :return: None
+        """
+        save_data(snapshot, self.file_path)
+        self.journal.clear()
+
+    def _start_compaction(self, snapshot):
+        """
+        Verschiebt das Journal zur Seite und schreibt den Stand im Hintergrund als Snapshot.
+        Da Knoten und Kanten im Graphspeicher nur ersetzt und nie verändert werden,
+        genügt eine flache Kopie der Listen als Snapshot.
+
+        :param snapshot: Der zu schreibende Stand inklusive Version
+        :return: None
+        """
+        self.journal.rotate()
+        rotated = file_signature(self.journal.rotated_path)
+        self._compaction = threading.Thread(target=self._compact, args=(snapshot, rotated), daemon=True)
+        self._compaction.start()
+
+    def _compact(self, snapshot, rotated):
+        """
+        Schreibt den Snapshot atomar und löscht anschließend das verschobene Journal.
+        Der Snapshot wird ohne Sperre erstellt; ersetzt wird er nur, wenn das verschobene Journal in der
+        Zwischenzeit weder gelöscht (neues Projekt) noch von einem anderen Prozess erweitert wurde.
+
+        :param snapshot: Der zu schreibende Stand inklusive Version
+        :param rotated: Merkmal des verschobenen Journals (siehe file_signature)
+        :return: None
+        """
+        try:
+            content = json.dumps(snapshot, indent=4).encode('utf-8')
+            with self.locked():
+                if file_signature(self.journal.rotated_path) == rotated:
+                    write_file_atomic(self.file_path, content, sync=True)
+                    self.journal.discard_rotated()
+        finally:
+            self._compaction = None
+
+
+class SqliteStorage:
+    """
+    Speichert den Angriffsbaum in einer SQLite-Datenbank mit Tabellen für Knoten, Kanten und Attribute.
+    Die Datenbank läuft im WAL-Modus, sodass Leser nicht auf einen Schreibvorgang warten müssen.
+    Änderungen werden zeilenweise geschrieben und betreffen nur die jeweils geänderten Datensätze.
+    Gelesen wird immer der vollständige Stand, da der Graphspeicher den Baum im Speicher hält und dort indiziert;
+    die Datenbank hat daher nur die Indizes, die das Schreiben einzelner Datensätze braucht.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS nodes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS edges (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent TEXT NOT NULL,
+            child TEXT NOT NULL,
+            data TEXT NOT NULL,
+            UNIQUE (parent, child)
+        );
+        -- Für das Löschen der Kanten eines Knotens; Kanten nach Elternknoten deckt UNIQUE (parent, child) ab
+        CREATE INDEX IF NOT EXISTS idx_edges_child ON edges (child);
+        CREATE TABLE IF NOT EXISTS attributes (
+            node_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            display_in_tree TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (node_id, key)
+        );
+    '''
+
+    def __init__(self, file_path='config/attack_tree_data.sqlite3', import_path='config/attack_tree_data.json'):
+        """
+        Öffnet die Datenbank und legt das Schema an, falls es noch nicht existiert.
+        Ist die Datenbank leer, wird der Stand aus der angegebenen JSON-Datei übernommen.
+
+        :param file_path: Pfad zur SQLite-Datenbank
+        :param import_path: Pfad zur JSON-Datei, die in eine leere Datenbank übernommen wird
+        """
+        self.file_path = file_path
+        self.import_path = import_path
+        self.lock = FileLock(f"{file_path}.lock")
+        self.connection = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+
+    def locked(self):
+        """
+        Sperrt den Speicher für Schreibzugriffe anderer Threads und Prozesse.
+
+        :return: Kontextmanager
+        """
+        return self.lock.acquire()
+
+    def signature(self):
+        """
+        Gibt ein Merkmal des gespeicherten Standes zurück. PRAGMA data_version ändert sich, sobald eine andere
+        Verbindung (z.B. ein anderer Prozess) eine Änderung festgeschrieben hat.
+
+        :return: Vergleichbares Merkmal
+        """
+        return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def changes(self, after_version):
+        """
+        Prüft, ob ein anderer Prozess den Stand geändert hat. Einzelne Änderungen werden in der Datenbank nicht
+        aufgezeichnet, daher wird bei einer neueren Version vollständig neu geladen.
+
+        :param after_version: Die Version des Standes im Speicher
+        :return: Leere Liste, falls der Stand aktuell ist, sonst None
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return [] if row is None or int(row[0]) == after_version else None
+
+    def load(self):
+        """
+        Lädt alle Knoten, Kanten und Attribute aus der Datenbank.
+
+        :return: Tupel aus den Daten und einer leeren Liste (es gibt keine nachzuholenden Einträge)
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None:
+            data = load_data(self.import_path) if os.path.exists(self.import_path) else {"nodes": [], "edges": []}
+            self.replace({**data, "version": data.get('version', 0)})
+            row = (str(data.get('version', 0)),)
+
+        attributes = {}
+        for node_id, key, value, display_in_tree in self.connection.execute(
+                'SELECT node_id, key, value, display_in_tree FROM attributes ORDER BY node_id, position'):
+            attributes.setdefault(node_id, {})[key] = {"value": value, "display_in_tree": display_in_tree}
+
+        nodes = [
+            {"id": node_id, "name": name, **json.loads(data), "attributes": attributes.get(node_id, {})}
+            for node_id, name, data in self.connection.execute('SELECT id, name, data FROM nodes ORDER BY seq')
+        ]
+        edges = [
+            {"parent": parent, "child": child, **json.loads(data)}
+            for parent, child, data in self.connection.execute('SELECT parent, child, data FROM edges ORDER BY seq')
+        ]
+        return {"version": int(row[0]), "nodes": nodes, "edges": edges}, []
+
+    def write(self, records, snapshot):
+        """
+        Wendet die Einträge in einer Transaktion auf die betroffenen Zeilen an.
+
+        :param records: Liste der Journal-Einträge
+        :param snapshot: Wird nicht benötigt (Schnittstelle wie bei JsonStorage)
+        :return: None
+        """
+        if not records:
+            return
+        with self._transaction() as cursor:
+            for record in records:
+                self._apply(cursor, record)
+            self._set_version(cursor, records[-1]['v'])
+
+    def replace(self, snapshot):
+        """
+        Ersetzt den gesamten Inhalt der Datenbank durch den angegebenen Stand.
+
+        :param snapshot: Der neue Stand inklusive Version
+        :return: None
+        """
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM nodes')
+            cursor.execute('DELETE FROM edges')
+            cursor.execute('DELETE FROM attributes')
+            for node in snapshot.get('nodes', []):
+                self._upsert_node(cursor, node)
+            for edge in snapshot.get('edges', []):
+                self._upsert_edge(cursor, edge)
+            self._set_version(cursor, snapshot.get('version', 0))
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Öffnet eine Schreibtransaktion und schließt sie ab bzw. rollt sie bei einem Fehler zurück.
+
+        :return: Generator, der einen Cursor der Transaktion liefert
+        """
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        else:
+            cursor.execute('COMMIT')
+        finally:
+            cursor.close()
+
+    def _apply(self, cursor, record):
+        """
+        Übersetzt einen Journal-Eintrag in die Änderungen an den betroffenen Zeilen.
+
+        :param cursor: Cursor der laufenden Transaktion
+        :param record: Der Journal-Eintrag
+        :return: None
+        """
+        op = record['op']
+        if op == 'add_node':
+            self._upsert_node(cursor, record['node'])
+        elif op == 'rename_node':
+            cursor.execute('UPDATE nodes SET name = ? WHERE id = ?', (record['name'], record['id']))
+        elif op == 'update_node':
+            row = cursor.execute('SELECT data FROM nodes WHERE id = ?', (record['id'],)).fetchone()
+            if row is None:
+                return
+            values = dict(record['set'])
+            if 'attributes' in values:
+                self._replace_attributes(cursor, record['id'], values.pop('attributes'))
+            data = {**json.loads(row[0]), **values}
+            for key in record['unset']:
+                data.pop(key, None)
+            cursor.execute('UPDATE nodes SET data = ? WHERE id = ?', (json.dumps(data), record['id']))
+        elif op == 'remove_node':
+            cursor.execute('DELETE FROM nodes WHERE id = ?', (record['id'],))
+            cursor.execute('DELETE FROM attributes WHERE node_id = ?', (record['id'],))
+            cursor.execute('DELETE FROM edges WHERE parent = ?', (record['id'],))
+            cursor.execute('DELETE FROM edges WHERE child = ?', (record['id'],))
+        elif op == 'add_edge':
+            self._upsert_edge(cursor, record['edge'])
+        elif op == 'update_edge':
+            row = cursor.execute('SELECT data FROM edges WHERE parent = ? AND child = ?',
+                                 (record['parent'], record['child'])).fetchone()
+            if row is not None:
+                data = {**json.loads(row[0]), **record['set']}
+                cursor.execute('UPDATE edges SET data = ? WHERE parent = ? AND child = ?',
+                               (json.dumps(data), record['parent'], record['child']))
+        elif op == 'remove_edge':
+            cursor.execute('DELETE FROM edges WHERE parent = ? AND child = ?', (record['parent'], record['child']))
+        elif op == 'move_edge':
+            row = cursor.execute('SELECT data FROM edges WHERE parent = ? AND child = ?',
+                                 (record['parent'], record['child'])).fetchone()
+            if row is not None:
+                cursor.execute('DELETE FROM edges WHERE parent = ? AND child = ?', (record['parent'], record['child']))
+                self._upsert_edge(cursor, {"parent": record['new_parent'], "child": record['child'],
+                                           **json.loads(row[0])})
+
+    def _upsert_node(self, cursor, node):
+        """
+        Fügt einen Knoten samt Attributen ein oder aktualisiert ihn unter Beibehaltung seiner Position.
+
+        :param cursor: Cursor der laufenden Transaktion
+        :param node: Der Knoten
+        :return: None
+        """
+        data = {key: value for key, value in node.items() if key not in ('id', 'name', 'attributes')}
+        cursor.execute(
+            'INSERT INTO nodes (id, name, data) VALUES (?, ?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET name = excluded.name, data = excluded.data',
+            (node['id'], node['name'], json.dumps(data)))
+        self._replace_attributes(cursor, node['id'], node.get('attributes', {}))
+
+    def _upsert_edge(self, cursor, edge):
+        """
+        Fügt eine Kante ein oder aktualisiert sie unter Beibehaltung ihrer Position.
+
+        :param cursor: Cursor der laufenden Transaktion
+        :param edge: Die Kante
+        :return: None
+        """
+        data = {key: value for key, value in edge.items() if key not in ('parent', 'child')}
+        cursor.execute(
+            'INSERT INTO edges (parent, child, data) VALUES (?, ?, ?) '
+            'ON CONFLICT (parent, child) DO UPDATE SET data = excluded.data',
+            (edge['parent'], edge['child'], json.dumps(data)))
+
+    def _replace_attributes(self, cursor, node_id, attributes):
+        """
+        Ersetzt alle Attribute eines Knotens.
+
+        :param cursor: Cursor der laufenden Transaktion
+        :param node_id: ID des Knotens
+        :param attributes: Dictionary der Attribute
+        :return: None
+        """
+        cursor.execute('DELETE FROM attributes WHERE node_id = ?', (node_id,))
+        cursor.executemany(
+            'INSERT INTO attributes (node_id, key, value, display_in_tree, position) VALUES (?, ?, ?, ?, ?)',
+            [(node_id, key, attribute.get('value', ''), attribute.get('display_in_tree', 'false'), position)
+             for position, (key, attribute) in enumerate(attributes.items())])
+
+    def _set_version(self, cursor, version):
+        """
+        Speichert die Version des Standes in der Datenbank.
+
+        :param cursor: Cursor der laufenden Transaktion
+        :param version: Die Version
+        :return: None
+        """
+        cursor.execute("INSERT INTO meta (key, value) VALUES ('version', ?) "
+                       "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (str(version),))
+
+
+def create_storage(backend='json'):
+    """
+    Erstellt den Speicher für das angegebene Backend.
+
+    :param backend: 'json' (Snapshot mit Journal) oder 'sqlite'
+    :return: Das Speicher-Objekt
+    """
+    if backend == 'sqlite':
+        return SqliteStorage()
+    if backend == 'json':
+        return JsonStorage()
+    raise ValueError(f"Unbekanntes Speicher-Backend: {backend}")
@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_store import GraphStore
+from storage import JsonStorage
+
+
+def node(node_id, group=None, **attributes):
+    """
+    Erstellt einen Knoten für Tests; der Name entspricht der ID.
+
+    :param node_id: ID des Knotens
+    :param group: Optionale AND-Gruppe
+    :param attributes: Attributwerte des Knotens
+    :return: Der Knoten
+    """
+    result = {'id': node_id, 'name': node_id, 'color': 'black',
+              'attributes': {key: {'value': str(value), 'display_in_tree': 'false'}
+                             for key, value in attributes.items()}}
+    if group:
+        result['group'] = group
+    return result
+
+
+def edge(parent, child, probability='1'):
+    """
+    Erstellt eine Kante für Tests.
+
+    :param parent: ID des Elternknotens
+    :param child: ID des Kindknotens
+    :param probability: Wahrscheinlichkeit der Kante als String
+    :return: Die Kante
+    """
+    return {'parent': parent, 'child': child, 'probability': str(probability), 'color': 'black'}
+
+
+def random_graph(rng, count, extra_edges=0, probabilities=('0', '0,25', '0.5', '0,75', '1')):
+    """
+    Erstellt einen zufälligen Angriffsbaum mit den Knoten 'n0' bis 'n<count - 1>'. Jeder Knoten außer 'n0' hängt an
+    einem Knoten mit kleinerer Nummer; zusätzliche Kanten erzeugen gemeinsame Teilziele, aber nie einen Zyklus.
+
+    :param rng: Zufallsgenerator (random.Random)
+    :param count: Anzahl der Knoten
+    :param extra_edges: Anzahl der Versuche, eine zusätzliche Kante anzulegen
+    :param probabilities: Mögliche Kantenwahrscheinlichkeiten
+    :return: Tupel aus Knoten und Kanten
+    """
+    nodes = [node(f'n{index}', group=rng.choice([None, 'g1', 'g2'])) for index in range(count)]
+    pairs = {(rng.randrange(index), index) for index in range(1, count)}
+    for _ in range(extra_edges if count > 1 else 0):
+        pairs.add(tuple(sorted(rng.sample(range(count), 2))))
+    edges = [edge(f'n{parent}', f'n{child}', rng.choice(probabilities)) for parent, child in sorted(pairs)]
+    return nodes, edges
+
+
+def random_edit(store, rng):
+    """
+    Führt eine zufällige Änderung über die öffentlichen Methoden des Graphspeichers aus. Kanten zeigen immer von
+    einer kleineren zu einer größeren Knotennummer ('n<Nummer>'), sodass nie ein Zyklus entsteht.
+    Wahrscheinlichkeiten und Kosten sind im Binärsystem exakt darstellbar, damit Referenzberechnungen ohne
+    Rundungsfehler vergleichbar sind.
+
+    :param store: Der Graphspeicher
+    :param rng: Zufallsgenerator (random.Random)
+    :return: Name der ausgeführten Änderung
+    """
+    def number(node_id):
+        return int(node_id[1:])
+
+    def probability():
+        return rng.choice(['0', '0,25', '0.5', '0,75', '1'])
+
+    def attributes():
+        values = {}
+        for key in rng.sample(['cost', 'Zeit', 'skill', 'os'], rng.randint(0, 4)):
+            value = rng.choice(['Windows', 'Linux', 'macOS']) if key == 'os' else rng.randint(0, 9)
+            values[key] = {'value': str(value), 'display_in_tree': 'false'}
+        return values
+
+    node_ids = list(store.nodes_by_id)
+    edges = store.edges
+    operation = rng.choice(['add_node'] * 4 + ['add_edge'] * 2 + ['update_edge', 'remove_edge', 'remove_node',
+                                                                  'group', 'attributes', 'rename', 'move_edge'])
+    if operation == 'add_node' or not node_ids:
+        node_id = f"n{max(map(number, node_ids), default=-1) + 1}"
+        new_node = {'id': node_id, 'name': node_id, 'color': 'black', 'attributes': attributes()}
+        if rng.random() < 0.5:
+            new_node['group'] = rng.choice(['g1', 'g2', 'g3'])
+        store.add_node(new_node)
+        if node_ids:
+            store.add_edge(edge(rng.choice(node_ids), node_id, probability()))
+        return 'add_node'
+    if operation == 'add_edge' and len(node_ids) > 1:
+        parent_id, child_id = sorted(rng.sample(node_ids, 2), key=number)
+        if store.edge(parent_id, child_id) is None:
+            store.add_edge(edge(parent_id, child_id, probability()))
+    elif operation == 'update_edge' and edges:
+        changed = rng.choice(edges)
+        store.update_edge(changed['parent'], changed['child'], {'probability': probability()})
+    elif operation == 'remove_edge' and edges:
+        removed = rng.choice(edges)
+        store.remove_edge(removed['parent'], removed['child'])
+    elif operation == 'remove_node' and len(node_ids) > 1:
+        store.remove_node(rng.choice(node_ids))
+    elif operation == 'group':
+        node_id = rng.choice(node_ids)
+        if rng.random() < 0.3:
+            store.update_node(node_id, removed=['group'])
+        else:
+            store.update_node(node_id, {'group': rng.choice(['g1', 'g2', 'g3'])})
+    elif operation == 'attributes':
+        store.update_node(rng.choice(node_ids), {'attributes': attributes()})
+    elif operation == 'rename':
+        node_id = rng.choice(node_ids)
+        store.rename_node(node_id, f"{node_id}-{rng.choice(['alpha', 'Beta', 'gamma', 'ALPHABET'])}")
+    elif operation == 'move_edge' and edges:
+        moved = rng.choice(edges)
+        candidates = [node_id for node_id in node_ids if number(node_id) < number(moved['child'])]
+        if candidates:
+            store.move_edge(moved, rng.choice(candidates))
+    return operation
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """
+    Liefert eine Funktion, die einen Graphspeicher mit JSON-Snapshot und Journal im temporären Verzeichnis anlegt.
+    """
+    def create(nodes=(), edges=(), name='attack_tree_data.json'):
+        path = tmp_path / name
+        path.write_text(json.dumps({'version': 0, 'nodes': list(nodes), 'edges': list(edges)}), encoding='utf-8')
+        store = GraphStore(JsonStorage(str(path)))
+        store.load()
+        return store
+    return create
+
+
+@pytest.fixture
+def client(monkeypatch, make_store):
+    """
+    Liefert einen Test-Client der Anwendung, deren Graphspeicher durch einen temporären Speicher mit Wurzel 'root'
+    und den Kindknoten 'a' und 'b' ersetzt ist.
+    """
+    import app as app_module
+    store = make_store([node('root'), node('a'), node('b')], [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')])
+    monkeypatch.setattr(app_module, 'store', store)
+    # Keine Render-Prozesse starten; die Render-Version ergibt sich allein aus der DOT-Quelle
+    monkeypatch.setattr(app_module.render_scheduler, 'request', app_module.render_cache.key)
+    app_module.app.config['TESTING'] = True
+    client = app_module.app.test_client()
+    client.store = store
+    return client
+
+
+def flashes(client):
+    """
+    Entnimmt die vorgemerkten Flash-Nachrichten aus der Sitzung des Test-Clients.
+
+    :param client: Der Test-Client
+    :return: Liste von Tupeln aus Kategorie und Nachricht
+    """
+    with client.session_transaction() as session:
+        return session.pop('_flashes', [])
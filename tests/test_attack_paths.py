@@ -0,0 +1,89 @@
+import math
+import random
+from itertools import product
+
+import pytest
+
+from conftest import edge, node, random_graph
+from probability import parse_probability
+
+
+def all_paths(store, node_id):
+    """
+    Zählt alle Angriffspfade eines Knotens vollständig auf (Referenz für den AttackPathEnumerator).
+    Terme mit Wahrscheinlichkeit 0 werden wie dort ausgelassen.
+    """
+    terms = {}
+    for child_id, child_edge in store.child_edges.get(node_id, {}).items():
+        key = store.node(child_id).get('group') or ('', child_id)
+        terms.setdefault(key, []).append((child_id, parse_probability(child_edge['probability'])))
+    if not terms:
+        return [(1.0, [])]
+    paths = []
+    for term in terms.values():
+        probability = math.prod(value for _, value in term)
+        if not probability > 0:
+            continue
+        for combination in product(*(all_paths(store, child_id) for child_id, _ in term)):
+            paths.append((probability * math.prod(value for value, _ in combination),
+                          [(node_id, child_id) for child_id, _ in term]
+                          + [path_edge for _, edges in combination for path_edge in edges]))
+    return paths
+
+
+def canonical(paths):
+    return sorted((round(probability, 12), sorted(edges)) for probability, edges in paths)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_paths_match_full_enumeration(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store(*random_graph(rng, rng.randint(1, 9), extra_edges=rng.randint(0, 3)))
+    expected = [path for root_id in store.topology.roots() for path in all_paths(store, root_id)]
+
+    enumerator = store.probabilities.attack_paths()
+    paths = enumerator.paths(len(expected) + 5)
+
+    assert canonical(paths) == canonical(expected)
+    probabilities = [probability for probability, _ in paths]
+    assert probabilities == sorted(probabilities, reverse=True)
+
+
+def test_paths_are_extended_incrementally(make_store):
+    store = make_store(*random_graph(random.Random(11), 12, extra_edges=4))
+    enumerator = store.probabilities.attack_paths()
+
+    first = enumerator.paths(3)
+    more = enumerator.paths(10)
+
+    assert more[:3] == first
+    assert store.probabilities.attack_paths() is enumerator
+    assert enumerator.paths(2) == first[:2]
+
+
+def test_and_groups_are_followed_together(make_store):
+    store = make_store([node('root'), node('a', group='g'), node('b', group='g'), node('c'), node('d')],
+                       [edge('root', 'a', '0.5'), edge('root', 'b', '0.5'), edge('root', 'c', '0.2'),
+                        edge('a', 'd', '0.5')])
+
+    paths = store.probabilities.attack_paths().paths(5)
+
+    assert [round(probability, 12) for probability, _ in paths] == [0.2, 0.125]
+    assert sorted(paths[1][1]) == [('a', 'd'), ('root', 'a'), ('root', 'b')]
+
+
+def test_paths_follow_changes_of_the_tree(make_store):
+    store = make_store([node('root'), node('a'), node('b')], [edge('root', 'a', '0.5'), edge('root', 'b', '0.25')])
+    assert store.probabilities.attack_paths().paths(1)[0][1] == [('root', 'a')]
+
+    store.update_edge('root', 'b', {'probability': '0.75'})
+
+    assert store.probabilities.attack_paths().paths(1) == [(pytest.approx(0.75), [('root', 'b')])]
+
+
+def test_node_without_possible_attack_has_no_path(make_store):
+    # 'a' hat Kindknoten, aber keine Kante mit positiver Wahrscheinlichkeit; 'a' ist daher kein Blatt
+    store = make_store([node('root'), node('a'), node('b'), node('c')],
+                       [edge('root', 'a'), edge('root', 'b', '0.5'), edge('a', 'c', '0')])
+
+    assert store.probabilities.attack_paths().paths(5) == [(pytest.approx(0.5), [('root', 'b')])]
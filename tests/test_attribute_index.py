@@ -0,0 +1,79 @@
+import operator
+import random
+import re
+from collections import Counter
+
+import pytest
+
+from attribute_index import AttributeQueryError, attribute_number
+from conftest import edge, node, random_edit
+
+FILTERS = ['os=windows', 'OS = Linux', 'os!=linux', 'cost<5', 'cost>=3', 'Zeit<=2', 'skill>7', 'cost=4']
+TEXTS = ['', 'windows', 'mac', '4', 'linux 3']
+COMPARISONS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def attributes(current):
+    return {name.casefold(): attribute['value'].strip().casefold()
+            for name, attribute in current.get('attributes', {}).items()}
+
+
+def matches_filter(values, expression):
+    key, comparison, value = re.match(r'\s*(.+?)\s*(<=|>=|!=|=|<|>)\s*(.*?)\s*$', expression).groups()
+    key, value = key.casefold(), value.casefold()
+    if comparison == '=':
+        return values.get(key) == value
+    if comparison == '!=':
+        return values.get(key) != value
+    number = attribute_number(values.get(key, ''))
+    return number is not None and COMPARISONS[comparison](number, float(value))
+
+
+def expected_matches(store, filters, text):
+    """
+    Prüft jeden Knoten einzeln gegen Filter und Suchwörter (Referenz für den Attributindex).
+    """
+    words = re.findall(r'\w+', text.casefold())
+    result = []
+    for node_id, current in store.nodes_by_id.items():
+        values = attributes(current)
+        tokens = {token for value in values.values() for token in re.findall(r'\w+', value)}
+        if all(matches_filter(values, expression) for expression in filters) and all(word in tokens for word in words):
+            result.append(node_id)
+    return result
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_queries_match_a_scan_of_all_nodes(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0', os='Windows', cost=4), node('n1', os='linux')], [edge('n0', 'n1')])
+    index = store.attribute_index
+    for _ in range(120):
+        random_edit(store, rng)
+        filters, text = rng.sample(FILTERS, rng.randint(0, 2)), rng.choice(TEXTS)
+        expected = expected_matches(store, filters, text)
+        assert index.matching_ids(filters, text) == set(expected)
+
+        result = index.query(filters, text, facets=['OS', 'cost'], offset=1, limit=5)
+        assert result['total'] == len(expected)
+        ordered = expected if not filters and not text else sorted(expected)
+        assert [item['id'] for item in result['items']] == ordered[1:6]
+        for name, facet in result['facets'].items():
+            counts = Counter(attributes(store.node(node_id)).get(name.casefold()) for node_id in expected)
+            counts.pop(None, None)
+            assert {entry['value'].casefold(): entry['count'] for entry in facet} == dict(counts)
+
+
+def test_filtered_tree_contains_matches_and_their_ancestors(make_store):
+    store = make_store([node('root'), node('a'), node('b', os='Windows'), node('c', os='Linux')],
+                       [edge('root', 'a'), edge('a', 'b'), edge('root', 'c')])
+
+    nodes, edges, highlighted = store.attribute_index.filtered_tree(['os=windows'])
+
+    assert [current['id'] for current in nodes] == ['root', 'a', 'b']
+    assert {(current['parent'], current['child']) for current in edges} == {('root', 'a'), ('a', 'b')}
+    assert highlighted == {('a', 'b')}
+    with pytest.raises(AttributeQueryError):
+        store.attribute_index.filtered_tree(['os=windows'], max_nodes=2)
+    with pytest.raises(AttributeQueryError):
+        store.attribute_index.matching_ids(['cost<viel'])
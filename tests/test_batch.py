@@ -0,0 +1,46 @@
+from conftest import flashes
+
+
+def test_failed_batch_rolls_back_all_operations(client):
+    store = client.store
+    version, nodes, edges = store.version, store.nodes, store.edges
+
+    response = client.post('/api/batch', json={'operations': [
+        {'op': 'add_node', 'name': 'c', 'parent': 'a', 'probability': '0.2'},
+        {'op': 'edit_edge', 'parent': 'root', 'child': 'a', 'probability': '0.1'},
+        {'op': 'add_edge', 'parent': 'c', 'child': 'ghost', 'probability': '0.5'},
+        {'op': 'delete_node', 'node': 'b'},
+    ]})
+
+    assert response.status_code == 422
+    assert [result['status'] for result in response.json['results']] == ['ok', 'ok', 'error', 'skipped']
+    assert (store.version, store.nodes, store.edges) == (version, nodes, edges)
+    assert store.node_id_by_name('c') is None
+    assert store.validation.probability_sum('root') == 1.0
+
+
+def test_applied_batch_refers_to_nodes_created_earlier(client):
+    response = client.post('/api/batch', json={'operations': [
+        {'op': 'add_node', 'name': 'c', 'parent': 'a', 'probability': '0.4'},
+        {'op': 'add_node', 'name': 'd', 'parent': 'c', 'probability': '0.5'},
+        {'op': 'delete_node', 'node': 'c'},
+    ]})
+
+    assert response.status_code == 200
+    store = client.store
+    assert response.json['version'] == store.version
+    d = store.node_id_by_name('d')
+    assert [edge['parent'] for edge in store.edges_to(d)] == ['a']
+
+
+def test_batch_keeps_messages_flashed_before(client):
+    with client.session_transaction() as session:
+        session['_flashes'] = [('success', 'Der Knoten wurde erfolgreich hinzugefügt.')]
+
+    response = client.post('/api/batch', json={'operations': [
+        {'op': 'add_edge', 'parent': 'a', 'child': 'b', 'probability': '0.5'},
+    ]})
+
+    assert response.status_code == 422
+    assert response.json['results'][0]['errors']
+    assert flashes(client) == [('success', 'Der Knoten wurde erfolgreich hinzugefügt.')]
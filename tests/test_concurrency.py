@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import edge, flashes, node
+from graph_store import GraphStore, VersionConflict
+from storage import JsonStorage
+
+
+def test_form_based_on_an_old_version_is_rejected(client):
+    version = client.store.version
+    assert client.get('/').headers['ETag'] == f'"{version}"'
+    client.post('/edit_edge', data={'parent': 'root', 'child': 'a', 'probability': '0.4', 'version': version})
+    flashes(client)
+
+    response = client.post('/edit_edge', data={'parent': 'root', 'child': 'b', 'probability': '0.6',
+                                               'version': version})
+
+    assert response.status_code == 409
+    assert client.store.edge('root', 'b')['probability'] == '0.5'
+    # Die Hauptseite wird direkt mit der Fehlermeldung ausgeliefert
+    assert 'Der Angriffsbaum wurde bereits geändert' in response.get_data(as_text=True)
+    assert response.headers['ETag'] == f'"{client.store.version}"'
+
+
+def test_requests_without_version_are_not_checked(client):
+    response = client.post('/edit_edge', data={'parent': 'root', 'child': 'a', 'probability': '0.4'})
+
+    assert response.status_code == 302
+    assert client.store.edge('root', 'a')['probability'] == '0.4'
+
+
+def test_json_requests_use_if_match(client):
+    operations = {'operations': [{'op': 'edit_edge', 'parent': 'root', 'child': 'a', 'probability': '0.4'}]}
+    version = client.store.version
+
+    stale = client.post('/api/batch', json=operations, headers={'If-Match': f'"{version - 1}"'})
+    assert stale.status_code == 409
+    assert stale.get_json()['version'] == version
+
+    current = client.post('/api/batch', json=operations, headers={'If-Match': f'"{version}"'})
+    assert current.status_code == 200
+    assert client.post('/api/batch', json=dict(operations, version=version)).status_code == 409
+    assert client.post('/api/batch', json=operations, headers={'If-Match': '*'}).status_code == 200
+
+
+def test_transaction_sees_changes_of_another_process(make_store, tmp_path):
+    first = make_store([node('root'), node('a')], [edge('root', 'a', '0.5')])
+    second = GraphStore(JsonStorage(str(tmp_path / 'attack_tree_data.json')))
+    second.load()
+    version = first.version
+
+    with second.transaction({version}):
+        second.add_node(node('b'))
+        second.add_edge(edge('root', 'b', '0.5'))
+
+    with pytest.raises(VersionConflict):
+        with first.transaction({version}):
+            first.add_node(node('c'))
+    assert first.node('c') is None
+    assert first.node('b') is not None
+
+    with first.transaction({second.version}):
+        first.update_edge('root', 'a', {'probability': '0.25'})
+    second.refresh(blocking=True)
+    assert second.edge('root', 'a')['probability'] == '0.25'
+    assert second.version == first.version
@@ -0,0 +1,107 @@
+import math
+import random
+
+import pytest
+
+from conftest import edge, node, random_graph
+from cut_sets import CutSetAnalysis, DiagramLimitError
+from probability import parse_probability
+
+
+def reachable_edges(store, root_id):
+    """
+    Gibt die vom Wurzelknoten aus erreichbaren Kanten als (Eltern-ID, Kind-ID) zurück.
+    """
+    edges, pending, visited = [], [root_id], {root_id}
+    while pending:
+        parent_id = pending.pop()
+        for child_id in store.child_edges.get(parent_id, {}):
+            edges.append((parent_id, child_id))
+            if child_id not in visited:
+                visited.add(child_id)
+                pending.append(child_id)
+    return edges
+
+
+def reached(store, node_id, chosen, cache):
+    """
+    Prüft, ob ein Knoten erreicht ist, wenn genau die gewählten Kanten gelingen (Referenz für das Diagramm).
+    """
+    if node_id not in cache:
+        terms = {}
+        for child_id in store.child_edges.get(node_id, {}):
+            key = store.node(child_id).get('group') or ('', child_id)
+            terms.setdefault(key, []).append(child_id)
+        cache[node_id] = not terms or any(
+            all((node_id, child_id) in chosen and reached(store, child_id, chosen, cache) for child_id in term)
+            for term in terms.values())
+    return cache[node_id]
+
+
+def brute_force(store, root_id):
+    """
+    Bestimmt die exakte Wahrscheinlichkeit und die minimalen Angriffsszenarien durch Aufzählen aller Teilmengen.
+    """
+    edges = reachable_edges(store, root_id)
+    probabilities = [parse_probability(store.edge(*edge_ids)['probability']) for edge_ids in edges]
+
+    def succeeds(mask):
+        return reached(store, root_id, {edges[bit] for bit in range(len(edges)) if mask >> bit & 1}, {})
+
+    total, minimal = 0.0, []
+    for mask in range(1 << len(edges)):
+        if not succeeds(mask):
+            continue
+        total += math.prod(p if mask >> bit & 1 else 1 - p for bit, p in enumerate(probabilities))
+        # Die Funktion ist monoton: minimal, wenn das Entfernen jeder einzelnen Kante scheitert
+        if not any(mask >> bit & 1 and succeeds(mask & ~(1 << bit)) for bit in range(len(edges))):
+            minimal.append((math.prod(p for bit, p in enumerate(probabilities) if mask >> bit & 1),
+                            frozenset(edges[bit] for bit in range(len(edges)) if mask >> bit & 1)))
+    return total, minimal
+
+
+@pytest.mark.parametrize('ordering', ['dfs', 'weighted'])
+@pytest.mark.parametrize('seed', range(15))
+def test_cut_sets_match_brute_force(make_store, seed, ordering):
+    rng = random.Random(seed)
+    store = make_store(*random_graph(rng, rng.randint(2, 10), extra_edges=rng.randint(1, 4)))
+    probability, minimal = brute_force(store, 'n0')
+
+    analysis = store.probabilities.cut_set_analysis('n0', ordering)
+    cut_sets = analysis.cut_sets(len(minimal) + 5)
+
+    assert analysis.probability() == pytest.approx(probability)
+    assert len(cut_sets) == len(minimal)
+    assert {frozenset(edges) for _, edges in cut_sets} == {edges for _, edges in minimal}
+    expected = dict((edges, value) for value, edges in minimal)
+    for value, edges in cut_sets:
+        assert value == pytest.approx(expected[frozenset(edges)])
+    values = [value for value, _ in cut_sets]
+    assert values == sorted(values, reverse=True)
+
+
+def test_shared_sub_goal_is_counted_once(make_store):
+    store = make_store([node('root'), node('a', group='g'), node('b', group='g'), node('s'), node('leaf')],
+                       [edge('root', 'a'), edge('root', 'b'), edge('a', 's'), edge('b', 's'),
+                        edge('s', 'leaf', '0.5')])
+
+    analysis = store.probabilities.cut_set_analysis('root')
+
+    assert store.probabilities.probability('root') == pytest.approx(0.25)
+    assert analysis.probability() == pytest.approx(0.5)
+    assert [(value, sorted(edges)) for value, edges in analysis.cut_sets(5)] == \
+        [(pytest.approx(0.5), [('a', 's'), ('b', 's'), ('root', 'a'), ('root', 'b'), ('s', 'leaf')])]
+    assert store.probabilities.cut_set_analysis('root') is analysis
+
+
+def test_diagram_limit_and_route(make_store, client):
+    store = make_store(*random_graph(random.Random(5), 12, extra_edges=6))
+
+    with pytest.raises(DiagramLimitError):
+        CutSetAnalysis(store.probabilities.model(), store.probabilities.model().index['n0'], max_nodes=4)
+
+    response = client.get('/api/cut_sets?k=2')
+    assert response.status_code == 200
+    assert [cut_set['leaves'] for cut_set in response.get_json()['cut_sets']] == [['a'], ['b']]
+    assert client.get('/api/cut_sets?ordering=zufall').status_code == 400
+    assert client.get('/api/cut_sets?root=a').status_code == 404
@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import edge, flashes, node
+
+
+@pytest.fixture
+def diagnostics_client(client):
+    """
+    Liefert den Test-Client mit 25 unausgeglichenen Elternknoten und drei AND-Gruppen mit nur einem Knoten.
+    """
+    with client.store.transaction():
+        for index in range(25):
+            client.store.add_node(node(f'p{index}', group=f'g{index}' if index < 3 else None))
+            client.store.add_node(node(f'c{index}'))
+            client.store.add_edge(edge('a', f'p{index}', '0.04'))
+            client.store.add_edge(edge(f'p{index}', f'c{index}', '0.5'))
+    return client
+
+
+def test_diagnostics_are_paged_per_category(diagnostics_client):
+    full = diagnostics_client.get('/api/diagnostics?limit=1000').get_json()
+    assert full['counts'] == {'probability_sum': 25, 'single_node_group': 3, 'cycle': 0}
+    assert full['total'] == len(full['items']) == 28
+
+    pages, offset = [], 0
+    while True:
+        page = diagnostics_client.get(f'/api/diagnostics?category=probability_sum&offset={offset}&limit=7').get_json()
+        assert page['total'] == 25
+        if not page['items']:
+            break
+        pages.extend(page['items'])
+        offset += 7
+    assert pages == [item for item in full['items'] if item['category'] == 'probability_sum']
+    assert {item['node'] for item in pages} == {diagnostics_client.store.node_id_by_name(f'p{index}')
+                                                for index in range(25)}
+
+    groups = diagnostics_client.get('/api/diagnostics?category=single_node_group').get_json()
+    assert sorted(item['group'] for item in groups['items']) == ['g0', 'g1', 'g2']
+
+
+@pytest.mark.parametrize('query', ['category=unbekannt', 'offset=x', 'limit=viele'])
+def test_invalid_diagnostics_parameters_are_rejected(client, query):
+    assert client.get(f'/api/diagnostics?{query}').status_code == 400
+
+
+def test_main_page_shows_counts_instead_of_one_message_per_issue(diagnostics_client):
+    response = diagnostics_client.get('/')
+
+    page = response.get_data(as_text=True)
+    assert 'Prüfung: 28 Hinweise' in page
+    assert 'Gesamtwahrscheinlichkeit ungleich 1: 25' in page
+    assert flashes(diagnostics_client) == []
+    assert diagnostics_client.get('/api/diagnostics?limit=5000').get_json()['limit'] == 1000
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+from graphviz import Digraph
+
+from conftest import edge, node, random_graph
+from helper_functions import build_attack_tree_source, create_and_groups
+
+
+def digraph_source(nodes, edges):
+    """
+    Erstellt die DOT-Quelle wie früher über graphviz.Digraph, mit Suche der Gruppen je Kante
+    (Referenz für den linearen DOT-Aufbau).
+    """
+    dot = Digraph()
+    group_to_nodes = create_and_groups(nodes)
+    for current in nodes:
+        label = f"<b>{current['name']}</b>"
+        for key, value in current.get('attributes', {}).items():
+            if value.get('display_in_tree', 'false').lower() == 'true':
+                label += f"<br/>{key}: {value['value']}"
+        dot.node(current['id'], f"<{label}>", shape='box')
+
+    cluster_index = 0
+    group_to_cluster = {}
+    for group, children in group_to_nodes.items():
+        if group:
+            total_probability = sum(float(current['probability'].replace(',', '.')) for current in edges
+                                    if current['child'] in children)
+            with dot.subgraph(name=f'cluster_{cluster_index}') as cluster:
+                cluster.attr(style='dashed', label=f"AND Group: {group} (Total Prob.: {total_probability:.2f})",
+                             labelloc="t", labeljust="l", fontsize="12")
+                if any(current['parent'] in children for current in edges):
+                    dummy_node_id = f"dummy_{cluster_index}"
+                    cluster.node(dummy_node_id, shape='point', width='0.01', height='0.01')
+                    for child in children:
+                        cluster.edge(child, dummy_node_id, minlen='1')
+                    group_to_cluster[group] = dummy_node_id
+                for child in children:
+                    cluster.node(child)
+            cluster_index += 1
+
+    for current in edges:
+        parent = current['parent']
+        parent_group = next((group for group, children in group_to_nodes.items() if parent in children), None)
+        if parent_group:
+            parent = group_to_cluster[parent_group]
+        dot.edge(parent, current['child'], label=current['probability'] or 'N/A',
+                 color=current.get('color', 'black'))
+    return dot.source
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_dot_source_matches_digraph(seed):
+    rng = random.Random(seed)
+    nodes, edges = random_graph(rng, rng.randint(1, 30), extra_edges=rng.randint(0, 10))
+    names = ['Phishing', 'Login "Admin"', 'a:b', 'Umlaut ä & <b>', 'node', 'graph', '1.5', 'Zeile\\nUmbruch']
+    for current in nodes:
+        current['name'] = f"{rng.choice(names)} {current['id']}"
+        current['attributes'] = {'cost': {'value': str(rng.randint(0, 9)),
+                                          'display_in_tree': rng.choice(['true', 'false', 'True'])}}
+    for current in rng.sample(edges, len(edges) // 3):
+        current['color'] = rng.choice(['red', 'blue'])
+
+    assert build_attack_tree_source(nodes, edges) == digraph_source(nodes, edges)
+
+
+def test_dot_source_quotes_ids_like_digraph():
+    nodes = [node('root'), node('a:b', group='g'), node('strict'), node('x y', group='g'), node('é')]
+    edges = [edge('root', 'a:b', '0,5'), edge('root', 'x y', '0.5'), edge('a:b', 'strict', ''),
+             edge('x y', 'é')]
+
+    assert build_attack_tree_source(nodes, edges) == digraph_source(nodes, edges)
+
+
+def test_dot_source_overlays():
+    nodes = [node('root'), node('a'), node('b')]
+    edges = [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')]
+
+    source = build_attack_tree_source(nodes, edges, node_probabilities={'root': 0.75, 'a': None},
+                                      highlighted_edges={('root', 'a')}, edge_colors={('root', 'b'): '#00ff00'})
+
+    assert 'root [label=<<b>root</b><br/><i>P(Erfolg): 0.7500</i>> shape=box]' in source
+    assert 'a [label=<<b>a</b>> shape=box]' in source
+    assert 'root -> a [label=0.5 color=red penwidth=2.5]' in source
+    assert 'root -> b [label=0.5 color="#00ff00"]' in source
@@ -0,0 +1,130 @@
+import csv
+import gzip
+import hashlib
+import io
+
+import pytest
+
+from conftest import edge, node
+from exports import ExportCache, build_nodes_pdf, iter_gzip, iter_nodes_csv
+from metrics import METRICS, METRIC_NAMES, format_metric
+
+
+@pytest.fixture
+def export_store(make_store):
+    """
+    Liefert einen Graphspeicher, dessen Namen und Attributwerte Kommas, Anführungszeichen und Zeilenumbrüche
+    enthalten.
+    """
+    root = node('root')
+    tricky = node('a', cost=3, note='Komma, "Zitat"\nzweite Zeile')
+    tricky['name'] = 'Name, mit "Zeichen"\nund Umbruch'
+    return make_store([root, tricky, node('b', Zeit='1,5', os='linux'), node('c')],
+                      [edge('root', 'a', '0.5'), edge('root', 'b', '0.5'), edge('b', 'c')])
+
+
+def read_csv(content):
+    return list(csv.reader(io.StringIO(content.decode('utf-8'), newline='')))
+
+
+def test_export_cache_creates_each_export_once():
+    cache = ExportCache()
+    calls = []
+
+    def create():
+        calls.append(1)
+        return b'content'
+
+    first = cache.get(('csv', 1), create)
+    second = cache.get(('csv', 1), create)
+
+    assert first == second
+    assert first == (b'content', hashlib.sha256(b'content').hexdigest()[:32])
+    assert len(calls) == 1
+
+
+def test_export_cache_evicts_least_recently_used_entries():
+    cache = ExportCache(max_entries=2, max_bytes=10)
+    cache.get('a', lambda: b'aaaa')
+    cache.get('b', lambda: b'bbbb')
+    cache.get('a', lambda: b'new')
+    cache.get('c', lambda: b'cccc')
+
+    assert list(cache._entries) == ['a', 'c']
+    cache.get('d', lambda: b'dddddddd')
+    assert list(cache._entries) == ['d']
+    assert cache._size == 8
+    # Ein einzelner Export wird auch dann behalten, wenn er größer als der Cache ist
+    cache.get('e', lambda: b'e' * 20)
+    assert list(cache._entries) == ['e']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64, 64 * 1024])
+def test_nodes_csv_round_trips_names_attributes_and_metrics(export_store, chunk_size):
+    metric_index, metric_values = export_store.metrics.metric_table()
+    chunks = list(iter_nodes_csv(export_store.nodes, metric_index, metric_values, chunk_size=chunk_size))
+    rows = read_csv(b''.join(chunks))
+
+    attribute_keys = ['cost', 'note', 'Zeit', 'os']
+    assert rows[0] == ['Name', *attribute_keys, *(label for label, _, _, _ in METRICS.values())]
+    assert len(rows) == len(export_store.nodes) + 1
+    for row, stored in zip(rows[1:], export_store.nodes):
+        attributes = stored['attributes']
+        metrics = export_store.metrics.node_metrics(stored['id'])
+        assert row == [stored['name'],
+                       *(attributes[key]['value'] if key in attributes else '' for key in attribute_keys),
+                       *(format_metric(metrics[name]) for name in METRIC_NAMES)]
+    if chunk_size == 1:
+        assert len(chunks) > len(export_store.nodes)
+
+
+def test_gzip_stream_decompresses_to_the_csv(export_store):
+    metric_index, metric_values = export_store.metrics.metric_table()
+    plain = b''.join(iter_nodes_csv(export_store.nodes, metric_index, metric_values))
+    compressed = b''.join(iter_gzip(iter_nodes_csv(export_store.nodes, metric_index, metric_values, chunk_size=16)))
+    assert gzip.decompress(compressed) == plain
+
+
+def test_export_nodes_route_streams_csv_and_honours_etag(client):
+    response = client.get('/export_nodes')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert [row[0] for row in read_csv(response.data)] == ['Name', 'root', 'a', 'b']
+    etag = response.headers['ETag']
+
+    compressed = client.get('/export_nodes?gzip=1')
+    assert compressed.mimetype == 'application/gzip'
+    assert gzip.decompress(compressed.data) == response.data
+    assert compressed.headers['ETag'] != etag
+
+    assert client.get('/export_nodes', headers={'If-None-Match': etag}).status_code == 304
+    client.store.rename_node('a', 'a2')
+    changed = client.get('/export_nodes', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert [row[0] for row in read_csv(changed.data)] == ['Name', 'root', 'a2', 'b']
+
+
+def test_nodes_pdf_is_reproducible_and_split_into_sections(export_store):
+    export_store.add_node(node('lang', note='x' * 2000))
+    metric_index, metric_values = export_store.metrics.metric_table()
+    nodes = export_store.nodes
+
+    single = build_nodes_pdf(nodes, metric_index, metric_values)
+    assert single.startswith(b'%PDF-')
+    # Ohne Zeitstempel ergibt derselbe Stand dieselben Bytes und damit denselben ETag
+    assert build_nodes_pdf(nodes, metric_index, metric_values) == single
+    sections = build_nodes_pdf(nodes, metric_index, metric_values, section_size=2)
+    assert sections.startswith(b'%PDF-') and sections != single
+
+
+def test_export_nodes_pdf_route_caches_per_version(client):
+    first = client.get('/export_nodes_pdf')
+    assert first.status_code == 200
+    assert first.mimetype == 'application/pdf'
+    assert first.data.startswith(b'%PDF-')
+    etag = first.headers['ETag']
+
+    assert client.get('/export_nodes_pdf').headers['ETag'] == etag
+    assert client.get('/export_nodes_pdf', headers={'If-None-Match': etag}).status_code == 304
+    client.store.rename_node('a', 'a2')
+    assert client.get('/export_nodes_pdf').headers['ETag'] != etag
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from conftest import edge, node, random_edit
+
+
+def indexes(store):
+    return (store.nodes_by_id, store.name_to_id, store.edge_index, store.parent_edges, store.child_edges)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_indexes_match_a_fresh_load_after_random_edits(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0')])
+    for step in range(150):
+        random_edit(store, rng)
+        if step % 50 == 49:
+            fresh = make_store(store.nodes, store.edges, name=f'fresh{step}.json')
+            assert indexes(store) == indexes(fresh)
+            # Leere Einträge der Nachbarschaftslisten werden entfernt
+            assert all(store.parent_edges.values()) and all(store.child_edges.values())
+
+
+def test_name_index_follows_renames_and_removals(make_store):
+    store = make_store([node('root'), node('a'), node('b')], [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')])
+
+    store.rename_node('a', 'neu')
+    store.remove_node('b')
+
+    assert store.name_to_id == {'root': 'root', 'neu': 'a'}
+    assert store.edges_from('root') == [edge('root', 'a', '0.5')]
+    assert store.edges_to('b') == [] and store.first_parent_edge('a')['parent'] == 'root'
+
+
+def test_repeated_strings_are_shared(make_store):
+    store = make_store([node('root'), node('a', os='Linux'), node('b', os='Linux')],
+                       [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')])
+    # Zur Laufzeit erzeugte Strings sind eigene Objekte, wie die Werte aus dem JSON-Parser
+    store.add_node(node('c', os=''.join(['Li', 'nux'])))
+    store.add_edge(edge('a', 'c', ''.join(['0.', '5'])))
+
+    first, *others = store.edges
+    assert all(other['probability'] is first['probability'] for other in others)
+    assert all(current['parent'] is store.node(current['parent'])['id'] for current in store.edges)
+    values = [store.node(node_id)['attributes']['os']['value'] for node_id in ('a', 'b', 'c')]
+    assert values[0] is values[1] is values[2]
@@ -0,0 +1,94 @@
+import json
+import random
+
+from conftest import edge, node, random_edit
+from graph_store import GraphStore
+from journal import MutationJournal
+from storage import JsonStorage
+
+
+def state(store):
+    return store.version, store.nodes, sorted(map(json.dumps, store.edges))
+
+
+def reopen(path):
+    store = GraphStore(JsonStorage(str(path)))
+    store.load()
+    return store
+
+
+def test_torn_tail_is_ignored_and_cut_before_the_next_append(tmp_path):
+    journal = MutationJournal(str(tmp_path / 'tree.journal'))
+    journal.append([json.dumps({'v': 1})])
+    with open(journal.file_path, 'ab') as file:
+        file.write(b'{"v":2,"op":"add')
+
+    assert [record['v'] for record in journal.read()] == [1]
+    journal.append([json.dumps({'v': 2}), json.dumps({'v': 3})])
+    assert [record['v'] for record in journal.read()] == [1, 2, 3]
+    assert journal.size == (tmp_path / 'tree.journal').stat().st_size
+
+
+def test_torn_tail_longer_than_a_block_is_cut(tmp_path):
+    journal = MutationJournal(str(tmp_path / 'tree.journal'))
+    (tmp_path / 'tree.journal').write_bytes(b'x' * 10000)
+
+    journal.append([json.dumps({'v': 1})])
+
+    assert (tmp_path / 'tree.journal').read_bytes() == b'{"v": 1}\n'
+
+
+def test_corrupt_complete_line_is_skipped(tmp_path):
+    journal = MutationJournal(str(tmp_path / 'tree.journal'))
+    journal.append([json.dumps({'v': 1})])
+    with open(journal.file_path, 'ab') as file:
+        file.write(b'garbage\n')
+    journal.append([json.dumps({'v': 2})])
+
+    assert [record['v'] for record in journal.read()] == [1, 2]
+    assert [record['v'] for record in journal.read(after_version=1)] == [2]
+
+
+def test_store_recovers_after_a_crash_during_append(make_store, tmp_path):
+    rng = random.Random(3)
+    store = make_store([node('n0'), node('n1')], [edge('n0', 'n1')])
+    for _ in range(30):
+        random_edit(store, rng)
+        store.save()
+    saved = state(store)
+    # Absturz mitten im Schreiben des nächsten Eintrags
+    with open(store.storage.journal.file_path, 'ab') as file:
+        file.write(b'{"v":999,"op":"remove_node","id":"n')
+
+    recovered = reopen(tmp_path / 'attack_tree_data.json')
+    assert state(recovered) == saved
+    for _ in range(30):
+        random_edit(recovered, rng)
+        recovered.save()
+    assert state(reopen(tmp_path / 'attack_tree_data.json')) == state(recovered)
+
+
+def test_compaction_keeps_every_change(make_store, tmp_path):
+    rng = random.Random(5)
+    store = make_store([node('n0'), node('n1')], [edge('n0', 'n1')])
+    store.storage.journal.compact_threshold = 2000
+    for _ in range(200):
+        random_edit(store, rng)
+        store.save()
+        compaction = store.storage._compaction
+        if compaction is not None:
+            compaction.join()
+
+    assert store.storage.snapshot_version() > 0
+    assert state(reopen(tmp_path / 'attack_tree_data.json')) == state(store)
+
+
+def test_other_stores_catch_up_through_the_journal(make_store, tmp_path):
+    rng = random.Random(11)
+    writer = make_store([node('n0'), node('n1')], [edge('n0', 'n1')])
+    reader = reopen(tmp_path / 'attack_tree_data.json')
+    for _ in range(40):
+        random_edit(writer, rng)
+        writer.save()
+        reader.refresh(blocking=True)
+        assert state(reader) == state(writer)
@@ -0,0 +1,128 @@
+import math
+import random
+from itertools import product
+
+import pytest
+
+from conftest import edge, node, random_edit
+from metrics import METRICS, METRIC_NAMES, parse_metric_values
+from probability import parse_probability
+
+
+def terms(store, node_id):
+    """
+    Gruppiert die Kindknoten eines Knotens nach AND-Gruppe; Kindknoten ohne Gruppe bilden einen eigenen Term.
+    """
+    grouped = {}
+    for child_id, child_edge in store.child_edges.get(node_id, {}).items():
+        child = store.node(child_id)
+        key = child.get('group') or ('', child_id)
+        grouped.setdefault(key, []).append((child_id, parse_probability(child_edge['probability'])))
+    return list(grouped.values())
+
+
+def combine(first, second, rule):
+    if math.isnan(first) or math.isnan(second):
+        return math.nan
+    return first + second if rule == 'sum' else max(first, second)
+
+
+def expected_metrics(store, node_id, cache):
+    """
+    Berechnet die Kennzahlen eines Knotens rekursiv (Referenz für die Matrix der MetricEngine).
+    """
+    if node_id in cache:
+        return cache[node_id]
+    own = parse_metric_values(store.node(node_id).get('attributes'))
+    node_terms = terms(store, node_id)
+    if not node_terms:
+        cache[node_id] = own
+        return own
+    result = []
+    for position, (_, _, and_rule, own_rule) in enumerate(METRICS.values()):
+        alternatives = []
+        for term in node_terms:
+            value = None
+            for child_id, probability in term:
+                child_value = math.inf if probability == 0 else expected_metrics(store, child_id, cache)[position]
+                if value is None:
+                    value = child_value
+                elif math.isinf(value) or math.isinf(child_value):
+                    value = math.inf
+                else:
+                    value = combine(value, child_value, and_rule)
+            alternatives.append(value)
+        best = math.nan if any(math.isnan(value) for value in alternatives) else min(alternatives)
+        result.append(best if math.isnan(own[position]) else combine(own[position], best, own_rule))
+    cache[node_id] = result
+    return result
+
+
+def attacks(store, node_id):
+    """
+    Zählt alle Angriffe eines Knotens als Tupel aus Kosten und Erfolgswahrscheinlichkeit auf.
+    """
+    own_cost = parse_metric_values(store.node(node_id).get('attributes'))[METRIC_NAMES.index('cost')]
+    node_terms = terms(store, node_id)
+    if not node_terms:
+        return [] if math.isnan(own_cost) else [(own_cost, 1.0)]
+    own_cost = 0.0 if math.isnan(own_cost) else own_cost
+    result = []
+    for term in node_terms:
+        for combination in product(*[attacks(store, child_id) for child_id, _ in term]):
+            cost = own_cost + sum(child_cost for child_cost, _ in combination)
+            probability = math.prod(edge_probability * child_probability
+                                    for (_, edge_probability), (_, child_probability) in zip(term, combination))
+            result.append((cost, probability))
+    return result
+
+
+def expected_front(store, node_id):
+    """
+    Bestimmt die Pareto-Front aus allen aufgezählten Angriffen (Referenz für pareto_front).
+    """
+    points = {point for point in attacks(store, node_id) if point[1] > 0}
+    return sorted(point for point in points
+                  if not any(other != point and other[0] <= point[0] and other[1] >= point[1] for other in points))
+
+
+def assert_same_values(actual, expected):
+    for name, value in zip(METRIC_NAMES, expected):
+        if math.isnan(value):
+            assert math.isnan(actual[name]), name
+        else:
+            assert actual[name] == value, name
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_incremental_metrics_match_recursive_evaluation(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0'), node('n1', cost=3), node('n2', cost=5, Zeit=2)],
+                       [edge('n0', 'n1', '0.5'), edge('n0', 'n2', '0.5')])
+    for _ in range(100):
+        random_edit(store, rng)
+        # Nicht jede Änderung sofort abfragen, damit sich vorgemerkte Knoten ansammeln
+        if rng.random() < 0.5:
+            continue
+        cache = {}
+        for node_id in store.nodes_by_id:
+            assert_same_values(store.metrics.node_metrics(node_id), expected_metrics(store, node_id, cache))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_pareto_front_matches_enumeration(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0'), node('n1', cost=3), node('n2', cost=5)],
+                       [edge('n0', 'n1', '0.5'), edge('n0', 'n2', '0.5')])
+    for _ in range(25):
+        random_edit(store, rng)
+        for node_id in store.topology.roots():
+            assert store.metrics.pareto_front(node_id) == expected_front(store, node_id)
+
+
+def test_missing_leaf_values_are_unknown(make_store):
+    store = make_store([node('root'), node('a', cost=4), node('b')], [edge('root', 'a'), edge('root', 'b')])
+
+    assert math.isnan(store.metrics.node_metrics('root')['cost'])
+    store.update_edge('root', 'b', {'probability': '0'})
+    assert store.metrics.node_metrics('root')['cost'] == 4
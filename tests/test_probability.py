@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import edge, node, random_graph
+from probability import ProbabilityModel
+
+
+def expected_probability(store, node_id):
+    """
+    Berechnet die Erfolgswahrscheinlichkeit eines Knotens rekursiv aus den Kindknoten (Referenz für das Modell).
+    """
+    terms = {}
+    for child_id, child_edge in store.child_edges.get(node_id, {}).items():
+        if store.node(child_id) is None:
+            continue
+        key = store.node(child_id).get('group') or ('', child_id)
+        terms.setdefault(key, []).append(float(child_edge['probability'].replace(',', '.'))
+                                         * expected_probability(store, child_id))
+    if not terms:
+        return 1.0
+    return 1.0 - np.prod([1.0 - np.prod(term) for term in terms.values()])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_model_matches_recursive_evaluation(make_store, seed):
+    rng = random.Random(seed)
+    count = rng.randint(2, 30)
+    nodes = [node(f'n{index}', group=rng.choice([None, 'g1', 'g2'])) for index in range(count)]
+    edges = [edge(f'n{rng.randrange(index)}', f'n{index}', rng.choice(['0', '0,5', '0.25', '1']))
+             for index in range(1, count)]
+    store = make_store(nodes, edges)
+
+    probabilities = store.probabilities.node_probabilities()
+
+    for node_id in store.nodes_by_id:
+        assert probabilities[node_id] == pytest.approx(expected_probability(store, node_id))
+
+
+def test_edges_to_unknown_nodes_are_ignored():
+    nodes = [node('root'), node('a'), node('b')]
+    edges = [edge('root', 'a', '0.5'), edge('root', 'b', '0.5'), edge('ghost', 'a', '0.5'), edge('root', 'ghost')]
+    levels = {'root': 0, 'a': 1, 'b': 1}
+
+    model = ProbabilityModel(nodes, edges, levels)
+
+    assert len(model.edge_parent) == 2
+    assert model.evaluate()[model.index['root']] == pytest.approx(0.75)
+
+
+def test_store_with_dangling_edge_still_evaluates(make_store):
+    store = make_store([node('root'), node('a')], [edge('root', 'a', '0.5')])
+    with store.transaction():
+        store.add_edge(edge('ghost', 'a', '0.5'))
+
+    assert store.probabilities.node_probabilities()['root'] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_gradient_matches_finite_differences(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store(*random_graph(rng, rng.randint(2, 25), extra_edges=rng.randint(0, 8),
+                                     probabilities=('0', '0.2', '0,5', '0.9', '1')))
+    model = store.probabilities.model()
+    root = model.index['n0']
+
+    probabilities, gradient = model.gradient(root)
+
+    step = 1e-6
+    shifted = model.edge_probability + step * np.eye(len(model.edge_probability))
+    lower = model.evaluate(model.edge_probability - step * np.eye(len(model.edge_probability)))
+    expected = (model.evaluate(shifted)[:, root] - lower[:, root]) / (2 * step)
+    assert np.allclose(probabilities, model.evaluate())
+    assert np.allclose(gradient, expected, atol=1e-6)
+
+
+def test_sensitivities_are_sorted_by_magnitude(make_store):
+    store = make_store([node('root'), node('a'), node('b'), node('c')],
+                       [edge('root', 'a', '0.5'), edge('root', 'b', '0.2'), edge('a', 'c', '0.5')])
+
+    sensitivities = store.probabilities.sensitivities('root')
+
+    # P(root) = 1 - (1 - 0,5 · 0,5) · (1 - 0,2)
+    assert sensitivities[0] == (('root', 'b'), pytest.approx(0.75))
+    assert dict(sensitivities[1:]) == {('root', 'a'): pytest.approx(0.4), ('a', 'c'): pytest.approx(0.4)}
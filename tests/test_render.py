@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import render_queue
+from render_cache import RenderCache
+from render_queue import RenderScheduler
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """
+    Ersetzt Graphviz durch eine Attrappe, die in Threads statt Worker-Prozessen läuft.
+    Aufträge mit 'fail' in der Quelle schlagen fehl, Aufträge mit 'wait' blockieren bis release gesetzt ist.
+    """
+    release = threading.Event()
+    started = []
+
+    def fake_render(source, format):
+        started.append(source)
+        if 'wait' in source:
+            release.wait(5)
+        if 'fail' in source:
+            raise RuntimeError(f'kaputt: {source}')
+        return source.encode('utf-8')
+
+    def executor(scheduler):
+        if scheduler._executor is None:
+            scheduler._executor = ThreadPoolExecutor(max_workers=scheduler.max_workers)
+        return scheduler._executor
+
+    monkeypatch.setattr(render_queue, 'render_source', fake_render)
+    monkeypatch.setattr(RenderScheduler, '_executor_instance', executor)
+    release.started = started
+    return release
+
+
+def make_scheduler(tmp_path, **kwargs):
+    return RenderScheduler(RenderCache(str(tmp_path / 'cache')), **kwargs)
+
+
+def wait_idle(scheduler):
+    deadline = time.monotonic() + 5
+    while True:
+        with scheduler._lock:
+            if not scheduler._running and scheduler._pending is None:
+                return
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_cache_evicts_least_recently_used_files(tmp_path):
+    cache = RenderCache(str(tmp_path / 'cache'), max_entries=3)
+    keys = [cache.key(f'digraph {{ n{index} }}') for index in range(4)]
+    for age, key in enumerate(keys[:3]):
+        path = cache.put(key, 'svg', key.encode('utf-8'))
+        os.utime(path, (age, age))
+
+    assert cache.get(keys[0], 'svg') is not None
+    cache.put(keys[3], 'svg', b'<svg/>')
+
+    assert cache.get(keys[1], 'svg') is None
+    assert all(cache.get(key, 'svg') is not None for key in (keys[0], keys[2], keys[3]))
+    assert cache.key('digraph { a }') == cache.key('digraph { a }') != cache.key('digraph { b }')
+
+
+def test_status_sees_images_rendered_by_another_process(tmp_path, renders):
+    first = make_scheduler(tmp_path)
+    second = make_scheduler(tmp_path)
+    version = first.request('digraph { a }')
+    wait_idle(first)
+    assert first.status(version)['ready']
+    status = second.status(version)
+    assert status['ready'] and status['failed'] is None
+    assert not second.status(RenderCache.key('digraph { b }'))['ready']
+
+
+def test_failures_are_bounded_and_cleared_on_success(tmp_path, renders):
+    scheduler = make_scheduler(tmp_path, max_workers=1, max_failures=3)
+    versions = []
+    for i in range(5):
+        versions.append(scheduler.request(f'fail {i}'))
+        wait_idle(scheduler)
+    assert list(scheduler._failed) == versions[-3:]
+    assert scheduler.status(versions[-1])['failed'] == 'kaputt: fail 4'
+    assert scheduler.status(versions[0])['failed'] is None
+
+
+def test_jobs_run_in_parallel_up_to_pool_size(tmp_path, renders):
+    scheduler = make_scheduler(tmp_path, max_workers=2)
+    scheduler.request('wait a')
+    scheduler.request('wait b')
+    scheduler.request('wait c')
+    newest = scheduler.request('wait d')
+    assert len(scheduler._running) == 2
+    assert scheduler._pending[0] == newest
+    renders.set()
+    wait_idle(scheduler)
+    assert 'wait c' not in renders.started
+    assert scheduler.status(newest)['ready']
+    assert scheduler.published_version == newest
+
+
+def test_render_route_serves_images_by_key(tmp_path, monkeypatch, client):
+    import app as app_module
+
+    cache = RenderCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(app_module, 'render_cache', cache)
+    key = cache.key('digraph { a }')
+    assert client.get(f'/render/{key}.svg').status_code == 404
+    cache.put(key, 'svg', b'<svg/>')
+    response = client.get(f'/render/{key}.svg')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/svg+xml'
+    assert response.data == b'<svg/>'
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import edge, flashes, node
+from graph_store import GraphStore
+
+
+def test_add_edge_rejects_unknown_parent(client):
+    version = client.store.version
+
+    response = client.post('/add_edge', data={'parent': 'ghost', 'child': 'a', 'probability': '0.5'})
+
+    assert response.status_code == 302
+    assert flashes(client) == [('error', "Der Knoten 'ghost' wurde nicht gefunden.")]
+    assert client.store.edge('ghost', 'a') is None
+    assert client.store.version == version
+
+
+def test_add_edge_reports_success_only_when_added(client):
+    client.post('/add_edge', data={'parent': 'a', 'child': 'b', 'probability': '0.5'})
+
+    assert [category for category, _ in flashes(client)] == ['error']
+    assert client.store.edge('a', 'b') is None
+
+
+def test_add_node_rejects_unknown_parent(client):
+    response = client.post('/add_node', data={'name': 'neu', 'parent_id': 'ghost', 'probability': '0.5',
+                                              'and_or': 'or'})
+
+    assert response.status_code == 302
+    assert flashes(client) == [('error', "Der Elternknoten wurde nicht gefunden.")]
+    assert client.store.node_id_by_name('neu') is None
+
+
+def test_edit_node_with_duplicate_attributes_changes_nothing(client):
+    version = client.store.version
+
+    client.post('/edit_node', data={'node_id': 'a', 'new_name': 'umbenannt', 'new_and_or': 'or',
+                                    'edit_attribute_name[]': ['x', 'x'], 'edit_attribute_value[]': ['1', '2'],
+                                    'display_in_tree[]': ['false', 'false']})
+
+    assert client.store.node('a')['name'] == 'a'
+    assert client.store.version == version
+
+
+def test_node_overview_is_paged(client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'NODE_OVERVIEW_PAGE_SIZE', 2)
+    first = client.get('/?page=1').get_data(as_text=True)
+    assert 'Seite 1 von 2 (3 Knoten)' in first
+    second = client.get('/?page=2').get_data(as_text=True)
+    assert 'Seite 2 von 2' in second
+    assert client.get('/?page=99').status_code == 200
+
+
+def test_delete_node_keeps_existing_edge_to_new_parent(make_store, monkeypatch):
+    import app as app_module
+
+    store = make_store(nodes=[node('root'), node('mid'), node('leaf')],
+                       edges=[edge('root', 'mid', '0.5'), edge('root', 'leaf', '0.3'), edge('mid', 'leaf', '0.8')])
+    monkeypatch.setattr(app_module, 'store', store)
+    app_module.app.config['TESTING'] = True
+    client = app_module.app.test_client()
+
+    client.post('/delete_node', data={'node_id': 'mid'})
+
+    assert store.node('mid') is None
+    assert [(e['parent'], e['child'], e['probability']) for e in store.edges] == [('root', 'leaf', '0.3')]
+    assert store.validation.probability_sum('root') == pytest.approx(0.3)
+    reloaded = GraphStore(store.storage)
+    reloaded.load()
+    assert reloaded.edges == store.edges
+    assert ('info', "Der Knoten 'leaf' hängt bereits am neuen Elternknoten, die vorhandene Kante wurde "
+                    "beibehalten.") in flashes(client)
+
+
+def test_metrics_are_computed_only_when_the_panel_is_shown(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(client.store.metrics, 'pareto_front', lambda root_id: calls.append(root_id) or [])
+
+    assert 'Kennzahlen anzeigen' in client.get('/').get_data(as_text=True)
+    assert calls == []
+    page = client.get('/?metrics=1').get_data(as_text=True)
+    assert calls == ['root']
+    assert 'Kennzahlen (Wurzelknoten)' in page
+    client.get('/?metrics=0')
+    assert calls == ['root']
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from conftest import edge, node, random_graph
+from probability import parse_probability
+from scenarios import ScenarioError, ScenarioSweep, scenario_key
+
+
+def random_scenario(rng, edges):
+    """
+    Erstellt ein zufälliges Szenario, das einige Kanten überschreibt oder skaliert.
+    """
+    overrides = []
+    for changed in rng.sample(edges, rng.randint(0, len(edges))):
+        if rng.random() < 0.5:
+            overrides.append({'parent': changed['parent'], 'child': changed['child'],
+                              'probability': rng.choice(['0', '0,1', '0.6', '1'])})
+        else:
+            overrides.append({'parent': changed['parent'], 'child': changed['child'],
+                              'factor': rng.choice([0, 0.5, 2, 10])})
+    return {'overrides': overrides}
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_scenarios_match_edited_trees(make_store, seed):
+    rng = random.Random(seed)
+    nodes, edges = random_graph(rng, rng.randint(2, 20), extra_edges=rng.randint(0, 5))
+    store = make_store(nodes, edges)
+    model = store.probabilities.model()
+    sweep = ScenarioSweep(max_cells=64)
+    scenarios = [random_scenario(rng, edges) for _ in range(12)]
+
+    results = sweep.evaluate(model, [sweep.normalize(model, scenario, lambda reference: reference)
+                                     for scenario in scenarios])
+
+    for index, (scenario, (_, values, _)) in enumerate(zip(scenarios, results)):
+        edited = make_store(nodes, edges, name=f'scenario{index}.json')
+        for override in scenario['overrides']:
+            current = parse_probability(edited.edge(override['parent'], override['child'])['probability'])
+            probability = override['probability'] if 'probability' in override \
+                else str(min(1.0, current * override['factor']))
+            edited.update_edge(override['parent'], override['child'], {'probability': probability})
+        expected = edited.probabilities.node_probabilities()
+        assert dict(zip(model.node_ids, values.tolist())) == pytest.approx(expected)
+
+
+def test_scenarios_are_normalized_and_cached(make_store):
+    store = make_store([node('root'), node('a'), node('b')], [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')])
+    model = store.probabilities.model()
+    sweep = ScenarioSweep()
+
+    def resolve(reference):
+        return reference
+
+    first = sweep.normalize(model, {'name': 'eins', 'overrides': [
+        {'parent': 'root', 'child': 'b', 'factor': 3}, {'parent': 'root', 'child': 'a', 'probability': '0,25'},
+        {'parent': 'root', 'child': 'b', 'factor': '0,5'}]}, resolve)
+    second = sweep.normalize(model, {'name': 'zwei', 'overrides': [
+        {'parent': 'root', 'child': 'b', 'factor': 0.5}, {'parent': 'root', 'child': 'a', 'probability': 0.25}]},
+        resolve)
+
+    # Die letzte Angabe je Kante gilt; Reihenfolge und Name ändern den Schlüssel nicht
+    assert first == second == [(('root', 'a'), 'probability', 0.25), (('root', 'b'), 'factor', 0.5)]
+    assert scenario_key(first) == scenario_key(second)
+    (key, values, cached), = sweep.evaluate(model, [first])
+    assert not cached
+    assert values[model.index['root']] == pytest.approx(1 - 0.75 * 0.75)
+    assert sweep.evaluate(model, [second])[0][0] == key
+    assert sweep.evaluate(model, [second])[0][2]
+
+    store.update_edge('root', 'a', {'probability': '1'})
+    assert not sweep.evaluate(store.probabilities.model(), [first])[0][2]
+
+
+@pytest.mark.parametrize('scenario', [
+    None,
+    {'overrides': 'keine Liste'},
+    {'overrides': ['keine Änderung']},
+    {'overrides': [{'parent': 'root', 'child': 'fehlt', 'probability': 0.5}]},
+    {'overrides': [{'parent': 'root', 'child': 'a'}]},
+    {'overrides': [{'parent': 'root', 'child': 'a', 'probability': 'hoch'}]},
+    {'overrides': [{'parent': 'root', 'child': 'a', 'probability': 1.5}]},
+    {'overrides': [{'parent': 'root', 'child': 'a', 'factor': -1}]},
+    {'overrides': [{'parent': 'root', 'child': 'a', 'factor': 'inf'}]},
+])
+def test_invalid_scenarios_are_rejected(make_store, scenario):
+    store = make_store([node('root'), node('a')], [edge('root', 'a', '0.5')])
+
+    with pytest.raises(ScenarioError):
+        ScenarioSweep().normalize(store.probabilities.model(), scenario, lambda reference: reference)
+
+
+def test_scenario_route_resolves_names_and_keeps_the_tree(client):
+    version = client.store.version
+    response = client.post('/api/scenarios', json={'nodes': ['root'], 'scenarios': [
+        {'name': 'gepatcht', 'overrides': [{'parent': 'root', 'child': 'a', 'probability': 0}]},
+        {'overrides': [{'parent': 'root', 'child': 'b', 'factor': 2}]}]})
+
+    assert response.status_code == 200
+    result = response.get_json()['scenarios']
+    assert result[0]['name'] == 'gepatcht'
+    assert result[0]['nodes'] == {'root': pytest.approx(0.5)}
+    assert result[1]['roots'] == {'root': pytest.approx(1.0)}
+    assert client.store.version == version
+    assert client.post('/api/scenarios', json={'scenarios': [{'overrides': [
+        {'parent': 'root', 'child': 'fehlt', 'probability': 0}]}]}).status_code == 422
+    assert client.post('/api/scenarios', json={'scenarios': []}).status_code == 400
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from conftest import edge, node, random_edit
+
+
+def expected_ids(store, query):
+    """
+    Durchsucht alle Knotennamen direkt (Referenz für den Suchindex).
+    """
+    folded = query.strip().casefold()
+    names = {node_id: current['name'].casefold() for node_id, current in store.nodes_by_id.items()}
+    if not folded:
+        return list(names)
+    matches = [node_id for node_id, name in names.items()
+               if (name.startswith(folded) if len(folded) < 3 else folded in name)]
+    return sorted(matches, key=lambda node_id: (not names[node_id].startswith(folded), names[node_id], node_id))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_search_matches_a_scan_of_all_names(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0'), node('n1')], [edge('n0', 'n1')])
+    queries = ['', 'n', 'N1', 'a', 'al', 'alp', 'ALPHA', 'beta', 'ta', 'n1-', 'et', 'zzz', ' gam ']
+    for _ in range(120):
+        random_edit(store, rng)
+        for query in rng.sample(queries, 4):
+            expected = expected_ids(store, query)
+            offset, limit = rng.randint(0, 5), rng.randint(1, 20)
+            result = store.search.search(query, offset=offset, limit=limit)
+            assert result['total'] == len(expected)
+            assert [item['id'] for item in result['items']] == expected[offset:offset + limit]
+            assert all(item['name'] == store.node(item['id'])['name'] for item in result['items'])
+
+
+def test_search_result_carries_the_store_version(make_store):
+    store = make_store([node('root'), node('Alpha'), node('alphabet')],
+                       [edge('root', 'Alpha'), edge('root', 'alphabet')])
+    store.rename_node('alphabet', 'Gamma')
+
+    result = store.search.search('alp')
+    assert result['version'] == store.version
+    assert [item['name'] for item in result['items']] == ['Alpha']
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import edge, node, random_graph
+from simulation import MonteCarloSimulator, wilson_interval
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_simulation_matches_model_on_trees(make_store, seed):
+    # Ohne gemeinsame Teilziele ist das Modell exakt; die Schätzung muss im (weiten) Konfidenzintervall liegen
+    rng = random.Random(seed)
+    store = make_store(*random_graph(rng, rng.randint(2, 25)))
+    model = store.probabilities.model()
+
+    hits, done = MonteCarloSimulator(shards=4).run(model, trials=20_000, seed=seed)
+
+    assert done == 20_000
+    for position, expected in enumerate(model.evaluate()):
+        low, high = wilson_interval(int(hits[position]), done, z=4.5)
+        assert low - 1e-12 <= expected <= high + 1e-12
+
+
+def test_simulation_correlates_shared_sub_goals(make_store):
+    # 'a' und 'b' müssen beide gelingen und hängen am selben Teilziel 's'; das Modell rechnet unabhängig (0,25)
+    store = make_store([node('root'), node('a', group='g'), node('b', group='g'), node('s'), node('leaf')],
+                       [edge('root', 'a'), edge('root', 'b'), edge('a', 's'), edge('b', 's'),
+                        edge('s', 'leaf', '0.5')])
+    model = store.probabilities.model()
+    assert store.probabilities.probability('root') == pytest.approx(0.25)
+
+    hits, done = MonteCarloSimulator().run(model, trials=20_000, seed=1)
+
+    low, high = wilson_interval(int(hits[model.index['root']]), done, z=4.5)
+    assert low <= 0.5 <= high
+    assert hits[model.index['root']] == hits[model.index['s']]
+
+
+def test_simulation_result_does_not_depend_on_the_process_pool(make_store):
+    store = make_store(*random_graph(random.Random(7), 30, extra_edges=10))
+    model = store.probabilities.model()
+    pooled = MonteCarloSimulator(max_workers=2, inline_limit=0)
+    try:
+        pooled_result = pooled.run(model, trials=5_000, seed=3)
+    finally:
+        pooled._executor.shutdown()
+
+    inline_result = MonteCarloSimulator(inline_limit=1 << 40).run(model, trials=5_000, seed=3)
+
+    assert pooled_result[1] == inline_result[1] == 5_000
+    assert np.array_equal(pooled_result[0], inline_result[0])
+
+
+def test_simulation_stops_after_the_time_budget(make_store):
+    store = make_store(*random_graph(random.Random(3), 10))
+    simulator = MonteCarloSimulator(shards=2, max_cells=64 * 10)
+
+    hits, done = simulator.run(store.probabilities.model(), trials=1_000_000, seed=0, time_budget=0)
+
+    # Jeder Teil führt mindestens einen Block aus, danach ist die Zeit abgelaufen
+    assert done == 2 * 64
+    assert (hits <= done).all()
+
+
+def test_wilson_interval_bounds():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(0, 100)[0] == 0.0
+    assert wilson_interval(100, 100)[1] == pytest.approx(1.0)
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert low + high == pytest.approx(1.0)
+    assert wilson_interval(5_000, 10_000)[1] - wilson_interval(5_000, 10_000)[0] < high - low
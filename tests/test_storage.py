@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from conftest import edge, node
+from graph_store import GraphStore
+from storage import JsonStorage, SqliteStorage
+
+
+def open_store(backend, tmp_path):
+    snapshot = tmp_path / 'attack_tree_data.json'
+    if not snapshot.exists():
+        snapshot.write_text(json.dumps({'version': 0, 'nodes': [node('root'), node('a', cost=5), node('b')],
+                                        'edges': [edge('root', 'a', '0.5'), edge('root', 'b', '0.5')]}),
+                            encoding='utf-8')
+    if backend == 'sqlite':
+        storage = SqliteStorage(str(tmp_path / 'attack_tree_data.sqlite3'), str(snapshot))
+    else:
+        storage = JsonStorage(str(snapshot))
+    store = GraphStore(storage)
+    store.load()
+    return store
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_saved_changes_survive_a_reload(backend, tmp_path):
+    store = open_store(backend, tmp_path)
+    store.add_node(node('c', group='g1', os='Windows'))
+    store.add_edge(edge('a', 'c', '0.4'))
+    store.rename_node('b', 'b2')
+    store.update_node('a', {'group': 'g1'})
+    store.update_edge('root', 'a', {'probability': '0.3'})
+    store.move_edge(store.edge('a', 'c'), 'b')
+    store.remove_node('root')
+    store.save()
+
+    reloaded = open_store(backend, tmp_path)
+    assert reloaded.version == store.version
+    assert reloaded.nodes == store.nodes
+    assert sorted(map(json.dumps, reloaded.edges)) == sorted(map(json.dumps, store.edges))
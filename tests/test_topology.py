@@ -0,0 +1,58 @@
+import random
+from functools import lru_cache
+
+import pytest
+
+from conftest import edge, node, random_edit
+
+
+def reachable(store, start_id, target_id):
+    """
+    Prüft per Tiefensuche, ob target_id von start_id aus erreichbar ist (Referenz für creates_cycle).
+    """
+    stack, seen = [start_id], set()
+    while stack:
+        node_id = stack.pop()
+        if node_id == target_id:
+            return True
+        if node_id not in seen:
+            seen.add(node_id)
+            stack.extend(store.child_edges.get(node_id, {}))
+    return False
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_levels_order_and_roots_match_reference(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0'), node('n1')], [edge('n0', 'n1')])
+    for _ in range(120):
+        random_edit(store, rng)
+        parents = {node_id: list(store.parent_edges.get(node_id, {}))
+                   for node_id in store.nodes_by_id}
+
+        @lru_cache(maxsize=None)
+        def longest_path(node_id):
+            return max((longest_path(parent_id) + 1 for parent_id in parents[node_id]), default=0)
+
+        topology = store.topology
+        assert topology.roots() == [node_id for node_id in store.nodes_by_id if not parents[node_id]]
+        assert topology.levels() == {node_id: longest_path(node_id) for node_id in store.nodes_by_id}
+        position = {node_id: index for index, node_id in enumerate(topology.order())}
+        assert all(position[current['parent']] < position[current['child']] for current in store.edges)
+        assert not topology.has_cycle()
+
+        node_ids = list(store.nodes_by_id)
+        for parent_id, child_id in (rng.sample(node_ids, 2) for _ in range(5) if len(node_ids) > 1):
+            assert topology.creates_cycle(parent_id, child_id) == reachable(store, child_id, parent_id)
+
+
+def test_nodes_in_a_cycle_have_no_level(make_store):
+    store = make_store([node('a'), node('b'), node('c'), node('d')],
+                       [edge('a', 'b'), edge('b', 'c'), edge('c', 'd')])
+    store.add_edge(edge('c', 'b'))
+
+    assert store.topology.has_cycle()
+    assert store.topology.levels() == {'a': 0}
+    assert store.topology.level('d') is None
+    assert store.topology.creates_cycle('d', 'a')
+    assert store.topology.creates_cycle('a', 'a')
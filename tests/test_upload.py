@@ -0,0 +1,74 @@
+import copy
+import io
+import json
+
+import pytest
+
+from conftest import edge, flashes, node
+from upload import UploadError, validate_upload
+
+VALID = {'nodes': [node('root'), node('a', os='Windows'), node('b')],
+         'edges': [edge('root', 'a', '0,5'), edge('root', 'b', '0.5')]}
+
+
+def changed(change):
+    data = copy.deepcopy(VALID)
+    change(data)
+    return data
+
+
+INVALID = [
+    (changed(lambda data: data.pop('edges')), "'nodes' und 'edges'"),
+    (changed(lambda data: data.update(nodes={})), "muss eine Liste sein"),
+    (changed(lambda data: data['nodes'].append(node('a'))), "'a' ist mehrfach vorhanden"),
+    (changed(lambda data: data['nodes'][1].pop('name')), "Knoten 2: Das Feld 'name' fehlt"),
+    (changed(lambda data: data['nodes'][1].update(group=3)), "Knoten 2: Das Feld 'group' hat einen ungültigen Typ"),
+    (changed(lambda data: data['nodes'][1]['attributes'].update(OS='Windows')), "Attribut 'OS' von Knoten 2"),
+    (changed(lambda data: data['edges'][0].update(probability=0.5)), "Kante 1: Das Feld 'probability'"),
+    (changed(lambda data: data['edges'][0].update(probability='viel')), "keine Zahl"),
+    (changed(lambda data: data['edges'][0].update(probability='1,5')), "zwischen 0 und 1"),
+    (changed(lambda data: data['edges'].append(edge('a', 'ghost'))), "unbekannten Knoten 'ghost'"),
+    (changed(lambda data: data['edges'].append(edge('root', 'b'))), "'root' -> 'b' ist mehrfach vorhanden"),
+    (changed(lambda data: data['edges'].extend([edge('a', 'b'), edge('b', 'a')])), "Zyklus"),
+]
+
+
+def test_valid_upload_is_counted(tmp_path):
+    path = tmp_path / 'upload.json'
+    path.write_text(json.dumps({'version': 4, **VALID}), encoding='utf-8')
+
+    assert validate_upload(str(path)) == (3, 2)
+
+
+@pytest.mark.parametrize('data, message', INVALID)
+def test_invalid_upload_is_rejected(tmp_path, data, message):
+    path = tmp_path / 'upload.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+    with pytest.raises(UploadError, match=message):
+        validate_upload(str(path))
+
+
+def upload(client, content):
+    return client.post('/upload_json', data={'file': (io.BytesIO(content), 'tree.json')},
+                       content_type='multipart/form-data')
+
+
+def test_rejected_upload_keeps_the_tree(client):
+    before = client.store.version, client.store.nodes, client.store.edges
+
+    for content in (json.dumps(INVALID[-1][0]).encode('utf-8'), b'{"nodes": [', b'\xff\xfe'):
+        assert upload(client, content).status_code == 302
+        [(category, _)] = flashes(client)
+        assert category == 'error'
+        assert (client.store.version, client.store.nodes, client.store.edges) == before
+
+
+def test_accepted_upload_replaces_the_tree(client):
+    data = changed(lambda data: data['nodes'].append(node('c')))
+
+    upload(client, json.dumps(data).encode('utf-8'))
+
+    assert flashes(client) == [('success', 'JSON-Datei erfolgreich hochgeladen!')]
+    assert client.store.nodes == data['nodes']
+    assert client.store.node_id_by_name('c') == 'c'
@@ -0,0 +1,64 @@
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from conftest import edge, node, random_edit
+from validation import edge_probability
+
+
+def expected_aggregates(store):
+    """
+    Berechnet die Prüfkennzahlen vollständig aus Knoten und Kanten (Referenz für den fortlaufenden Index).
+    """
+    sums = defaultdict(float)
+    for current in store.edges:
+        sums[current['parent']] += edge_probability(current)
+    unbalanced = {parent_id: round(total, 2) for parent_id, total in sums.items() if round(total, 2) != 1}
+    sizes = Counter(current['group'] for current in store.nodes if current.get('group'))
+    return dict(sums), unbalanced, sorted(group for group, size in sizes.items() if size == 1)
+
+
+def assert_matches_full_recompute(store):
+    sums, unbalanced, single_groups = expected_aggregates(store)
+    for parent_id, total in sums.items():
+        assert store.validation.probability_sum(parent_id) == pytest.approx(total)
+    assert dict(store.validation.unbalanced_parents()) == unbalanced
+    assert sorted(store.validation.single_node_groups()) == single_groups
+    counts = store.validation.report()['counts']
+    assert counts['probability_sum'] == len(unbalanced)
+    assert counts['single_node_group'] == len(single_groups)
+    assert counts['cycle'] == 0
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_incremental_index_matches_full_recompute(make_store, seed):
+    rng = random.Random(seed)
+    store = make_store([node('n0'), node('n1', group='g1'), node('n2')], [edge('n0', 'n1', '0.5'), edge('n0', 'n2')])
+    for _ in range(150):
+        random_edit(store, rng)
+        assert_matches_full_recompute(store)
+
+
+def test_rollback_restores_the_index(make_store):
+    rng = random.Random(7)
+    store = make_store([node('n0'), node('n1', group='g1'), node('n2')], [edge('n0', 'n1', '0.5'), edge('n0', 'n2')])
+    for _ in range(20):
+        random_edit(store, rng)
+    before = expected_aggregates(store)
+    checkpoint = store.checkpoint()
+    for _ in range(30):
+        random_edit(store, rng)
+    store.rollback(checkpoint)
+
+    assert expected_aggregates(store) == before
+    assert_matches_full_recompute(store)
+
+
+def test_cycles_are_reported(make_store):
+    store = make_store([node('a'), node('b'), node('c')], [edge('a', 'b'), edge('b', 'c')])
+    store.add_edge(edge('c', 'b'))
+
+    report = store.validation.report()
+    assert report['counts']['cycle'] == 2
+    assert {item['node'] for item in report['items'] if item['category'] == 'cycle'} == {'b', 'c'}
@@ -0,0 +1,130 @@
+from collections import deque
+
+
+class TopologyEngine:
+    """
+    Berechnet die Ebenen aller Knoten in einem Durchlauf (Kahn-Algorithmus) und erkennt Zyklen.
+    Das Ergebnis wird zwischengespeichert, bis sich Knoten oder Kanten im Graphspeicher ändern.
+    """
+
+    def __init__(self, store):
+        """
+        Erstellt die Topologie-Berechnung für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        """
+        self.store = store
+        self._version = None
+        self._levels = {}
+        self._order = []
+        self._roots = []
+
+    def _refresh(self):
+        """
+        Berechnet Ebenen, topologische Reihenfolge und Wurzeln neu, falls sich Knoten oder Kanten geändert haben.
+        Die Ebene eines Knotens ist die Länge des längsten Pfades von einer Wurzel zu diesem Knoten.
+
+        :return: None
+        """
+        if self._version == self.store.topology_version:
+            return
+
+        nodes_by_id = self.store.nodes_by_id
+        in_degree = {
+            node_id: sum(1 for parent_id in self.store.parent_edges.get(node_id, {}) if parent_id in nodes_by_id)
+            for node_id in nodes_by_id
+        }
+        roots = [node_id for node_id, degree in in_degree.items() if degree == 0]
+        levels = {node_id: 0 for node_id in roots}
+        order = []
+        queue = deque(roots)
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for child_id in self.store.child_edges.get(node_id, {}):
+                if child_id not in in_degree:
+                    continue
+                levels[child_id] = max(levels.get(child_id, 0), levels[node_id] + 1)
+                in_degree[child_id] -= 1
+                if in_degree[child_id] == 0:
+                    queue.append(child_id)
+
+        # Knoten in Zyklen werden nie erreicht und erhalten keine Ebene
+        self._levels = {node_id: levels[node_id] for node_id in order}
+        self._order = order
+        self._roots = roots
+        self._version = self.store.topology_version
+
+    def levels(self):
+        """
+        Gibt die Ebenen aller Knoten zurück, die nicht in einem Zyklus liegen.
+
+        :return: Dictionary von Knoten-ID zu Ebene
+        """
+        self._refresh()
+        return self._levels
+
+    def level(self, node_id):
+        """
+        Gibt die Ebene eines Knotens zurück.
+
+        :param node_id: ID des Knotens
+        :return: Ebene des Knotens oder None, wenn der Knoten in einem Zyklus liegt
+        """
+        return self.levels().get(node_id)
+
+    def order(self):
+        """
+        Gibt die Knoten-IDs in topologischer Reihenfolge (Wurzeln zuerst) zurück.
+
+        :return: Liste der Knoten-IDs
+        """
+        self._refresh()
+        return self._order
+
+    def roots(self):
+        """
+        Gibt die IDs aller Knoten ohne Elternknoten in Einfügereihenfolge zurück.
+
+        :return: Liste der Knoten-IDs
+        """
+        self._refresh()
+        return self._roots
+
+    def has_cycle(self):
+        """
+        Überprüft, ob der Graph einen Zyklus enthält.
+
+        :return: True, wenn ein Zyklus existiert, sonst False
+        """
+        self._refresh()
+        return len(self._order) != len(self.store.nodes_by_id)
+
+    def creates_cycle(self, parent_id, child_id):
+        """
+        Überprüft, ob eine neue Kante vom Eltern- zum Kindknoten einen Zyklus erzeugen würde.
+        Liegt der Elternknoten auf einer kleineren Ebene als der Kindknoten, ist kein Pfad zurück möglich.
+        Andernfalls wird vom Kindknoten aus nach dem Elternknoten gesucht.
+
+        :param parent_id: ID des Elternknotens
+        :param child_id: ID des Kindknotens
+        :return: True, wenn ein Zyklus entstehen würde, sonst False
+        """
+        if parent_id == child_id:
+            return True
+
+        levels = self.levels()
+        if parent_id in levels and child_id in levels and levels[parent_id] < levels[child_id]:
+            return False
+
+        visited = {child_id}
+        stack = [child_id]
+        while stack:
+            node_id = stack.pop()
+            for next_id in self.store.child_edges.get(node_id, {}):
+                if next_id == parent_id:
+                    return True
+                if next_id not in visited:
+                    visited.add(next_id)
+                    stack.append(next_id)
+        return False
@@ -0,0 +1,330 @@
+import json
+import os
+import re
+import tempfile
+from array import array
+from collections import deque
+
+import numpy as np
+
+from probability import probability_value
+
+# Maximale Größe einer hochgeladenen JSON-Datei und eines einzelnen Knotens bzw. einer einzelnen Kante
+MAX_UPLOAD_SIZE = 64 * 1024 * 1024
+MAX_ITEM_SIZE = 1024 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Schema der Knoten und Kanten: Feldname -> (Pflichtfeld, erlaubte Typen)
+NODE_SCHEMA = {
+    'id': (True, (str,)),
+    'name': (True, (str,)),
+    'color': (False, (str, type(None))),
+    'group': (False, (str, type(None))),
+    'parent': (False, (str, type(None))),
+    'attributes': (False, (dict,)),
+}
+EDGE_SCHEMA = {
+    'parent': (True, (str,)),
+    'child': (True, (str,)),
+    'probability': (True, (str,)),
+    'color': (False, (str, type(None))),
+}
+ATTRIBUTE_SCHEMA = {
+    'value': (True, (str,)),
+    'display_in_tree': (True, (str,)),
+}
+
+
+class UploadError(Exception):
+    """
+    Fehler beim Hochladen oder Prüfen einer JSON-Datei.
+    """
+
+
+def compile_schema(kind, schema):
+    """
+    Übersetzt ein Schema in eine Prüffunktion für einzelne Objekte.
+
+    :param kind: Bezeichnung der Objekte für Fehlermeldungen (z.B. 'Knoten')
+    :param schema: Dictionary von Feldname zu Tupel aus Pflichtfeld und erlaubten Typen
+    :return: Funktion, die ein Objekt samt Position prüft und bei Fehlern UploadError auslöst
+    """
+    required = tuple(name for name, (is_required, _) in schema.items() if is_required)
+    types = tuple((name, allowed) for name, (_, allowed) in schema.items())
+
+    def validate(item, position):
+        if not isinstance(item, dict):
+            raise UploadError(f"{kind} {position} ist kein Objekt.")
+        for name in required:
+            if name not in item:
+                raise UploadError(f"{kind} {position}: Das Feld '{name}' fehlt.")
+        for name, allowed in types:
+            if name in item and not isinstance(item[name], allowed):
+                raise UploadError(f"{kind} {position}: Das Feld '{name}' hat einen ungültigen Typ.")
+
+    return validate
+
+
+validate_node = compile_schema('Knoten', NODE_SCHEMA)
+validate_edge = compile_schema('Kante', EDGE_SCHEMA)
+validate_attribute = compile_schema('Attribut', ATTRIBUTE_SCHEMA)
+
+
+def spool_upload(stream, directory, max_size=MAX_UPLOAD_SIZE, chunk_size=64 * 1024):
+    """
+    Schreibt einen hochgeladenen Datenstrom blockweise in eine temporäre Datei.
+
+    :param stream: Der Datenstrom der hochgeladenen Datei
+    :param directory: Verzeichnis der temporären Datei (dasselbe Dateisystem wie das Ziel)
+    :param max_size: Maximale Größe in Bytes
+    :param chunk_size: Größe der gelesenen Blöcke in Bytes
+    :return: Pfad der temporären Datei (muss vom Aufrufer gelöscht werden)
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.json')
+    try:
+        size = 0
+        with os.fdopen(fd, 'wb') as file:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(f"Die Datei ist größer als {max_size // (1024 * 1024)} MB.")
+                file.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+class JsonObjectReader:
+    """
+    Liest ein JSON-Objekt der obersten Ebene schrittweise aus einer Datei.
+    Die Elemente von Arrays werden einzeln dekodiert, sodass nie mehr als ein Element und ein Lesepuffer
+    im Speicher liegen.
+    """
+
+    def __init__(self, file, chunk_size=64 * 1024, max_item_size=MAX_ITEM_SIZE):
+        """
+        Erstellt den Leser für eine im Textmodus geöffnete Datei.
+
+        :param file: Die Datei
+        :param chunk_size: Größe der gelesenen Blöcke in Zeichen
+        :param max_item_size: Maximale Größe eines einzelnen Wertes in Zeichen
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.max_item_size = max_item_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        """
+        Verwirft den bereits gelesenen Teil des Puffers und liest den nächsten Block.
+
+        :return: True, wenn neue Daten gelesen wurden
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def _peek(self):
+        """
+        Überspringt Leerraum und gibt das nächste Zeichen zurück, ohne es zu verbrauchen.
+
+        :return: Das nächste Zeichen oder '' am Dateiende
+        """
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self._fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def _expect(self, characters):
+        """
+        Verbraucht das nächste Zeichen, falls es eines der erwarteten ist.
+
+        :param characters: Die erwarteten Zeichen
+        :return: Das gelesene Zeichen
+        """
+        character = self._peek()
+        if not character or character not in characters:
+            raise UploadError(f"Ungültiges JSON: '{characters[0]}' erwartet.")
+        self.position += 1
+        return character
+
+    def _value(self):
+        """
+        Dekodiert den nächsten vollständigen JSON-Wert. Reicht der Puffer nicht aus, werden weitere Blöcke gelesen.
+
+        :return: Der dekodierte Wert
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # Eine Zahl am Pufferende könnte im nächsten Block weitergehen
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise UploadError(f"Ungültiges JSON: {e.msg}.")
+            if len(self.buffer) - self.position > self.max_item_size:
+                raise UploadError("Ein einzelner Eintrag der Datei ist zu groß.")
+            self._fill()
+
+    def items(self):
+        """
+        Liest die Felder des Objekts der obersten Ebene.
+        Für Arrays wird statt des Wertes ein Generator über die Elemente geliefert, der vollständig durchlaufen
+        werden muss, bevor das nächste Feld gelesen wird.
+
+        :return: Generator über Tupel aus Feldname und Wert bzw. Element-Generator
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.position += 1
+        else:
+            while True:
+                key = self._value()
+                if not isinstance(key, str):
+                    raise UploadError("Ungültiges JSON: Feldname erwartet.")
+                self._expect(':')
+                if self._peek() == '[':
+                    self.position += 1
+                    yield key, self._elements()
+                else:
+                    yield key, self._value()
+                if self._expect(',}') == '}':
+                    break
+        if self._peek():
+            raise UploadError("Ungültiges JSON: Daten nach dem Ende des Objekts.")
+
+    def _elements(self):
+        """
+        Liest die Elemente eines Arrays, dessen öffnende Klammer bereits verbraucht wurde.
+
+        :return: Generator über die Elemente
+        """
+        if self._peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+
+def validate_upload(file_path):
+    """
+    Prüft eine hochgeladene JSON-Datei schrittweise, ohne sie vollständig in den Speicher zu laden:
+    Aufbau und Feldtypen laut Schema (auch der einzelnen Attribute), eindeutige Knoten-IDs, Kanten zwischen vorhandenen Knoten ohne Duplikate,
+    numerische Wahrscheinlichkeiten zwischen 0 und 1 sowie Zyklenfreiheit.
+    Im Speicher liegen dabei nur die Knoten-IDs und die Kanten als Paare von Ganzzahlen.
+
+    :param file_path: Pfad zur Datei
+    :return: Tupel aus der Anzahl der Knoten und der Kanten
+    """
+    ids = {}
+    is_node = bytearray()
+    parents, children = array('i'), array('i')
+    seen = set()
+
+    def index(identifier):
+        position = ids.setdefault(identifier, len(ids))
+        if position == len(is_node):
+            is_node.append(0)
+        return position
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for key, value in JsonObjectReader(file).items():
+            if key in seen:
+                raise UploadError(f"Das Feld '{key}' ist mehrfach vorhanden.")
+            seen.add(key)
+            if key not in ('nodes', 'edges'):
+                if hasattr(value, '__next__'):
+                    for _ in value:
+                        pass
+                continue
+            if not hasattr(value, '__next__'):
+                raise UploadError(f"Das Feld '{key}' muss eine Liste sein.")
+            for position, item in enumerate(value, 1):
+                if key == 'nodes':
+                    validate_node(item, position)
+                    for name, attribute in item.get('attributes', {}).items():
+                        validate_attribute(attribute, f"'{name}' von Knoten {position}")
+                    node = index(item['id'])
+                    if is_node[node]:
+                        raise UploadError(f"Die Knoten-ID '{item['id']}' ist mehrfach vorhanden.")
+                    is_node[node] = 1
+                else:
+                    validate_edge(item, position)
+                    try:
+                        probability = probability_value(item['probability'])
+                    except ValueError:
+                        raise UploadError(f"Kante {position}: Die Wahrscheinlichkeit ist keine Zahl.")
+                    if not 0 <= probability <= 1:
+                        raise UploadError(f"Kante {position}: Die Wahrscheinlichkeit muss zwischen 0 und 1 liegen.")
+                    parents.append(index(item['parent']))
+                    children.append(index(item['child']))
+
+    if 'nodes' not in seen or 'edges' not in seen:
+        raise UploadError("Die Datei benötigt die Felder 'nodes' und 'edges'.")
+    node_count = len(ids)
+    parents = np.frombuffer(parents, dtype=np.int32).astype(np.int64)
+    children = np.frombuffer(children, dtype=np.int32).astype(np.int64)
+    known = np.frombuffer(bytes(is_node), dtype=np.uint8).astype(bool)
+
+    dangling = np.flatnonzero(~(known[parents] & known[children]))
+    if len(dangling):
+        edge = dangling[0]
+        missing = parents[edge] if not known[parents[edge]] else children[edge]
+        raise UploadError(f"Eine Kante verweist auf den unbekannten Knoten '{identifier_at(ids, missing)}'.")
+
+    pairs = parents * node_count + children
+    order = np.argsort(pairs, kind='stable')
+    duplicates = np.flatnonzero(pairs[order][1:] == pairs[order][:-1])
+    if len(duplicates):
+        edge = order[duplicates[0]]
+        raise UploadError(f"Die Kante '{identifier_at(ids, parents[edge])}' -> "
+                          f"'{identifier_at(ids, children[edge])}' ist mehrfach vorhanden.")
+
+    # Zyklen: Kahn-Algorithmus auf den Ganzzahl-Indizes (Kindknoten je Elternknoten als CSR-Struktur)
+    in_degree = np.bincount(children, minlength=node_count)
+    order = np.argsort(parents, kind='stable')
+    targets = children[order].tolist()
+    offsets = np.r_[0, np.cumsum(np.bincount(parents, minlength=node_count))].tolist()
+    in_degree = in_degree.tolist()
+    queue = deque(np.flatnonzero(np.array(in_degree) == 0).tolist())
+    visited = 0
+    while queue:
+        node = queue.popleft()
+        visited += 1
+        for child in targets[offsets[node]:offsets[node + 1]]:
+            in_degree[child] -= 1
+            if in_degree[child] == 0:
+                queue.append(child)
+    if visited != node_count:
+        raise UploadError("Die Kanten bilden einen Zyklus.")
+    return int(known.sum()), len(parents)
+
+
+def identifier_at(ids, position):
+    """
+    Sucht die ID zu einer Ganzzahl-Position (nur für Fehlermeldungen).
+
+    :param ids: Dictionary von ID zu Position
+    :param position: Die Position
+    :return: Die ID
+    """
+    return next(identifier for identifier, index in ids.items() if index == position)
@@ -0,0 +1,216 @@
+import math
+
+from probability import parse_probability
+
+# Toleranz für Rundungsfehler der fortlaufend aktualisierten Summen
+PROBABILITY_TOLERANCE = 1e-9
+
+# Kategorien der Prüfergebnisse mit ihrer Bezeichnung
+DIAGNOSTIC_CATEGORIES = {
+    'probability_sum': "Gesamtwahrscheinlichkeit ungleich 1",
+    'single_node_group': "AND-Verknüpfung mit nur einem Knoten",
+    'cycle': "Knoten in einem Zyklus",
+}
+
+
+def edge_probability(edge):
+    """
+    Gibt die Wahrscheinlichkeit einer Kante für die Summen zurück. Ungültige Werte zählen als 0.
+
+    :param edge: Die Kante
+    :return: Wahrscheinlichkeit als float
+    """
+    value = parse_probability(edge.get('probability'))
+    return 0.0 if math.isnan(value) else value
+
+
+class ValidationIndex:
+    """
+    Pflegt die Kennzahlen für die Prüfung der Daten fortlaufend mit: die Summe der Kantenwahrscheinlichkeiten je
+    Elternknoten und die Anzahl der Knoten je AND-Gruppe. Der Graphspeicher meldet jede Änderung eines Knotens
+    oder einer Kante, sodass jede Änderung in O(1) nachgeführt wird.
+
+    Zusätzlich werden die Elternknoten mit einer Gesamtwahrscheinlichkeit ungleich 1 und die Gruppen mit nur
+    einem Knoten vorgehalten. Prüfungen lesen nur diese Mengen und durchsuchen weder Knoten noch Kanten;
+    der daraus erstellte Prüfbericht wird je Version des Graphspeichers zwischengespeichert.
+    """
+
+    def __init__(self, store):
+        """
+        Erstellt die Prüfkennzahlen für den angegebenen Graphspeicher.
+
+        :param store: Der Graphspeicher mit den aktuellen Daten
+        """
+        self.store = store
+        self._report = None
+        self.clear()
+
+    def clear(self):
+        """
+        Setzt alle Kennzahlen zurück (z.B. bevor der Speicher neu befüllt wird).
+
+        :return: None
+        """
+        self._sums = {}
+        self._group_sizes = {}
+        self._unbalanced = {}
+        self._single_groups = {}
+
+    def probability_sum(self, parent_id):
+        """
+        Gibt die Summe der Wahrscheinlichkeiten aller Kanten zurück, die vom angegebenen Knoten ausgehen.
+
+        :param parent_id: ID des Elternknotens
+        :return: Summe der Wahrscheinlichkeiten (0, falls der Knoten keine Kinder hat)
+        """
+        return self._sums.get(parent_id, 0.0)
+
+    def exceeds_total(self, parent_id, probability, replaced_child_id=None):
+        """
+        Prüft, ob die Gesamtwahrscheinlichkeit der Kindknoten durch eine neue oder geänderte Kante 1 überschreiten
+        würde.
+
+        :param parent_id: ID des Elternknotens
+        :param probability: Wahrscheinlichkeit der neuen bzw. geänderten Kante
+        :param replaced_child_id: ID des Kindknotens, dessen Kante ersetzt wird (None für eine neue Kante)
+        :return: True, wenn die Gesamtwahrscheinlichkeit größer als 1 wäre
+        """
+        total = self.probability_sum(parent_id) + probability
+        if replaced_child_id is not None:
+            edge = self.store.edge(parent_id, replaced_child_id)
+            if edge is not None:
+                total -= edge_probability(edge)
+        return total > 1 + PROBABILITY_TOLERANCE
+
+    def unbalanced_parents(self):
+        """
+        Gibt alle Elternknoten zurück, deren Kinder eine Gesamtwahrscheinlichkeit ungleich 1 haben
+        (auf zwei Nachkommastellen gerundet).
+
+        :return: Liste von Tupeln aus Knoten-ID und gerundeter Gesamtwahrscheinlichkeit
+        """
+        return [(parent_id, round(self._sums[parent_id], 2)) for parent_id in self._unbalanced]
+
+    def single_node_groups(self):
+        """
+        Gibt alle AND-Gruppen zurück, die nur einen Knoten enthalten.
+
+        :return: Liste der Gruppennamen
+        """
+        return list(self._single_groups)
+
+    def report(self):
+        """
+        Gibt alle Prüfergebnisse des aktuellen Standes zurück. Der Bericht wird je Version des Graphspeichers
+        einmal erstellt und zwischengespeichert.
+
+        :return: Dictionary mit 'version', 'counts' (Anzahl je Kategorie), 'ranges' (Bereich je Kategorie in 'items')
+                 und 'items' (nach Kategorie geordnete Liste der Prüfergebnisse mit 'category' und 'message'
+                 sowie 'node' bzw. 'group')
+        """
+        store = self.store
+        with store.lock:
+            if self._report is not None and self._report['version'] == store.version:
+                return self._report
+            items = []
+            for parent_id, total_probability in self.unbalanced_parents():
+                parent = store.node(parent_id)
+                parent_name = parent['name'] if parent else 'Unbekannt'
+                items.append({'category': 'probability_sum', 'node': parent_id, 'name': parent_name,
+                              'total': total_probability,
+                              'message': f"Der Knoten '{parent_name}' hat Kinder mit einer Gesamtwahrscheinlichkeit "
+                                         f"von {total_probability} !"})
+            for group in self.single_node_groups():
+                items.append({'category': 'single_node_group', 'group': group,
+                              'message': f"Die AND Verknüpfung '{group}' besitzt nur einen Node!"})
+            if store.topology.has_cycle():
+                levels = store.topology.levels()
+                for node_id, node in store.nodes_by_id.items():
+                    if node_id not in levels:
+                        items.append({'category': 'cycle', 'node': node_id, 'name': node['name'],
+                                      'message': f"Der Knoten '{node['name']}' liegt in einem Zyklus."})
+            # Die Ergebnisse liegen nach Kategorie geordnet vor; je Kategorie wird der Bereich in 'items' gemerkt
+            ranges, start = {}, 0
+            for category in DIAGNOSTIC_CATEGORIES:
+                end = start
+                while end < len(items) and items[end]['category'] == category:
+                    end += 1
+                ranges[category] = (start, end)
+                start = end
+            counts = {category: end - start for category, (start, end) in ranges.items()}
+            self._report = {'version': store.version, 'counts': counts, 'ranges': ranges, 'items': items}
+            return self._report
+
+    def _add_probability(self, parent_id, delta):
+        """
+        Ändert die Summe eines Elternknotens und aktualisiert die Menge der unausgeglichenen Elternknoten.
+
+        :param parent_id: ID des Elternknotens
+        :param delta: Änderung der Summe
+        :return: None
+        """
+        total = self._sums.get(parent_id, 0.0) + delta
+        if parent_id not in self.store.child_edges:
+            # Ohne Kinder beginnt die Summe neu, damit sich keine Rundungsfehler ansammeln
+            self._sums.pop(parent_id, None)
+            self._unbalanced.pop(parent_id, None)
+            return
+        self._sums[parent_id] = total
+        if round(total, 2) != 1:
+            self._unbalanced[parent_id] = None
+        else:
+            self._unbalanced.pop(parent_id, None)
+
+    def _add_group_member(self, group, delta):
+        """
+        Ändert die Anzahl der Knoten einer AND-Gruppe und aktualisiert die Menge der Gruppen mit nur einem Knoten.
+
+        :param group: Name der Gruppe (None wird ignoriert)
+        :param delta: Änderung der Anzahl (1 oder -1)
+        :return: None
+        """
+        if group is None:
+            return
+        size = self._group_sizes.get(group, 0) + delta
+        if size > 0:
+            self._group_sizes[group] = size
+        else:
+            self._group_sizes.pop(group, None)
+        if size == 1:
+            self._single_groups[group] = None
+        else:
+            self._single_groups.pop(group, None)
+
+    def node_changed(self, old_node, new_node):
+        """
+        Führt die Gruppengrößen nach dem Hinzufügen, Ändern oder Entfernen eines Knotens nach.
+
+        :param old_node: Der bisherige Knoten oder None
+        :param new_node: Der neue Knoten oder None
+        :return: None
+        """
+        old_group = old_node.get('group') if old_node is not None else None
+        new_group = new_node.get('group') if new_node is not None else None
+        if old_node is not None and new_node is not None and old_group == new_group:
+            return
+        if old_node is not None:
+            self._add_group_member(old_group, -1)
+        if new_node is not None:
+            self._add_group_member(new_group, 1)
+
+    def edge_changed(self, old_edge, new_edge):
+        """
+        Führt die Wahrscheinlichkeitssummen nach dem Hinzufügen, Ändern oder Entfernen einer Kante nach.
+        Muss aufgerufen werden, nachdem die Adjazenzindizes des Graphspeichers aktualisiert wurden.
+
+        :param old_edge: Die bisherige Kante oder None
+        :param new_edge: Die neue Kante oder None
+        :return: None
+        """
+        if old_edge is not None and new_edge is not None and old_edge['parent'] == new_edge['parent']:
+            self._add_probability(new_edge['parent'], edge_probability(new_edge) - edge_probability(old_edge))
+            return
+        if old_edge is not None:
+            self._add_probability(old_edge['parent'], -edge_probability(old_edge))
+        if new_edge is not None:
+            self._add_probability(new_edge['parent'], edge_probability(new_edge))